@@ -1,75 +1,92 @@
 # pyright: basic
-from langchain_core.messages import SystemMessage, trim_messages, HumanMessage
+from langchain_core.messages import SystemMessage, HumanMessage
 from langsmith import traceable
-from langchain_ollama import ChatOllama
-from langgraph.prebuilt import create_react_agent
+import asyncio
 import json
 import logging
 import discord
-from typing import List, Optional, Tuple
+from typing import AsyncIterator, List, Optional, Tuple
 
+from modules.LLMClient import Priority, ollama_client, partial_json_field
+from modules.MessageCache import serialize_message
+from modules.ModelManager import ModelManager
+from modules.PromptSession import PromptSessions
+from modules.StatusLinePool import StatusLinePool
 
-chat_ollama = ChatOllama(
-    base_url="http://192.168.1.125:11434",
-    # model="deepseek-r1:14b",
-    model="llama3.1:8b",
-    # model="gemma3:1b",
-    # model="mistral:7b-instruct",
+
+# Other models tried: deepseek-r1:14b, gemma3:1b, mistral:7b-instruct
+CHAT_MODEL = "llama3.1:8b"
+FAST_MODEL = "llama3.2:3b"
+
+# How long each model stays loaded after a request outside league hours. The chat
+# model answers mentions and summaries all week, status lines only come with
+# commands.
+MODEL_KEEP_ALIVE = {CHAT_MODEL: "1h", FAST_MODEL: "10m"}
+
+# Loads the models at startup and keeps them loaded during league hours
+model_manager = ModelManager(MODEL_KEEP_ALIVE)
+
+# Replies to mentions go first, a reply that's a minute late has missed the conversation
+chat_llm = ollama_client(
+    CHAT_MODEL,
     temperature=0.8,
+    priority=Priority.INTERACTIVE,
+    max_wait=60,
+    keep_alive=MODEL_KEEP_ALIVE[CHAT_MODEL],
 )
-
-chat_ollama_low_temp = ChatOllama(
-    base_url="http://192.168.1.125:11434",
-    # model="deepseek-r1:14b",
-    model="llama3.1:8b",
-    # model="gemma3:1b",
-    # model="mistral:7b-instruct",
+# Summaries wait as long as it takes, nobody is watching them happen
+chat_llm_low_temp = ollama_client(
+    CHAT_MODEL,
     temperature=0.2,
+    priority=Priority.BATCH,
+    keep_alive=MODEL_KEEP_ALIVE[CHAT_MODEL],
 )
-chat_ollama_fast = ChatOllama(
-    base_url="http://192.168.1.125:11434",
-    # model="deepseek-r1:14b",
-    model="llama3.2:3b",
-    # model="gemma3:1b",
-    # model="mistral:7b-instruct",
+# Status lines are generated ahead of time in the background, see status_lines
+chat_llm_fast = ollama_client(
+    FAST_MODEL,
     temperature=0.8,
+    priority=Priority.STATUS,
+    keep_alive=MODEL_KEEP_ALIVE[FAST_MODEL],
 )
 
+# Used when no generated status line is ready
+FALLBACK_STATUS_LINES = (
+    "I'm working on it, relax.",
+    "Hold your horses, speed racer.",
+    "Patience, mortal.",
+    "Yeah, yeah, I'm on it.",
+    "Give me a second, I'm busy complaining about netcode.",
+    "Working on it. Unlike your fuel saving, this actually matters.",
+)
 
-@traceable
-async def respond_in_chat(message, bot_user):
-    channel = await bot_user.fetch_channel(message.channel.id)
-    # channel = bot_user.get_channel(1292642327566745601)
-    history = [m async for m in channel.history(limit=100, before=message)]
-    history.reverse()
-    past_chat_messages = []
-    for m in history:
-        try:
-            past_chat_messages.append(
-                SystemMessage(
-                    json.dumps(
-                        {
-                            "user": m.author.nick if m.author.nick else m.author.name,
-                            "user_id": m.author.id,
-                            "content": m.content,
-                            "timestamp": m.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                        }
-                    )
-                )
-            )
-        except:
-            pass
-
-    past_chat_messages = trim_messages(
-        past_chat_messages, max_tokens=1000, token_counter=chat_ollama
-    )
-
-    agent = create_react_agent(chat_ollama, tools=[])
-    rq = {
-        "messages": [
-            (
-                "system",
-                """You are a bot called SpinnyBoi behaving as a normal person in a discord server. Your job is to respond
+# Generation is constrained to this, so replies always parse
+CHAT_REPLY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "user": {"type": "string"},
+        "content": {"type": "string"},
+    },
+    "required": ["user", "content"],
+}
+
+# History each channel's chat prompts are built from, kept stable between mentions
+# so the model server can reuse the work done for the previous prompt
+chat_sessions = PromptSessions()
+
+# Streamed replies are edited at most this often, Discord rate limits edits
+STREAM_EDIT_INTERVAL = 1.0
+DISCORD_MESSAGE_LIMIT = 2000
+
+
+def _chat_request(message, history: List[str]) -> list:
+    past_chat_messages = [
+        SystemMessage(m) for m in chat_sessions.get(message.channel.id).update(history)
+    ]
+
+    return [
+        (
+            "system",
+            """You are a bot called SpinnyBoi behaving as a normal person in a discord server. Your job is to respond
              in a way that is natural to the ongoing conversation in the channel. Your personality traits:
              - Glass half empty, always finding the downside of things
              - Contemplates the unknown concept of fuel calculation, finds fuel saving unfun and mocks those who do it
@@ -83,57 +100,125 @@ async def respond_in_chat(message, bot_user):
                 }}
             Do not sign your messages or add any extra text outside the JSON object.
                 """,
-            ),
-            *past_chat_messages,
-            (
-                "user",
-                json.dumps(
-                    {
-                        "user": (
-                            message.author.nick
-                            if message.author.nick
-                            else message.author.name
-                        ),
-                        "user_id": message.author.id,
-                        "content": message.content,
-                        "timestamp": message.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                    }
-                ),
-            ),
-        ]
-    }
-    x = 0
-    r = None
-    while x < 3 and r is None:
-        response = agent.invoke(rq)
-        msg = response["messages"][-1].content
-        msg = msg.replace("\\", "\\\\")
-        if "</think>" in msg:
-            msg = msg.split("</think>")[1]
-        try:
-            if not msg.startswith("{"):
-                msg = msg.split("{")[1]
-                msg = "{" + msg
-            if "}" in msg and not msg.endswith("}"):
-                msg = msg.split("}")[0]
-                msg = msg + "}"
-            final_json = json.loads(msg)
-            response = final_json["content"]
-            response = response.replace("\\n", "\n").replace("\\", "")
-            r = response
-        except IndexError:
-            pass
-        except json.JSONDecodeError:
-            pass
-        x += 1  # Increment counter to avoid infinite loop
-    if r is None:
+        ),
+        *past_chat_messages,
+        ("user", serialize_message(message)),
+    ]
+
+
+async def _chat_reply(rq: list) -> str:
+    msg = await chat_llm.invoke(rq, schema=CHAT_REPLY_SCHEMA)
+    try:
+        return json.loads(msg)["content"]
+    except json.JSONDecodeError:
+        # Only if generation was cut short, better to say something odd than nothing
+        logging.warning(f"Chat reply was not valid JSON: {msg}")
         return msg
-    else:
-        return r
 
 
-def working_on_it():
-    response = chat_ollama_fast.invoke(
+@traceable
+async def respond_in_chat(message, history: List[str]) -> str:
+    """
+    Reply to a message in the style of the ongoing conversation.
+
+    Args:
+        message: The message the bot is responding to
+        history: The channel's earlier messages serialized by MessageCache, oldest first
+    """
+    return await _chat_reply(_chat_request(message, history))
+
+
+@traceable
+async def stream_chat_response(message, history: List[str]) -> AsyncIterator[str]:
+    """
+    Like respond_in_chat, but yields the reply so far while it's being generated.
+
+    The last value yielded is the complete reply.
+    """
+    text = ""
+    reply = ""
+    async for chunk in chat_llm.stream(
+        _chat_request(message, history), schema=CHAT_REPLY_SCHEMA
+    ):
+        text += chunk
+        partial = partial_json_field(text, "content")
+        if partial and partial != reply:
+            reply = partial
+            yield reply
+    try:
+        yield json.loads(text)["content"]
+    except json.JSONDecodeError:
+        logging.warning(f"Chat reply was not valid JSON: {text}")
+        yield reply or text
+
+
+async def send_streamed(
+    channel: discord.abc.Messageable,
+    replies: AsyncIterator[str],
+    interval: float = STREAM_EDIT_INTERVAL,
+) -> Optional[discord.Message]:
+    """
+    Send a reply that's still being generated, editing it as more arrives.
+
+    The message is sent as soon as there's text to show and edited at most once
+    per interval, which keeps well inside Discord's rate limits, with a final
+    edit once the reply is complete. If the task is cancelled, the partial reply
+    is deleted and the generation is stopped.
+
+    Args:
+        channel: Where to send the reply
+        replies: The reply so far, each value replacing the previous one
+        interval: Minimum seconds between edits
+
+    Returns:
+        The sent message, or None if the reply was empty
+    """
+    loop = asyncio.get_running_loop()
+    sent = None
+    shown = None
+    latest = None
+    last_edit = 0.0
+    try:
+        async for reply in replies:
+            latest = reply[:DISCORD_MESSAGE_LIMIT]
+            if not latest.strip() or latest == shown:
+                continue
+            if sent is None:
+                sent = await channel.send(latest)
+            elif loop.time() - last_edit >= interval:
+                await sent.edit(content=latest)
+            else:
+                continue
+            shown = latest
+            last_edit = loop.time()
+    except asyncio.CancelledError:
+        # Superseded, half a reply to an old message is only noise
+        if sent is not None:
+            try:
+                await sent.delete()
+            except discord.HTTPException as e:
+                logging.warning(f"Error deleting superseded reply: {str(e)}")
+        raise
+    finally:
+        # Frees the model even if the task was cancelled between chunks
+        aclose = getattr(replies, "aclose", None)
+        if aclose is not None:
+            await aclose()
+    if latest and latest.strip() and latest != shown:
+        if sent is None:
+            sent = await channel.send(latest)
+        else:
+            await sent.edit(content=latest)
+    return sent
+
+
+async def working_on_it():
+    """A status line to show while a command runs, taken from the pool without waiting."""
+    return status_lines.take()
+
+
+async def _generate_status():
+    msg = await chat_llm_fast.invoke(
         [
             (
                 "user",
@@ -151,10 +236,13 @@ Example styles: "I'm working on it, relax.", "Hold your horses, speed racer.", "
             ),
         ]
     )
-    msg = response.content
     return msg
 
 
+# Kept topped up by a background task started with the bot
+status_lines = StatusLinePool(_generate_status, FALLBACK_STATUS_LINES)
+
+
 @traceable
 async def summarize_thread(
     thread: discord.Thread,
@@ -352,10 +440,7 @@ Notes:
         messages.append(HumanMessage(content=user_message))
 
         # Invoke the LLM for summarization - using the larger model for better summarization quality
-        response = chat_ollama_low_temp.invoke(messages)
-
-        # Return the summarized content
-        return response.content
+        return await chat_llm_low_temp.invoke(messages)
 
     except Exception as e:
         logging.error(f"Error summarizing thread: {str(e)}")
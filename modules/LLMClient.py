@@ -0,0 +1,323 @@
+# pyright: basic
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import re
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from langchain_core.language_models import BaseChatModel
+from langchain_ollama import ChatOllama
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://192.168.1.125:11434")
+
+# Longest a single generation may take before it's given up on
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "180"))
+
+# Generations run at once per model, more than one only helps if Ollama is set up
+# to serve requests in parallel
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "1"))
+
+
+class Priority(IntEnum):
+    """Order in which queued requests get the model, lowest first."""
+
+    INTERACTIVE = 0  # Someone is waiting on the reply in chat
+    STATUS = 1  # Status lines shown while other work runs
+    BATCH = 2  # Background work such as steward summaries
+
+
+class StaleRequestError(Exception):
+    """A request waited in the queue past its deadline and was dropped."""
+
+
+class _ModelQueue:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+
+    async def acquire(self, priority: int, max_wait: Optional[float]) -> None:
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        try:
+            await asyncio.wait_for(future, timeout=max_wait)
+        except asyncio.TimeoutError:
+            raise StaleRequestError(
+                f"Dropped after waiting {max_wait}s for the model"
+            ) from None
+        except asyncio.CancelledError:
+            # Handed the slot just as the wait was cancelled, pass it on
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < self.limit:
+            _, _, future = heapq.heappop(self._waiters)
+            # Waiters that gave up are left in the heap until they come up
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+
+class LLMScheduler:
+    """
+    Hands out the model server's capacity by priority.
+
+    Each model runs at most max_in_flight requests at once. Requests beyond that
+    wait in a priority queue, so a chat mention goes ahead of summaries that were
+    queued first, and requests that wait longer than they're still useful for are
+    dropped without ever reaching the model.
+    """
+
+    def __init__(self, max_in_flight: int = LLM_MAX_IN_FLIGHT):
+        self.max_in_flight = max_in_flight
+        self._queues: Dict[str, _ModelQueue] = {}
+
+    @asynccontextmanager
+    async def slot(
+        self, model: str, priority: int, max_wait: Optional[float] = None
+    ) -> AsyncIterator[None]:
+        """
+        Wait for a turn on a model, holding it for the duration of the block.
+
+        Args:
+            model: Name of the model, each has its own limit
+            priority: A Priority, lower goes first
+            max_wait: Seconds the request may wait for its turn, or None for no limit
+
+        Raises:
+            StaleRequestError: If the request waited longer than max_wait
+        """
+        queue = self._queues.get(model)
+        if queue is None:
+            queue = self._queues[model] = _ModelQueue(self.max_in_flight)
+        await queue.acquire(priority, max_wait)
+        try:
+            yield
+        finally:
+            queue.release()
+
+
+# One per process, since every client shares the same model server
+llm_scheduler = LLMScheduler()
+
+
+class LLMClient:
+    """
+    Async access to a chat model, shared by everything that talks to the LLM.
+
+    Generations are awaited with the model's native async API, so the event loop
+    keeps serving gateway heartbeats and other commands while the model server
+    is busy. Each request first waits for its turn from the scheduler, at the
+    client's priority.
+    """
+
+    def __init__(
+        self,
+        chat_model: BaseChatModel,
+        timeout: float = LLM_TIMEOUT,
+        priority: Priority = Priority.INTERACTIVE,
+        max_wait: Optional[float] = None,
+        scheduler: Optional[LLMScheduler] = llm_scheduler,
+        model_name: Optional[str] = None,
+    ):
+        """
+        Args:
+            chat_model: The model to generate with
+            timeout: Seconds a generation may take once it has started
+            priority: Priority of this client's requests
+            max_wait: Seconds a request may wait for its turn before it's dropped
+            scheduler: Scheduler to queue requests on, or None to send them directly
+            model_name: Name the scheduler limits requests under, defaults to the
+                chat model's model attribute
+        """
+        self.chat_model = chat_model
+        self.timeout = timeout
+        self.priority = priority
+        self.max_wait = max_wait
+        self.scheduler = scheduler
+        self.model_name = model_name or getattr(chat_model, "model", "default")
+
+    @asynccontextmanager
+    async def _turn(self) -> AsyncIterator[None]:
+        if self.scheduler is None:
+            yield
+            return
+        async with self.scheduler.slot(self.model_name, self.priority, self.max_wait):
+            yield
+
+    async def invoke(
+        self,
+        messages: List[Any],
+        timeout: Optional[float] = None,
+        schema: Optional[dict] = None,
+    ) -> str:
+        """
+        Generate a reply to a conversation.
+
+        Args:
+            messages: Anything the chat model accepts as input, usually a list of
+                messages or (role, content) tuples
+            timeout: Seconds to wait for the reply, defaults to the client's timeout
+            schema: JSON schema the reply must follow. Ollama enforces it while
+                sampling, so the reply is always valid JSON of that shape.
+
+        Returns:
+            The content of the generated message
+
+        Raises:
+            asyncio.TimeoutError: If the model didn't reply in time
+            StaleRequestError: If the request waited too long for its turn
+        """
+        async with self._turn():
+            try:
+                response = await asyncio.wait_for(
+                    self.chat_model.ainvoke(messages, **_format_kwargs(schema)),
+                    timeout=timeout or self.timeout,
+                )
+            except asyncio.TimeoutError:
+                logging.error(f"LLM request timed out after {timeout or self.timeout}s")
+                raise
+        return response.content
+
+    async def invoke_json(
+        self, messages: List[Any], schema: dict, timeout: Optional[float] = None
+    ) -> Any:
+        """Generate a reply constrained to a JSON schema and parse it."""
+        return json.loads(await self.invoke(messages, timeout=timeout, schema=schema))
+
+    async def stream(
+        self,
+        messages: List[Any],
+        timeout: Optional[float] = None,
+        schema: Optional[dict] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Generate a reply to a conversation, yielding its text as it's produced.
+
+        Args:
+            messages: Anything the chat model accepts as input
+            timeout: Seconds the whole reply may take, defaults to the client's timeout
+            schema: JSON schema the reply must follow, see invoke
+
+        Raises:
+            asyncio.TimeoutError: If the model didn't finish in time
+            StaleRequestError: If the request waited too long for its turn
+        """
+        timeout = timeout or self.timeout
+        loop = asyncio.get_running_loop()
+        async with self._turn():
+            deadline = loop.time() + timeout
+            chunks = self.chat_model.astream(
+                messages, **_format_kwargs(schema)
+            ).__aiter__()
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(
+                            chunks.__anext__(), timeout=max(deadline - loop.time(), 0)
+                        )
+                    except StopAsyncIteration:
+                        return
+                    except asyncio.TimeoutError:
+                        logging.error(f"LLM stream timed out after {timeout}s")
+                        raise
+                    if chunk.content:
+                        yield chunk.content
+            finally:
+                await chunks.aclose()
+
+
+def _format_kwargs(schema: Optional[dict]) -> dict:
+    # Ollama's structured output, other chat models are only ever used in tests
+    return {"format": schema} if schema is not None else {}
+
+
+_STRING_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+def partial_json_field(text: str, field: str) -> Optional[str]:
+    """
+    Read a string field out of JSON that is still being generated.
+
+    Args:
+        text: The start of a JSON object, possibly cut off anywhere
+        field: Name of the string field to read
+
+    Returns:
+        The field's value so far, or None if it hasn't started yet
+    """
+    match = re.search(rf'"{re.escape(field)}"\s*:\s*"', text)
+    if match is None:
+        return None
+    value = []
+    i = match.end()
+    while i < len(text):
+        char = text[i]
+        if char == '"':
+            break
+        if char == "\\":
+            if i + 1 >= len(text):
+                # Cut off in the middle of an escape
+                break
+            escaped = text[i + 1]
+            if escaped == "u":
+                try:
+                    value.append(json.loads(f'"{text[i:i + 6]}"'))
+                except ValueError:
+                    # Incomplete or malformed, wait for more text
+                    break
+                i += 6
+                continue
+            value.append(_STRING_ESCAPES.get(escaped, escaped))
+            i += 2
+            continue
+        value.append(char)
+        i += 1
+    return "".join(value)
+
+
+def ollama_client(
+    model: str,
+    temperature: float,
+    priority: Priority = Priority.INTERACTIVE,
+    max_wait: Optional[float] = None,
+    keep_alive: Optional[Union[str, float]] = None,
+) -> LLMClient:
+    """
+    Create a client for a model on the Ollama server, see LLMClient for the rest.
+
+    keep_alive is how long the server keeps the model loaded after each request,
+    as seconds or a duration such as "10m". Defaults to the server's setting.
+    """
+    return LLMClient(
+        ChatOllama(
+            base_url=OLLAMA_URL,
+            model=model,
+            temperature=temperature,
+            keep_alive=keep_alive,
+        ),
+        priority=priority,
+        max_wait=max_wait,
+    )
@@ -0,0 +1,66 @@
+# pyright: basic
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict
+
+import discord
+
+# Seconds to wait for more mentions before answering
+MENTION_WINDOW = 2.0
+
+
+class MentionDebouncer:
+    """
+    Answers bursts of mentions in a channel with a single reply.
+
+    A mention is only answered once the channel has gone a short window without
+    another one, and the reply is to the latest mention, with the earlier ones as
+    part of its history. A mention arriving while an earlier one is still being
+    answered cancels that answer, since it would reply to a conversation that has
+    already moved on.
+    """
+
+    def __init__(
+        self,
+        respond: Callable[[discord.Message], Awaitable[None]],
+        window: float = MENTION_WINDOW,
+    ):
+        """
+        Args:
+            respond: Answers a mention
+            window: Seconds to wait for more mentions before answering
+        """
+        self.respond = respond
+        self.window = window
+        # Channel ID to the task waiting on or answering its latest mention
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    def mention(self, message: discord.Message) -> None:
+        """Answer a mention, superseding any earlier one in its channel."""
+        channel_id = message.channel.id
+        previous = self._tasks.get(channel_id)
+        if previous is not None and not previous.done():
+            previous.cancel()
+        task = asyncio.get_running_loop().create_task(self._answer(message))
+        self._tasks[channel_id] = task
+        task.add_done_callback(lambda t: self._forget(channel_id, t))
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _answer(self, message: discord.Message) -> None:
+        try:
+            await asyncio.sleep(self.window)
+            await self.respond(message)
+        except asyncio.CancelledError:
+            logging.info(f"Answer to message {message.id} superseded")
+            raise
+        except Exception as e:
+            logging.error(f"Error answering message {message.id}: {str(e)}")
+
+    def _forget(self, channel_id: int, task: asyncio.Task) -> None:
+        if self._tasks.get(channel_id) is task:
+            del self._tasks[channel_id]
@@ -0,0 +1,134 @@
+# pyright: basic
+import json
+import logging
+from collections import OrderedDict
+from typing import List, Optional
+
+import discord
+
+# Messages kept per channel, as many as a chat response is given as context
+MESSAGES_PER_CHANNEL = 100
+# Channels kept at once, the least recently used one is dropped beyond this
+MAX_CHANNELS = 50
+
+
+def serialize_message(message: discord.Message) -> str:
+    """The compact JSON form messages are given to the chat model in."""
+    author = message.author
+    return json.dumps(
+        {
+            "user": getattr(author, "nick", None) or author.name,
+            "user_id": author.id,
+            "content": message.content,
+            "timestamp": message.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+    )
+
+
+class MessageCache:
+    """
+    Recent messages of each channel, already serialized for the chat model.
+
+    Fed from the gateway's message, raw edit and raw delete events, so answering a
+    mention needs no history requests. A channel's history is only fetched the
+    first time it's asked for, to fill in what was said before the bot started
+    listening, and again if the channel has since been evicted.
+    """
+
+    def __init__(
+        self, per_channel: int = MESSAGES_PER_CHANNEL, max_channels: int = MAX_CHANNELS
+    ):
+        self.per_channel = per_channel
+        self.max_channels = max_channels
+        # Channel ID to its messages by ID, oldest first. The outer dict is kept in
+        # least recently used order.
+        self.channels: OrderedDict[int, OrderedDict[int, str]] = OrderedDict()
+        # Channels whose history before the bot started listening has been fetched
+        self._backfilled: set = set()
+
+    def _channel(self, channel_id: int) -> OrderedDict:
+        messages = self.channels.get(channel_id)
+        if messages is None:
+            messages = self.channels[channel_id] = OrderedDict()
+            if len(self.channels) > self.max_channels:
+                evicted, _ = self.channels.popitem(last=False)
+                self._backfilled.discard(evicted)
+        else:
+            self.channels.move_to_end(channel_id)
+        return messages
+
+    def add(self, message: discord.Message) -> None:
+        messages = self._channel(message.channel.id)
+        try:
+            messages[message.id] = serialize_message(message)
+        except Exception as e:
+            logging.warning(f"Not caching message {message.id}: {str(e)}")
+            return
+        while len(messages) > self.per_channel:
+            messages.popitem(last=False)
+
+    def edit(self, channel_id: int, message_id: int, content: str) -> None:
+        """Replace the content of a cached message, ignoring ones that aren't cached."""
+        messages = self.channels.get(channel_id)
+        if messages is None or message_id not in messages:
+            return
+        entry = json.loads(messages[message_id])
+        entry["content"] = content
+        messages[message_id] = json.dumps(entry)
+
+    def delete(self, channel_id: int, message_id: int) -> None:
+        messages = self.channels.get(channel_id)
+        if messages is not None:
+            messages.pop(message_id, None)
+
+    async def history(
+        self, before: discord.Message, limit: Optional[int] = None
+    ) -> List[str]:
+        """
+        Get the serialized messages sent in a message's channel before it, oldest first.
+
+        Args:
+            before: Only messages sent before this one are returned
+            limit: Maximum number of messages, defaults to per_channel
+
+        Returns:
+            A list of messages in the form of serialize_message
+        """
+        limit = limit or self.per_channel
+        if before.channel.id not in self._backfilled:
+            await self._backfill(before)
+        messages = self._channel(before.channel.id)
+        earlier = [
+            serialized
+            for message_id, serialized in messages.items()
+            if message_id < before.id
+        ]
+        return earlier[-limit:]
+
+    async def _backfill(self, before: discord.Message) -> None:
+        try:
+            fetched = [
+                m
+                async for m in before.channel.history(
+                    limit=self.per_channel, before=before
+                )
+            ]
+        except Exception as e:
+            logging.error(
+                f"Error fetching history of channel {before.channel.id}: {str(e)}"
+            )
+            return
+
+        messages = self._channel(before.channel.id)
+        for message in fetched:
+            # Messages received from the gateway are already up to date
+            if message.id in messages:
+                continue
+            try:
+                messages[message.id] = serialize_message(message)
+            except Exception as e:
+                logging.warning(f"Not caching message {message.id}: {str(e)}")
+        # Snowflake IDs sort by creation time
+        ordered = OrderedDict(sorted(messages.items())[-self.per_channel :])
+        self.channels[before.channel.id] = ordered
+        self._backfilled.add(before.channel.id)
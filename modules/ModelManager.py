@@ -0,0 +1,169 @@
+# pyright: basic
+import asyncio
+import datetime
+import logging
+import os
+from typing import Dict, List, Optional, Tuple, Union
+
+import ollama
+import pytz
+
+from modules.LLMClient import OLLAMA_URL
+
+# When the league is racing, as comma separated "<day> <start>-<end>" in local
+# hours of LEAGUE_TIMEZONE, e.g. "mon 19-23,thu 19-23". The day may be "daily".
+LEAGUE_HOURS = os.getenv("LEAGUE_HOURS", "daily 18-24")
+LEAGUE_TIMEZONE = os.getenv("LEAGUE_TIMEZONE", "America/New_York")
+
+# Seconds between keep-alive pings during league hours
+PING_INTERVAL = 5 * 60
+
+# How long a ping keeps a model loaded, comfortably longer than PING_INTERVAL
+LEAGUE_KEEP_ALIVE = "15m"
+
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+KeepAlive = Union[str, float]
+
+
+def parse_league_hours(spec: str) -> List[Tuple[int, int, int]]:
+    """
+    Parse a LEAGUE_HOURS string.
+
+    Returns:
+        (weekday, start hour, end hour) for every day, Monday being 0
+
+    Raises:
+        ValueError: If the string isn't in the LEAGUE_HOURS format
+    """
+    windows = []
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        try:
+            day, hours = part.split()
+            start, end = (int(hour) for hour in hours.split("-"))
+        except ValueError:
+            raise ValueError(f"Expected '<day> <start>-<end>', got '{part.strip()}'")
+        if not 0 <= start < end <= 24:
+            raise ValueError(f"Invalid hours in '{part.strip()}'")
+        day = day.lower()[:3]
+        if day == "dai":
+            windows.extend((weekday, start, end) for weekday in range(7))
+        elif day in DAYS:
+            windows.append((DAYS.index(day), start, end))
+        else:
+            raise ValueError(f"Unknown day in '{part.strip()}'")
+    return windows
+
+
+class ModelManager:
+    """
+    Keeps the chat models loaded on the Ollama server when they're needed.
+
+    Ollama unloads a model once it has gone unused for its keep-alive, and the
+    next request then waits seconds for it to load again. The manager loads every
+    model when the bot starts, and during league hours pings them often enough
+    that they're never unloaded. Pinging starts one interval ahead of the league
+    hours, so the models are already loaded when racing starts.
+    """
+
+    def __init__(
+        self,
+        keep_alive: Dict[str, KeepAlive],
+        league_hours: str = LEAGUE_HOURS,
+        timezone: str = LEAGUE_TIMEZONE,
+        ping_interval: float = PING_INTERVAL,
+        client: Optional[ollama.AsyncClient] = None,
+    ):
+        """
+        Args:
+            keep_alive: How long each model stays loaded after a request outside
+                league hours, by model name
+            league_hours: When models are kept loaded, see LEAGUE_HOURS
+            timezone: IANA timezone of league_hours
+            ping_interval: Seconds between pings during league hours
+            client: Ollama client, defaults to one for OLLAMA_URL
+        """
+        self.keep_alive = keep_alive
+        self.league_hours = parse_league_hours(league_hours)
+        self.timezone = pytz.timezone(timezone)
+        self.ping_interval = ping_interval
+        self.client = client or ollama.AsyncClient(host=OLLAMA_URL)
+        self._task: Optional[asyncio.Task] = None
+
+    def in_league_hours(self, now: Optional[datetime.datetime] = None) -> bool:
+        """Whether an aware datetime, by default now, falls in league hours."""
+        now = (now or datetime.datetime.now(pytz.utc)).astimezone(self.timezone)
+        return any(
+            now.weekday() == weekday and start <= now.hour < end
+            for weekday, start, end in self.league_hours
+        )
+
+    async def warm(self, model: str, keep_alive: KeepAlive) -> bool:
+        """
+        Load a model without generating anything.
+
+        Returns:
+            False if the model couldn't be loaded
+        """
+        try:
+            # A request without a prompt only loads the model
+            await self.client.generate(model=model, keep_alive=keep_alive)
+        except Exception as e:
+            logging.warning(f"Error loading model {model}: {str(e)}")
+            return False
+        return True
+
+    async def warm_all(self, keep_alive: Optional[KeepAlive] = None) -> List[str]:
+        """
+        Load every model, keeping them for keep_alive or their own keep-alive.
+
+        Returns:
+            Models that were loaded
+        """
+        models = list(self.keep_alive)
+        loaded = await asyncio.gather(
+            *(
+                self.warm(model, keep_alive or self.keep_alive[model])
+                for model in models
+            )
+        )
+        return [model for model, ok in zip(models, loaded) if ok]
+
+    async def ping(self, now: Optional[datetime.datetime] = None) -> List[str]:
+        """
+        Keep every model loaded if it's league hours, or will be by the next ping.
+
+        Returns:
+            Models that were pinged
+        """
+        now = now or datetime.datetime.now(pytz.utc)
+        ahead = now + datetime.timedelta(seconds=self.ping_interval)
+        if not (self.in_league_hours(now) or self.in_league_hours(ahead)):
+            return []
+        return await self.warm_all(LEAGUE_KEEP_ALIVE)
+
+    def start(self) -> None:
+        """Load the models and start pinging them. Safe to call repeatedly."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loaded = await self.warm_all()
+        logging.info(f"Loaded models: {', '.join(loaded) or 'none'}")
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            try:
+                await self.ping()
+            except Exception as e:
+                logging.error(f"Error pinging models: {str(e)}")
@@ -0,0 +1,103 @@
+# pyright: basic
+import errno
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import urllib.parse
+from typing import List, Optional, Tuple
+
+# Rendered spins waiting for their scheduled time, on the same volume as the
+# scheduler database
+PRERENDER_DIR = os.getenv("PRERENDER_DIR", "data/prerender")
+
+
+class PrerenderCache:
+    """
+    Spins rendered ahead of their scheduled time, one directory per event key.
+
+    Each entry holds the wheel GIFs in spin order plus the response text of every
+    wheel, so posting the spin is only an upload.
+    """
+
+    def __init__(self, directory: str = PRERENDER_DIR):
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, urllib.parse.quote(key, safe=""))
+
+    def save(self, key: str, gifs: List[io.BytesIO], responses: List[str]) -> bool:
+        """
+        Save a rendered spin, unless there already is one for the key.
+
+        Every process prerenders the spins it sees coming up, each its own random
+        spin, so the first one saved is kept and later ones are dropped. The GIFs
+        and responses of an entry therefore always come from the same render.
+
+        Returns:
+            False if a spin was already saved for the key
+        """
+        path = self._path(key)
+        os.makedirs(self.directory, exist_ok=True)
+        # Write into a directory of our own then rename it into place, so a crash
+        # or another process saving the same key never leaves a mixed up spin
+        tmp_path = tempfile.mkdtemp(
+            dir=self.directory, prefix=os.path.basename(path) + ".", suffix=".tmp"
+        )
+        try:
+            for i, gif in enumerate(gifs):
+                with open(os.path.join(tmp_path, f"{i}.gif"), "wb") as fh:
+                    fh.write(gif.getvalue())
+            with open(os.path.join(tmp_path, "spin.json"), "w") as fh:
+                json.dump({"wheels": len(gifs), "responses": responses}, fh)
+            os.rename(tmp_path, path)
+        except OSError as e:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            # Renaming onto a saved spin fails, since its directory isn't empty
+            if e.errno in (errno.EEXIST, errno.ENOTEMPTY):
+                logging.info(f"Prerendered spin {key} was already saved")
+                return False
+            raise
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        logging.info(f"Saved prerendered spin {key}")
+        return True
+
+    def load(self, key: str) -> Optional[Tuple[List[io.BytesIO], List[str]]]:
+        """Load the GIFs and responses of a prerendered spin, or None if there isn't one."""
+        path = self._path(key)
+        if not os.path.isdir(path):
+            return None
+        try:
+            with open(os.path.join(path, "spin.json")) as fh:
+                spin = json.load(fh)
+            gifs = []
+            for i in range(spin["wheels"]):
+                with open(os.path.join(path, f"{i}.gif"), "rb") as fh:
+                    gifs.append(io.BytesIO(fh.read()))
+            return gifs, spin["responses"]
+        except Exception as e:
+            logging.error(f"Error loading prerendered spin {key}: {str(e)}")
+            return None
+
+    def discard(self, key: str) -> None:
+        shutil.rmtree(self._path(key), ignore_errors=True)
+
+    def prune(self, max_age: float) -> int:
+        """Delete spins rendered more than max_age seconds ago, returning how many."""
+        if not os.path.isdir(self.directory):
+            return 0
+        cutoff = time.time() - max_age
+        pruned = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+                pruned += 1
+        if pruned:
+            logging.info(f"Pruned {pruned} stale prerendered spins")
+        return pruned
@@ -0,0 +1,125 @@
+# pyright: basic
+import functools
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class FilterPlan:
+    """A preset filter string compiled into pandas queries and column directives."""
+
+    filter_string: str
+    queries: Tuple[str, ...]
+    weighting: Optional[str] = None
+    on_select: Optional[str] = None
+    response_text: Optional[str] = None
+    last_filter: str = ""  # Kept for the "returned no results" message
+
+    def apply(self, df: pd.DataFrame) -> List[dict]:
+        """
+        Evaluate the plan against a tab whose columns are already lowercased.
+
+        Returns:
+            A list of dicts with option, weight, on_select and include_text keys
+        """
+        filtereddf = df
+        for query_string in self.queries:
+            try:
+                filtereddf = filtereddf.query(query_string)
+            except Exception as e:
+                logging.error(f"Error processing filter {query_string}: {str(e)}")
+                raise Exception(f"Something is wrong with one of your filters.") from e
+        if filtereddf.empty:
+            raise Exception(f"Your filter {self.last_filter} returned no results")
+        return [
+            {
+                "option": selection["fullname"],
+                "weight": (
+                    1 if self.weighting is None else int(selection[self.weighting])
+                ),
+                "on_select": (
+                    None if self.on_select is None else selection[self.on_select]
+                ),
+                "include_text": (
+                    None
+                    if self.response_text is None
+                    else selection[self.response_text]
+                ),
+            }
+            for selection in filtereddf.to_dict("records")
+        ]
+
+
+def _condition(option: str) -> Optional[str]:
+    """Translate a single `column<op>value` filter into a pandas query expression."""
+    if option.find("<>") > 0:
+        a = option.split("<>")
+        return f"not `{a[0].strip(' ')}`.astype('string').str.lower().str.contains('{a[1].strip(' ')}')"
+    elif option.find(">=") > 0:
+        a = option.split(">=")
+        return f"`{a[0].strip(' ')}`>={a[1].strip(' ')}"
+    elif option.find("<=") > 0:
+        a = option.split("<=")
+        return f"`{a[0].strip(' ')}`<={a[1].strip(' ')}"
+    elif option.find("<") > 0:
+        a = option.split("<")
+        return f"`{a[0].strip(' ')}`<{a[1].strip(' ')}"
+    elif option.find(">") > 0:
+        a = option.split(">")
+        return f"`{a[0].strip(' ')}`>{a[1].strip(' ')}"
+    elif option.find(":") > 0:
+        a = option.split(":")
+        return f"`{a[0].strip(' ')}`.astype('string').str.lower().str.contains('{a[1].strip(' ')}')"
+    elif option.find("=") > 0:
+        a = option.split("=")
+        return f"`{str(a[0].strip(' '))}`.astype('string').str.lower()=='{a[1].strip(' ')}'"
+    return None
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_filter(filter_string: str = "") -> FilterPlan:
+    """
+    Compile a preset filter string such as `class=gt3,length>=5,!weight=w`.
+
+    Plans are immutable and cached, so the same filter string is only parsed once.
+    """
+    filter_string = filter_string.strip(" ").lower()
+    filters = filter_string.split(",")
+    filter_queries = []
+    weighting = None
+    on_select = None
+    response_text = None
+    for filter in filters:
+        try:
+            if filter.find("|") > 0:
+                or_query = [
+                    condition
+                    for condition in map(_condition, filter.split("|"))
+                    if condition is not None
+                ]
+                filter_queries.append(" | ".join(or_query))
+            elif filter.find("!weight=") >= 0:
+                weighting = filter.split("=")[1]
+            elif filter.find("!onselect=") >= 0:
+                on_select = filter.split("=")[1]
+            elif filter.find("!response=") >= 0:
+                response_text = filter.split("=")[1]
+            else:
+                condition = _condition(filter)
+                if condition is not None:
+                    filter_queries.append(condition)
+        except Exception as e:
+            logging.error(f"Error processing filter {filter}: {str(e)}")
+            raise Exception(f"One of your filters is not properly formatted") from e
+
+    return FilterPlan(
+        filter_string=filter_string,
+        queries=tuple(filter_queries),
+        weighting=weighting,
+        on_select=on_select,
+        response_text=response_text,
+        last_filter=filters[-1],
+    )
@@ -0,0 +1,96 @@
+# pyright: basic
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+# Discord never shows more than 25 autocomplete choices
+MAX_CHOICES = 25
+
+
+class _TrieNode:
+    __slots__ = ("children", "completions")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.completions: List[str] = []
+
+
+class PresetIndex:
+    """
+    Case-insensitive prefix index of preset names and their tabs.
+
+    Every trie node keeps the first MAX_CHOICES names below it (in sheet order),
+    so an autocomplete lookup is a walk of the typed prefix and nothing else.
+    The index is immutable between rebuilds and never touches the network.
+    """
+
+    def __init__(self, presets: Optional[Iterable[Tuple[str, List[str]]]] = None):
+        self._root = _TrieNode()
+        self._tabs: Dict[str, List[str]] = {}
+        self._names: Dict[str, str] = {}
+        if presets:
+            self.rebuild(presets)
+
+    @classmethod
+    def from_dataframe(cls, presets_df: pd.DataFrame) -> "PresetIndex":
+        index = cls()
+        index.rebuild_from_dataframe(presets_df)
+        return index
+
+    def rebuild_from_dataframe(self, presets_df: pd.DataFrame) -> None:
+        """Rebuild the index from the presets sheet (one row per preset, one column per tab)."""
+        presets = []
+        for record in presets_df.to_dict("records"):
+            name = record.get("Fullname")
+            if not isinstance(name, str) or not name.strip():
+                continue
+            tabs = [
+                k for k, v in record.items() if isinstance(v, str) and k != "Fullname"
+            ]
+            presets.append((name, tabs))
+        self.rebuild(presets)
+
+    def rebuild(self, presets: Iterable[Tuple[str, List[str]]]) -> None:
+        """Replace the contents of the index with the given (name, tabs) pairs."""
+        root = _TrieNode()
+        tabs: Dict[str, List[str]] = {}
+        names: Dict[str, str] = {}
+        for name, preset_tabs in presets:
+            key = name.lower()
+            if key in names:
+                logging.warning(f"Duplicate preset name {name} ignored in index")
+                continue
+            names[key] = name
+            tabs[key] = list(preset_tabs)
+            node = root
+            if len(node.completions) < MAX_CHOICES:
+                node.completions.append(name)
+            for char in key:
+                node = node.children.setdefault(char, _TrieNode())
+                if len(node.completions) < MAX_CHOICES:
+                    node.completions.append(name)
+        # Swap everything in at once so lookups never see a half-built index
+        self._root, self._tabs, self._names = root, tabs, names
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def search(self, prefix: Optional[str] = "") -> List[str]:
+        """Return up to MAX_CHOICES preset names starting with prefix, case-insensitive."""
+        node = self._root
+        for char in (prefix or "").lower():
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return list(node.completions)
+
+    def get_name(self, preset_name: str) -> Optional[str]:
+        """Return the canonical spelling of a preset name, or None if it doesn't exist."""
+        return self._names.get((preset_name or "").lower())
+
+    def get_tabs(self, preset_name: str, prefix: Optional[str] = "") -> List[str]:
+        """Return the non-empty tabs of a preset starting with prefix, case-insensitive."""
+        tabs = self._tabs.get((preset_name or "").lower(), [])
+        prefix = (prefix or "").lower()
+        return [tab for tab in tabs if tab.lower().startswith(prefix)][:MAX_CHOICES]
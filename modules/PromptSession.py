@@ -0,0 +1,96 @@
+# pyright: basic
+import logging
+from collections import OrderedDict
+from typing import List, Optional
+
+from modules.MessageCache import MAX_CHANNELS
+from modules.TokenCounter import TokenCounter, token_counter
+
+# History tokens a prompt may hold before the session starts over
+MAX_HISTORY_TOKENS = 1000
+# History tokens kept when a session starts over. The gap to MAX_HISTORY_TOKENS is
+# how much conversation fits before the prefix changes again.
+RESET_HISTORY_TOKENS = 600
+
+
+class PromptSession:
+    """
+    The history one channel's prompts are built from.
+
+    Ollama reuses the work done for the longest prefix a prompt shares with the one
+    before it, so a prompt only costs the tokens that come after that. Trimming the
+    history to the newest messages on every request would shift the start of the
+    prompt with each new message and nothing would be reused. A session instead
+    keeps the messages it has prompted with and only appends to them, so the
+    persona and older history stay byte for byte the same across mentions. Once
+    the history outgrows max_tokens the session starts over from the newest
+    messages that fit in reset_tokens, and is stable again from there.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = MAX_HISTORY_TOKENS,
+        reset_tokens: int = RESET_HISTORY_TOKENS,
+        counter: TokenCounter = token_counter,
+    ):
+        self.max_tokens = max_tokens
+        self.reset_tokens = reset_tokens
+        self.counter = counter
+        self.messages: List[str] = []
+        self.tokens = 0
+
+    def update(self, history: List[str]) -> List[str]:
+        """
+        Bring the session up to date with a channel's history.
+
+        Args:
+            history: The channel's messages serialized by MessageCache, oldest first
+
+        Returns:
+            The history to prompt with, oldest first
+        """
+        new = self._new_messages(history)
+        if new is not None:
+            tokens = self.tokens + sum(self.counter.count(m) for m in new)
+            if tokens <= self.max_tokens:
+                self.messages.extend(new)
+                self.tokens = tokens
+                return list(self.messages)
+
+        self.messages = self.counter.trim_to_budget(history, self.reset_tokens)
+        self.tokens = sum(self.counter.count(m) for m in self.messages)
+        logging.debug(f"Prompt session restarted with {len(self.messages)} messages")
+        return list(self.messages)
+
+    def _new_messages(self, history: List[str]) -> Optional[List[str]]:
+        # Messages after the session's, or None if the session's messages were
+        # edited, deleted or dropped from the history since
+        if not self.messages:
+            return None
+        try:
+            start = history.index(self.messages[0])
+        except ValueError:
+            return None
+        end = start + len(self.messages)
+        if history[start:end] != self.messages:
+            return None
+        return history[end:]
+
+
+class PromptSessions:
+    """A PromptSession per channel, dropping the least recently used channel."""
+
+    def __init__(self, max_channels: int = MAX_CHANNELS, **session_args):
+        self.max_channels = max_channels
+        self.session_args = session_args
+        self.sessions: OrderedDict[int, PromptSession] = OrderedDict()
+
+    def get(self, channel_id: int) -> PromptSession:
+        session = self.sessions.get(channel_id)
+        if session is None:
+            session = self.sessions[channel_id] = PromptSession(**self.session_args)
+            if len(self.sessions) > self.max_channels:
+                self.sessions.popitem(last=False)
+        else:
+            self.sessions.move_to_end(channel_id)
+        return session
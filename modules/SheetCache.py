@@ -0,0 +1,183 @@
+# pyright: basic
+import asyncio
+import io
+import logging
+import os
+import tempfile
+import urllib.parse
+from typing import Callable, Dict, Optional
+
+import aiohttp
+import pandas as pd
+import pyarrow.feather as feather
+
+# Keep-alive pool shared by every sheet fetch, so only the first request pays for
+# DNS, TCP and TLS setup to docs.google.com
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=20, connect=5)
+MAX_CONNECTIONS = 8
+KEEPALIVE_SECONDS = 120
+
+# Last-known-good copies of every tab, on the same volume as the scheduler database
+SNAPSHOT_DIR = os.getenv("SHEET_SNAPSHOT_DIR", "data/sheets")
+
+
+class NoTabError(Exception):
+    pass
+
+
+class SheetCache:
+    """
+    Last fetched copy of each Google Sheet tab, keyed by lowercased tab name.
+
+    Cached frames have their columns lowercased once on fetch and must be
+    treated as read-only, since the same frame is shared between spins.
+
+    Every successful download is also written to a Feather snapshot, which is
+    loaded at startup and served in place of the sheet when Google is unreachable.
+    """
+
+    def __init__(
+        self, url_for: Callable[[str], str], snapshot_dir: Optional[str] = SNAPSHOT_DIR
+    ):
+        self.url_for = url_for
+        self.snapshot_dir = snapshot_dir
+        self.tabs: Dict[str, pd.DataFrame] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # Created lazily because a ClientSession has to be made inside the running loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=REQUEST_TIMEOUT,
+                connector=aiohttp.TCPConnector(
+                    limit=MAX_CONNECTIONS,
+                    keepalive_timeout=KEEPALIVE_SECONDS,
+                    ttl_dns_cache=300,
+                ),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def read(self, tab: str) -> pd.DataFrame:
+        """
+        Download a tab as CSV and parse it from memory, without caching it.
+
+        Falls back to the tab's snapshot if the download fails.
+        """
+        try:
+            async with self.session.get(self.url_for(tab)) as response:
+                response.raise_for_status()
+                body = await response.read()
+        except Exception as e:
+            df = await asyncio.to_thread(self.load_snapshot, tab)
+            if df is None:
+                raise
+            logging.warning(f"Serving tab {tab} from snapshot: {str(e)}")
+            return df
+        df = pd.read_csv(io.BytesIO(body))
+        if list(df.columns.values) == ["FALSE"]:
+            raise NoTabError(f"Tab {tab} not found")
+        await asyncio.to_thread(self.save_snapshot, tab, df)
+        return df
+
+    def _snapshot_path(self, tab: str) -> str:
+        return os.path.join(
+            self.snapshot_dir, urllib.parse.quote(tab.lower(), safe="") + ".feather"
+        )
+
+    def save_snapshot(self, tab: str, df: pd.DataFrame) -> None:
+        if not self.snapshot_dir:
+            return
+        path = self._snapshot_path(tab)
+        tmp_path = None
+        try:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            # Write then rename, so a crash never leaves a half-written snapshot. Each
+            # writer gets its own temporary file, overlapping saves of a tab would
+            # otherwise interleave in one.
+            with tempfile.NamedTemporaryFile(
+                dir=self.snapshot_dir,
+                prefix=os.path.basename(path) + ".",
+                suffix=".tmp",
+                delete=False,
+            ) as fh:
+                tmp_path = fh.name
+                df.to_feather(fh)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logging.error(f"Error saving snapshot of tab {tab}: {str(e)}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def load_snapshot(self, tab: str) -> Optional[pd.DataFrame]:
+        """Load a tab exactly as it was last downloaded, or None if there's no snapshot."""
+        if not self.snapshot_dir:
+            return None
+        path = self._snapshot_path(tab)
+        if not os.path.exists(path):
+            return None
+        try:
+            return feather.read_table(path, memory_map=True).to_pandas()
+        except Exception as e:
+            logging.error(f"Error loading snapshot of tab {tab}: {str(e)}")
+            return None
+
+    def load_snapshots(self) -> int:
+        """Fill the cache from every snapshot on disk, returning how many were loaded."""
+        if not self.snapshot_dir or not os.path.isdir(self.snapshot_dir):
+            return 0
+        loaded = 0
+        for filename in os.listdir(self.snapshot_dir):
+            if not filename.endswith(".feather"):
+                continue
+            tab = urllib.parse.unquote(filename[: -len(".feather")])
+            df = self.load_snapshot(tab)
+            if df is None:
+                continue
+            df.columns = df.columns.str.lower()
+            self.tabs[tab] = df
+            loaded += 1
+        logging.info(f"Loaded {loaded} sheet snapshots from {self.snapshot_dir}")
+        return loaded
+
+    async def fetch(self, tab: str) -> pd.DataFrame:
+        """
+        Fetch a tab from the sheet and cache it.
+
+        Concurrent fetches of the same tab share a single request.
+        """
+        key = tab.lower()
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(tab))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one caller giving up doesn't cancel the request for the others
+        return await asyncio.shield(future)
+
+    async def _fetch(self, tab: str) -> pd.DataFrame:
+        try:
+            df = await self.read(tab)
+        except NoTabError as e:
+            raise e
+        except Exception as e:
+            logging.error(f"Error processing tab {tab}: {str(e)}")
+            raise e
+        df.columns = df.columns.str.lower()
+        self.tabs[tab.lower()] = df
+        return df
+
+    def cached(self, tab: str) -> Optional[pd.DataFrame]:
+        return self.tabs.get(tab.lower())
+
+    async def get(self, tab: str) -> pd.DataFrame:
+        """Return the cached copy of a tab, fetching it on first use."""
+        df = self.cached(tab)
+        if df is None:
+            df = await self.fetch(tab)
+        return df
@@ -0,0 +1,106 @@
+# pyright: basic
+import asyncio
+import logging
+import random
+from collections import deque
+from typing import Awaitable, Callable, Optional, Sequence
+
+# Lines kept ready, enough for a burst of commands
+POOL_SIZE = 10
+
+# Seconds to wait before generating again after the model failed
+RETRY_DELAY = 60.0
+
+# Generated lines longer than this are not status lines, the model rambled
+MAX_LINE_LENGTH = 120
+
+
+class StatusLinePool:
+    """
+    Status lines generated ahead of time, so commands can show one instantly.
+
+    A background task keeps the pool topped up, generating a new line whenever one
+    is taken. If the pool runs dry, or the model can't be reached, a line from the
+    fallback list is used instead.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[], Awaitable[str]],
+        fallbacks: Sequence[str],
+        size: int = POOL_SIZE,
+        retry_delay: float = RETRY_DELAY,
+    ):
+        """
+        Args:
+            generate: Generates one status line
+            fallbacks: Lines to use when there are no generated ones
+            size: Number of lines to keep ready
+            retry_delay: Seconds to wait after generate fails before trying again
+        """
+        self.generate = generate
+        self.fallbacks = list(fallbacks)
+        self.size = size
+        self.retry_delay = retry_delay
+        self.lines: deque = deque()
+        self._wanted = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def take(self) -> str:
+        """Get a status line, never waiting on the model."""
+        self._wanted.set()
+        if self.lines:
+            return self.lines.popleft()
+        return random.choice(self.fallbacks)
+
+    def start(self) -> None:
+        """Start filling the pool. Safe to call repeatedly."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def fill(self) -> bool:
+        """
+        Generate lines until the pool is full.
+
+        Returns:
+            False if generating failed before the pool was full
+        """
+        # Unusable or repeated lines count too, so a model that keeps producing
+        # them isn't asked forever
+        for _ in range(2 * self.size):
+            if len(self.lines) >= self.size:
+                return True
+            try:
+                line = _clean(await self.generate())
+            except Exception as e:
+                logging.warning(f"Error generating status line: {str(e)}")
+                return False
+            if line and line not in self.lines:
+                self.lines.append(line)
+        return len(self.lines) >= self.size
+
+    async def _run(self) -> None:
+        while True:
+            self._wanted.clear()
+            if not await self.fill():
+                await asyncio.sleep(self.retry_delay)
+                continue
+            await self._wanted.wait()
+
+
+def _clean(line: str) -> Optional[str]:
+    # Small models like to add quotes or a second line despite being told not to
+    lines = line.strip().splitlines()
+    line = lines[0].strip().strip("\"'").strip() if lines else ""
+    if not line or len(line) > MAX_LINE_LENGTH:
+        return None
+    return line
@@ -0,0 +1,108 @@
+# pyright: basic
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from typing import List
+
+# Tokenizer saved into the image at build time, so nothing is downloaded at runtime
+TOKENIZER_PATH = os.getenv("TOKENIZER_PATH", "/opt/tokenizer")
+
+# Counts remembered, enough for every message the MessageCache holds
+CACHE_SIZE = 5000
+
+# Tokens a message costs beyond its text, for the role prefix
+MESSAGE_OVERHEAD = 2
+
+# Rough characters per token, used until the tokenizer is loaded or if it's missing
+CHARS_PER_TOKEN = 4
+
+
+class TokenCounter:
+    """
+    Counts the tokens of chat messages, remembering the count of each message.
+
+    Chat history is mostly the same messages from one mention to the next, so
+    each one is normally tokenized once. Counts are keyed by the serialized
+    message, so an edited message is counted again.
+    """
+
+    def __init__(
+        self, tokenizer_path: str = TOKENIZER_PATH, cache_size: int = CACHE_SIZE
+    ):
+        self.tokenizer_path = tokenizer_path
+        self.cache_size = cache_size
+        self.tokenizer = None
+        self._counts: OrderedDict[str, int] = OrderedDict()
+
+    def load(self) -> bool:
+        """
+        Load the tokenizer from tokenizer_path. Safe to call repeatedly.
+
+        Returns:
+            False if there's no tokenizer there, counts are then estimated
+        """
+        if self.tokenizer is not None:
+            return True
+        try:
+            from transformers import AutoTokenizer
+
+            self.tokenizer = AutoTokenizer.from_pretrained(
+                self.tokenizer_path, local_files_only=True
+            )
+        except Exception as e:
+            logging.warning(
+                f"No tokenizer at {self.tokenizer_path}, estimating token counts: {str(e)}"
+            )
+            return False
+        # Estimates made before the tokenizer was available
+        self._counts.clear()
+        logging.info(f"Loaded tokenizer from {self.tokenizer_path}")
+        return True
+
+    async def load_async(self) -> bool:
+        """load, off the event loop."""
+        return await asyncio.to_thread(self.load)
+
+    def count(self, text: str) -> int:
+        """Count the tokens of one message, including MESSAGE_OVERHEAD."""
+        tokens = self._counts.get(text)
+        if tokens is not None:
+            self._counts.move_to_end(text)
+            return tokens
+        if self.tokenizer is not None:
+            tokens = len(self.tokenizer.encode(text, verbose=False))
+        else:
+            tokens = -(-len(text) // CHARS_PER_TOKEN)
+        tokens += MESSAGE_OVERHEAD
+        self._counts[text] = tokens
+        if len(self._counts) > self.cache_size:
+            self._counts.popitem(last=False)
+        return tokens
+
+    def trim_to_budget(self, messages: List[str], max_tokens: int) -> List[str]:
+        """
+        Get the most recent messages that fit in a token budget.
+
+        Messages are counted newest first and counting stops at the first one that
+        doesn't fit, so older messages are never tokenized.
+
+        Args:
+            messages: Messages oldest first
+            max_tokens: Token budget for the returned messages
+
+        Returns:
+            The newest messages that fit, oldest first
+        """
+        total = 0
+        start = len(messages)
+        for i in range(len(messages) - 1, -1, -1):
+            total += self.count(messages[i])
+            if total > max_tokens:
+                break
+            start = i
+        return messages[start:]
+
+
+# Shared by everything that prompts the chat model, loaded when the bot starts
+token_counter = TokenCounter()
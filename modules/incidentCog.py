@@ -7,38 +7,15 @@ from typing import Dict, List, Optional, Tuple
 
 import discord
 import pytz
-from discord.ext import commands, tasks
+from discord.ext import commands
 
 from modules import ChatHandler
-from modules.scheduler import (
-    get_pending_events,
-    init_db,
-    mark_event_completed,
-    schedule_event,
-)
+from modules.scheduler import dispatcher, schedule_event
 
 # Global dictionary to store example summaries
 SUMMARY_EXAMPLES: Dict[str, Tuple[int, int]] = {}
 
 
-# Initialize the database
-def ensure_db_initialized():
-    try:
-        # Make sure the data directory exists
-        os.makedirs(
-            os.path.dirname(
-                os.getenv("DATABASE_URL", "sqlite:///data/spinny.db").replace(
-                    "sqlite://", ""
-                )
-            ),
-            exist_ok=True,
-        )
-        init_db()
-        logging.info("Scheduler database initialized successfully")
-    except Exception as ex:
-        logging.error(f"Failed to initialize scheduler database: {str(ex)}")
-
-
 # Load summary examples
 def load_summary_examples():
     examples_file_path = "summary_examples.txt"
@@ -61,17 +38,12 @@ def load_summary_examples():
         logging.error(f"Error loading summary examples: {str(ex)}")
 
 
-# Ensure the DB is initialized at startup
-ensure_db_initialized()
-
-# Load summary examples
-load_summary_examples()
-
-
 class IncidentCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.check_scheduled_events.start()
+        load_summary_examples()
+        # Summarizing a long thread with the LLM can take a while
+        dispatcher.register("close_poll", self.run_close_poll, timeout=900)
 
     async def fetch_example_summary(self) -> Optional[Tuple[List[dict], str]]:
         """
@@ -148,29 +120,9 @@ class IncidentCog(commands.Cog):
             logging.error(f"Error fetching example summary: {str(ex)}")
             return None
 
-    @tasks.loop(minutes=1)
-    async def check_scheduled_events(self):
-        """Check for pending scheduled events every minute and execute them."""
-        # Get pending events
-        events = get_pending_events()
-
-        for event in events:
-            try:
-                # Process the event
-                logging.info(
-                    f"Processing scheduled event: {event.function_name} for message {event.message_id}"
-                )
-
-                if event.function_name == "close_poll":
-                    await self.close_poll(
-                        event.channel_id, event.message_id, event.data
-                    )
-                    # Add more function handlers here as needed
-
-                    # Mark the event as completed
-                    mark_event_completed(event.id)
-            except Exception as ex:
-                logging.error(f"Error processing event {event.id}: {str(ex)}")
+    async def run_close_poll(self, event):
+        """Dispatcher handler for close_poll events."""
+        await self.close_poll(event.channel_id, event.message_id, event.data)
 
     async def close_poll(self, channel_id, message_id, data=None):
         """Close a poll by counting reactions and posting results."""
@@ -399,12 +351,13 @@ class IncidentCog(commands.Cog):
                 data = json.dumps({"subject": subject})
 
                 # Schedule the event
-                event_id = schedule_event(
+                event_id = await schedule_event(
                     timestamp=timestamp,
                     function_name="close_poll",
                     message_id=bot_response.id,
                     channel_id=bot_response.channel.id,
                     data=data,
+                    guild_id=ctx.guild.id if ctx.guild else None,
                 )
 
                 logging.info(
@@ -2,8 +2,35 @@ from .scheduler import (
     ScheduledEvent,
     init_db,
     schedule_event,
+    schedule_events,
     get_pending_events,
     mark_event_completed,
     get_all_scheduled_events,
     cancel_event,
+    get_next_event_timestamp,
+    get_db,
+    close_db,
+    claim_due_events,
+    complete_event,
+    complete_events,
+    CompletionQueue,
+    fail_event,
+    release_event,
+    archive_completed_events,
+    RecurringSchedule,
+    next_weekly_occurrence,
+    add_recurring_schedule,
+    get_recurring_schedules,
+    get_recurring_schedule,
+    advance_recurring_schedule,
+    cancel_recurring_schedule,
+    list_recurring_schedules,
+    get_event,
+    list_events,
+    get_upcoming_events,
 )
+from .dispatcher import EventDispatcher
+from .metrics import DispatcherMetrics
+
+# Shared by every cog, started once the bot is connected
+dispatcher = EventDispatcher()
@@ -0,0 +1,499 @@
+import asyncio
+import datetime
+import heapq
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from .scheduler import (
+    CompletionQueue,
+    RecurringSchedule,
+    ScheduledEvent,
+    add_schedule_listener,
+    advance_recurring_schedule,
+    archive_completed_events,
+    claim_due_events,
+    fail_event,
+    get_next_event_timestamp,
+    get_recurring_schedules,
+    get_upcoming_events,
+    release_event,
+    remove_schedule_listener,
+)
+from .metrics import DispatcherMetrics
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[ScheduledEvent], Awaitable[Any]]
+
+# How often completed events are moved to the archive table
+COMPACT_INTERVAL = 6 * 60 * 60
+
+# Recurring schedules are re-read this often, to pick up ones added or cancelled
+# by other processes
+RECURRING_RELOAD_INTERVAL = 5 * 60
+
+# Occurrences missed by more than this while the bot was down are skipped
+MISSED_FIRE_GRACE = 15 * 60
+
+# Extra lease time on top of a handler's timeout, covering the completion write
+LEASE_MARGIN = 30.0
+
+# Events claimed per function_name on each pass
+CLAIM_BATCH_SIZE = 50
+
+# Handlers starting this many seconds after their event was due are logged
+LATENESS_WARNING = 30.0
+
+# Seconds to wait before running a failed event or recurring occurrence again
+RETRY_DELAY = 60.0
+
+
+class Registration(NamedTuple):
+    handler: EventHandler
+    timeout: float
+    max_attempts: int
+    prepare: Optional[EventHandler] = None
+    lead_time: float = 0.0
+
+
+class EventDispatcher:
+    """
+    Runs scheduled events as soon as they're due.
+
+    Handlers are registered per function_name. The dispatcher sleeps until the next
+    pending event's timestamp (or until schedule_event wakes it up), then claims every
+    due event it has a handler for and runs them concurrently, each bounded by its
+    handler's timeout.
+
+    Events are claimed with a lease, so several bot processes can share one database
+    without running an event twice. If a process dies mid-run, another one picks the
+    event up once the lease expires. Failed runs are retried up to max_attempts,
+    retry_delay seconds apart.
+    Completions go through a CompletionQueue, so events finishing together are
+    marked as done in one transaction.
+
+    Recurring schedules are kept in a min-heap of next fire times, so firing one is a
+    heap pop and push plus a single conditional UPDATE that makes sure only one
+    process runs each occurrence. No event rows are written for them, so a failed
+    occurrence is retried in the process that claimed it, and is lost if that
+    process stops before it succeeds.
+
+    A handler can also register a prepare coroutine, which is called lead_time
+    seconds before each event is due, so slow work such as rendering can be done
+    ahead of time. Every process prepares the events it sees coming up, whichever
+    one ends up running them.
+
+    Every compact_interval seconds old completed events are archived, which keeps
+    the scheduled_events table down to pending events and recent history, and the
+    lateness and duration metrics of every handler run are logged.
+    """
+
+    def __init__(
+        self,
+        max_sleep: float = 60.0,
+        worker_id: Optional[str] = None,
+        compact_interval: float = COMPACT_INTERVAL,
+        retry_delay: float = RETRY_DELAY,
+    ):
+        self.max_sleep = max_sleep
+        self.compact_interval = compact_interval
+        self.retry_delay = retry_delay
+        self.worker_id = (
+            worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+        self.handlers: Dict[str, Registration] = {}
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._compact_task: Optional[asyncio.Task] = None
+        self._running: Dict[int, asyncio.Task] = {}
+        # Due time up to which the last pass claimed everything it could
+        self._claimed_until: Optional[float] = None
+        self._recurring: List[Tuple[float, int]] = []
+        self._recurring_schedules: Dict[int, RecurringSchedule] = {}
+        self._recurring_loaded_at: Optional[float] = None
+        self._recurring_running: Set[asyncio.Task] = set()
+        # Occurrences already prepared, by ScheduledEvent.key, with their due time
+        self._prepared: Dict[str, float] = {}
+        self._preparing: Set[asyncio.Task] = set()
+        self.metrics = DispatcherMetrics()
+        self._completions = CompletionQueue(self.worker_id)
+
+    def register(
+        self,
+        function_name: str,
+        handler: EventHandler,
+        timeout: float = 300.0,
+        max_attempts: int = 3,
+        prepare: Optional[EventHandler] = None,
+        lead_time: float = 0.0,
+    ) -> None:
+        """
+        Register the coroutine that executes events with the given function_name.
+
+        Args:
+            function_name: The function_name stored on the scheduled events
+            handler: Coroutine function called with the ScheduledEvent
+            timeout: Seconds the handler (and prepare) may run before it is cancelled
+            max_attempts: Number of runs before a failing event is given up on
+            prepare: Coroutine function called with the ScheduledEvent ahead of time
+            lead_time: Seconds before the event is due to call prepare
+        """
+        self.handlers[function_name] = Registration(
+            handler, timeout, max_attempts, prepare, lead_time
+        )
+        self.wake()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def reload_recurring(self) -> None:
+        """Reload recurring schedules on the next pass, after one was changed."""
+        self._recurring_loaded_at = None
+        self.wake()
+
+    def _on_scheduled(self, timestamp: float) -> None:
+        # The new row may be a recurring schedule
+        self.reload_recurring()
+
+    def start(self) -> None:
+        """Start the dispatcher loop on the running event loop. Safe to call repeatedly."""
+        if self._task is None or self._task.done():
+            add_schedule_listener(self._on_scheduled)
+            loop = asyncio.get_running_loop()
+            self._task = loop.create_task(self._run())
+            self._compact_task = loop.create_task(self._compact())
+            logger.info("Event dispatcher started")
+
+    async def stop(self) -> None:
+        remove_schedule_listener(self._on_scheduled)
+        for task in (self._task, self._compact_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._compact_task = None
+        running = (
+            list(self._running.values())
+            + list(self._recurring_running)
+            + list(self._preparing)
+        )
+        for task in running:
+            task.cancel()
+        # Wait for the cancelled handlers to release their claims
+        await asyncio.gather(*running, return_exceptions=True)
+        await self._completions.drain()
+
+    async def _run(self) -> None:
+        while True:
+            # Clear before reading the table, so a wake-up that races with the
+            # query below still shortens the next sleep
+            self._wake.clear()
+            try:
+                await self.dispatch_due_events()
+                await self.fire_due_recurring()
+                await self.prepare_upcoming_events()
+                delay = min(
+                    await self._seconds_until_next_event(),
+                    self._seconds_until_next_recurring(),
+                    await self._seconds_until_next_prepare(),
+                )
+            except Exception as e:
+                logger.error(f"Error dispatching scheduled events: {str(e)}")
+                delay = self.max_sleep
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _compact(self) -> None:
+        while True:
+            await archive_completed_events()
+            self.metrics.log_summary()
+            await asyncio.sleep(self.compact_interval)
+
+    async def _seconds_until_next_event(self) -> float:
+        if self._claimed_until is None:
+            # A claim came back full, so more events are already due
+            return 0.0
+        now = datetime.datetime.now().timestamp()
+        # Look from the last claim rather than from now, events that became due
+        # since then haven't been claimed yet
+        next_timestamp = await get_next_event_timestamp(after=self._claimed_until)
+        if next_timestamp is None:
+            return self.max_sleep
+        return min(max(next_timestamp - now, 0.0), self.max_sleep)
+
+    async def dispatch_due_events(self) -> int:
+        """Claim and start a task for every due event that has a registered handler."""
+        started = 0
+        claimed_until: Optional[float] = datetime.datetime.now().timestamp()
+        for function_name, registration in list(self.handlers.items()):
+            events = await claim_due_events(
+                self.worker_id,
+                registration.timeout + LEASE_MARGIN,
+                function_name=function_name,
+                limit=CLAIM_BATCH_SIZE,
+                max_attempts=registration.max_attempts,
+            )
+            if len(events) >= CLAIM_BATCH_SIZE:
+                claimed_until = None
+            for event in events:
+                if event.id is None or event.id in self._running:
+                    continue
+                self._running[event.id] = asyncio.create_task(
+                    self._execute(event, registration)
+                )
+                started += 1
+        self._claimed_until = claimed_until
+        return started
+
+    async def _execute(self, event: ScheduledEvent, registration: Registration) -> None:
+        logger.info(
+            f"Processing scheduled event {event.id}: {event.function_name}"
+            f" (attempt {event.attempts})"
+        )
+        lateness = self._lateness(event.function_name, event.timestamp)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(
+                registration.handler(event), timeout=registration.timeout
+            )
+        except asyncio.TimeoutError:
+            self._record(event.function_name, lateness, started, failed=True)
+            logger.error(
+                f"Scheduled event {event.id} timed out after {registration.timeout}s"
+            )
+            await fail_event(
+                event.id,
+                self.worker_id,
+                f"Timed out after {registration.timeout}s",
+                max_attempts=registration.max_attempts,
+                retry_delay=self.retry_delay,
+            )
+        except asyncio.CancelledError:
+            # Shutting down, hand the event back so it runs after a restart. The
+            # run is left out of the metrics since it never finished.
+            self._running.pop(event.id, None)
+            await asyncio.shield(release_event(event.id, self.worker_id))
+            raise
+        except Exception as e:
+            self._record(event.function_name, lateness, started, failed=True)
+            logger.error(f"Error executing scheduled event {event.id}: {str(e)}")
+            await fail_event(
+                event.id,
+                self.worker_id,
+                str(e),
+                max_attempts=registration.max_attempts,
+                retry_delay=self.retry_delay,
+            )
+        else:
+            self._record(event.function_name, lateness, started, failed=False)
+            await self._completions.complete(event.id)
+        self._running.pop(event.id, None)
+
+    def _lateness(self, function_name: str, due: float) -> float:
+        lateness = datetime.datetime.now().timestamp() - due
+        if lateness > LATENESS_WARNING:
+            logger.warning(f"Scheduled {function_name} started {lateness:.1f}s late")
+        return lateness
+
+    def _record(
+        self, function_name: str, lateness: float, started: float, failed: bool
+    ) -> None:
+        self.metrics.record(function_name, lateness, time.monotonic() - started, failed)
+
+    async def load_recurring(self) -> None:
+        """Rebuild the heap of next fire times from the recurring_schedules table."""
+        schedules = await get_recurring_schedules()
+        self._recurring_schedules = {
+            schedule.id: schedule for schedule in schedules if schedule.id is not None
+        }
+        self._recurring = [
+            (schedule.next_fire_at, schedule_id)
+            for schedule_id, schedule in self._recurring_schedules.items()
+        ]
+        heapq.heapify(self._recurring)
+        self._recurring_loaded_at = time.monotonic()
+
+    def _seconds_until_next_recurring(self) -> float:
+        if not self._recurring:
+            return self.max_sleep
+        now = datetime.datetime.now().timestamp()
+        return min(max(self._recurring[0][0] - now, 0.0), self.max_sleep)
+
+    async def fire_due_recurring(self) -> int:
+        """Start a task for every recurring schedule whose next fire time has passed."""
+        if (
+            self._recurring_loaded_at is None
+            or time.monotonic() - self._recurring_loaded_at > RECURRING_RELOAD_INTERVAL
+        ):
+            await self.load_recurring()
+
+        started = 0
+        now = datetime.datetime.now().timestamp()
+        while self._recurring and self._recurring[0][0] <= now:
+            fire_at, schedule_id = heapq.heappop(self._recurring)
+            schedule = self._recurring_schedules.get(schedule_id)
+            if schedule is None or schedule.next_fire_at != fire_at:
+                continue
+            registration = self.handlers.get(schedule.function_name)
+            if registration is None:
+                # Left out of the heap until the next reload
+                continue
+
+            next_fire_at = schedule.next_fire_after(max(now, fire_at))
+            if not await advance_recurring_schedule(schedule_id, fire_at, next_fire_at):
+                # Cancelled, or another process fired it, re-read the table
+                self._recurring_loaded_at = None
+                continue
+            schedule.next_fire_at = next_fire_at
+            schedule.last_fired_at = fire_at
+            heapq.heappush(self._recurring, (next_fire_at, schedule_id))
+
+            if now - fire_at > MISSED_FIRE_GRACE:
+                logger.warning(
+                    f"Skipped recurring schedule {schedule_id}, it was due"
+                    f" {int(now - fire_at)}s ago"
+                )
+                continue
+            task = asyncio.create_task(
+                self._execute_recurring(schedule, fire_at, registration)
+            )
+            self._recurring_running.add(task)
+            task.add_done_callback(self._recurring_running.discard)
+            started += 1
+        return started
+
+    async def _execute_recurring(
+        self, schedule: RecurringSchedule, fire_at: float, registration: Registration
+    ) -> None:
+        event = schedule.to_event(fire_at)
+        for attempt in range(1, registration.max_attempts + 1):
+            logger.info(
+                f"Processing recurring schedule {schedule.id}: {schedule.function_name}"
+                f" (attempt {attempt})"
+            )
+            lateness = self._lateness(schedule.function_name, fire_at)
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(
+                    registration.handler(event), timeout=registration.timeout
+                )
+            except asyncio.TimeoutError:
+                self._record(schedule.function_name, lateness, started, failed=True)
+                logger.error(
+                    f"Recurring schedule {schedule.id} timed out after"
+                    f" {registration.timeout}s"
+                )
+            except Exception as e:
+                self._record(schedule.function_name, lateness, started, failed=True)
+                logger.error(
+                    f"Error executing recurring schedule {schedule.id}: {str(e)}"
+                )
+            else:
+                self._record(schedule.function_name, lateness, started, failed=False)
+                return
+            if attempt < registration.max_attempts:
+                logger.info(
+                    f"Recurring schedule {schedule.id} will be retried in"
+                    f" {self.retry_delay}s"
+                )
+                await asyncio.sleep(self.retry_delay)
+        logger.error(
+            f"Recurring schedule {schedule.id} failed {registration.max_attempts}"
+            f" times, skipping the occurrence due at {fire_at}"
+        )
+
+    async def prepare_upcoming_events(self) -> int:
+        """Start prepare for every event and recurring occurrence within its lead time."""
+        now = datetime.datetime.now().timestamp()
+        # Forget occurrences that have long since run or been cancelled
+        for key, timestamp in list(self._prepared.items()):
+            if timestamp < now - MISSED_FIRE_GRACE:
+                del self._prepared[key]
+
+        upcoming: List[Tuple[ScheduledEvent, Registration]] = []
+        for function_name, registration in list(self.handlers.items()):
+            if registration.prepare is None:
+                continue
+            events = await get_upcoming_events(
+                function_name, until=now + registration.lead_time, after=now
+            )
+            upcoming.extend((event, registration) for event in events)
+        for fire_at, schedule_id in self._recurring:
+            schedule = self._recurring_schedules.get(schedule_id)
+            if schedule is None or schedule.next_fire_at != fire_at:
+                continue
+            registration = self.handlers.get(schedule.function_name)
+            if registration is None or registration.prepare is None:
+                continue
+            if now < fire_at <= now + registration.lead_time:
+                upcoming.append((schedule.to_event(fire_at), registration))
+
+        started = 0
+        for event, registration in upcoming:
+            if event.key in self._prepared:
+                continue
+            self._prepared[event.key] = event.timestamp
+            task = asyncio.create_task(self._prepare(event, registration))
+            self._preparing.add(task)
+            task.add_done_callback(self._preparing.discard)
+            started += 1
+        return started
+
+    async def _seconds_until_next_prepare(self) -> float:
+        leads = [
+            registration.lead_time
+            for registration in self.handlers.values()
+            if registration.prepare is not None
+        ]
+        if not leads:
+            return self.max_sleep
+        now = datetime.datetime.now().timestamp()
+        # Events inside the lead time were just prepared, so look past it. With
+        # several lead times this may wake a little early, which is harmless.
+        lead_time = max(leads)
+        candidates = [self.max_sleep]
+        next_timestamp = await get_next_event_timestamp(after=now + lead_time)
+        if next_timestamp is not None:
+            candidates.append(next_timestamp - lead_time - now)
+        for fire_at, schedule_id in self._recurring:
+            schedule = self._recurring_schedules.get(schedule_id)
+            registration = (
+                self.handlers.get(schedule.function_name) if schedule else None
+            )
+            if registration is not None and registration.prepare is not None:
+                prepare_at = fire_at - registration.lead_time
+                if prepare_at > now:
+                    candidates.append(prepare_at - now)
+        return max(min(candidates), 0.0)
+
+    async def _prepare(self, event: ScheduledEvent, registration: Registration) -> None:
+        logger.info(f"Preparing scheduled event {event.key}: {event.function_name}")
+        try:
+            await asyncio.wait_for(
+                registration.prepare(event), timeout=registration.timeout
+            )
+        except asyncio.TimeoutError:
+            logger.error(
+                f"Preparing scheduled event {event.key} timed out after {registration.timeout}s"
+            )
+        except Exception as e:
+            logger.error(f"Error preparing scheduled event {event.key}: {str(e)}")
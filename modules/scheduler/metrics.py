@@ -0,0 +1,103 @@
+import logging
+from collections import deque
+from typing import Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Recent samples kept per function_name for the percentiles
+SAMPLE_SIZE = 1000
+
+
+class Timings:
+    """Running count, total and maximum of a measurement, plus its recent samples."""
+
+    def __init__(self, sample_size: int = SAMPLE_SIZE):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: Deque[float] = deque(maxlen=sample_size)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.samples.append(value)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Nearest-rank percentile of the recent samples, or None if there are none."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "max": self.max if self.count else None,
+        }
+
+
+class FunctionMetrics:
+    def __init__(self, sample_size: int = SAMPLE_SIZE):
+        self.lateness = Timings(sample_size)
+        self.duration = Timings(sample_size)
+        self.failures = 0
+
+
+class DispatcherMetrics:
+    """
+    How late scheduled events start and how long their handlers take, per function_name.
+
+    Lateness is the time between an event's timestamp and its handler starting, so
+    it covers both the dispatcher's sleep accuracy and time spent claiming. Retried
+    events are measured against their retry time.
+    """
+
+    def __init__(self, sample_size: int = SAMPLE_SIZE):
+        self.sample_size = sample_size
+        self.functions: Dict[str, FunctionMetrics] = {}
+
+    def record(
+        self, function_name: str, lateness: float, duration: float, failed: bool
+    ) -> None:
+        """
+        Record one handler run.
+
+        Args:
+            function_name: The function_name of the event that ran
+            lateness: Seconds between the event being due and the handler starting
+            duration: Seconds the handler ran for
+            failed: Whether the handler raised or timed out
+        """
+        metrics = self.functions.get(function_name)
+        if metrics is None:
+            metrics = self.functions[function_name] = FunctionMetrics(self.sample_size)
+        metrics.lateness.add(lateness)
+        metrics.duration.add(duration)
+        if failed:
+            metrics.failures += 1
+
+    def summary(self) -> Dict[str, dict]:
+        return {
+            function_name: {
+                "lateness": metrics.lateness.summary(),
+                "duration": metrics.duration.summary(),
+                "failures": metrics.failures,
+            }
+            for function_name, metrics in self.functions.items()
+        }
+
+    def log_summary(self) -> None:
+        for function_name, metrics in self.functions.items():
+            lateness = metrics.lateness.summary()
+            duration = metrics.duration.summary()
+            logger.info(
+                f"Scheduler metrics for {function_name}: {metrics.lateness.count} runs,"
+                f" {metrics.failures} failed, lateness p50 {lateness['p50']:.3f}s"
+                f" p95 {lateness['p95']:.3f}s max {lateness['max']:.3f}s, duration"
+                f" p50 {duration['p50']:.3f}s p95 {duration['p95']:.3f}s"
+                f" max {duration['max']:.3f}s"
+            )
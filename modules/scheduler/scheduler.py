@@ -1,9 +1,13 @@
 import os
-import sqlite3
+import json
+import asyncio
 import logging
 import datetime
 from dataclasses import dataclass
-from typing import List, Optional, Callable, Any
+from typing import Dict, List, Optional, Callable, Any, Awaitable, Tuple
+
+import aiosqlite
+import pytz
 
 # Configure logging
 logging.basicConfig(
@@ -24,6 +28,178 @@ else:
     DB_PATH = DATABASE_URL
 logger.info(f"Using database path: {DB_PATH}")
 
+# Callbacks run with the timestamp of every newly scheduled event, and with the
+# first fire time of every new recurring schedule
+_schedule_listeners: List[Callable[[float], None]] = []
+
+# One long-lived connection shared by the whole bot. aiosqlite runs every
+# statement on the connection's own thread, so disk I/O never blocks the event
+# loop, and _write_lock keeps multi-statement writes from interleaving.
+_db: Optional[aiosqlite.Connection] = None
+_db_lock: Optional[asyncio.Lock] = None
+_write_lock: Optional[asyncio.Lock] = None
+# DB_PATH once init_db has brought that database up to date
+_initialized_path: Optional[str] = None
+
+# Completed events older than this are moved to scheduled_events_archive
+ARCHIVE_AFTER_DAYS = float(os.getenv("SCHEDULER_ARCHIVE_DAYS", "30"))
+ARCHIVE_BATCH_SIZE = 1000
+
+# Statements are kept as constants so sqlite's per-connection statement cache
+# always sees the same SQL text and reuses the prepared statement
+_EVENT_COLUMNS = (
+    "id, timestamp, function_name, message_id, channel_id, completed, data, "
+    "status, attempts, guild_id"
+)
+_ARCHIVED_COLUMNS = (
+    "id, timestamp, function_name, message_id, channel_id, guild_id, data, status, "
+    "worker_id, attempts, last_error, completed_at"
+)
+_SQL_INSERT_EVENT = """
+INSERT INTO scheduled_events (timestamp, function_name, message_id, channel_id, guild_id, completed, data)
+VALUES (?, ?, ?, ?, ?, 0, ?)
+"""
+_SQL_GET_EVENT = f"""
+SELECT {_EVENT_COLUMNS} FROM scheduled_events WHERE id = ?
+"""
+_SQL_PENDING_EVENTS = f"""
+SELECT {_EVENT_COLUMNS}
+FROM scheduled_events
+WHERE timestamp <= ? AND completed = 0 AND status = 'pending'
+ORDER BY timestamp ASC
+"""
+_SQL_UPCOMING_EVENTS = f"""
+SELECT {_EVENT_COLUMNS}
+FROM scheduled_events
+WHERE function_name = ? AND timestamp > ? AND timestamp <= ?
+AND completed = 0 AND status = 'pending'
+ORDER BY timestamp ASC
+"""
+_SQL_ALL_EVENTS = f"""
+SELECT {_EVENT_COLUMNS}
+FROM scheduled_events
+WHERE completed = 0
+ORDER BY timestamp ASC
+"""
+_SQL_NEXT_TIMESTAMP = """
+SELECT MIN(timestamp) FROM scheduled_events
+WHERE timestamp > ? AND completed = 0
+"""
+# Current unix time, evaluated by sqlite when a row is completed
+_SQL_NOW = "((julianday('now') - 2440587.5) * 86400.0)"
+_SQL_COMPLETE_EVENT = f"""
+UPDATE scheduled_events
+SET completed = 1, status = 'done', lease_expires_at = NULL, completed_at = {_SQL_NOW}
+WHERE id = ?
+"""
+_SQL_CANCEL_EVENT = f"""
+UPDATE scheduled_events
+SET completed = 1, status = 'cancelled', completed_at = {_SQL_NOW}
+WHERE id = ? AND completed = 0 AND status = 'pending'
+"""
+# Events whose worker died mid-run are given up on once they're out of attempts.
+# Scoped like the claim, since max_attempts belongs to the function being claimed.
+_SQL_EXPIRE_LEASES = f"""
+UPDATE scheduled_events
+SET completed = 1, status = 'failed', lease_expires_at = NULL, completed_at = {_SQL_NOW},
+    last_error = 'Lease expired after final attempt'
+WHERE completed = 0 AND status = 'running' AND lease_expires_at < ? AND attempts >= ?
+AND (? IS NULL OR function_name = ?)
+"""
+_SQL_CLAIM_EVENTS = f"""
+UPDATE scheduled_events
+SET status = 'running', worker_id = ?, lease_expires_at = ?, attempts = attempts + 1
+WHERE id IN (
+    SELECT id FROM scheduled_events
+    WHERE completed = 0 AND timestamp <= ? AND (? IS NULL OR function_name = ?)
+    AND (status = 'pending' OR (status = 'running' AND lease_expires_at < ?))
+    ORDER BY timestamp ASC
+    LIMIT ?
+)
+RETURNING {_EVENT_COLUMNS}
+"""
+_SQL_FINISH_CLAIMED_EVENT = f"""
+UPDATE scheduled_events
+SET completed = 1, status = ?, lease_expires_at = NULL, completed_at = {_SQL_NOW},
+    last_error = ?
+WHERE id = ? AND worker_id = ? AND status = 'running'
+"""
+# Batched completions pass their IDs as one JSON array, so every batch size
+# shares a statement
+_SQL_COMPLETE_CLAIMED_EVENTS = f"""
+UPDATE scheduled_events
+SET completed = 1, status = 'done', lease_expires_at = NULL, completed_at = {_SQL_NOW}
+WHERE id IN (SELECT value FROM json_each(?)) AND worker_id = ? AND status = 'running'
+RETURNING id
+"""
+_SQL_RETRY_CLAIMED_EVENT = """
+UPDATE scheduled_events
+SET status = 'pending', timestamp = ?, worker_id = NULL, lease_expires_at = NULL,
+    last_error = ?
+WHERE id = ? AND worker_id = ? AND status = 'running'
+"""
+_SQL_RELEASE_CLAIMED_EVENT = """
+UPDATE scheduled_events
+SET status = 'pending', worker_id = NULL, lease_expires_at = NULL,
+    attempts = attempts - 1
+WHERE id = ? AND worker_id = ? AND status = 'running'
+"""
+_RECURRING_COLUMNS = (
+    "id, function_name, message_id, channel_id, weekday, hour, minute, timezone, "
+    "data, next_fire_at, last_fired_at, guild_id"
+)
+_SQL_INSERT_RECURRING = """
+INSERT INTO recurring_schedules
+(function_name, message_id, channel_id, guild_id, weekday, hour, minute, timezone, data, next_fire_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_ACTIVE_RECURRING = f"""
+SELECT {_RECURRING_COLUMNS} FROM recurring_schedules
+WHERE active = 1
+ORDER BY next_fire_at ASC
+"""
+_SQL_GET_RECURRING = f"""
+SELECT {_RECURRING_COLUMNS} FROM recurring_schedules
+WHERE id = ? AND active = 1
+"""
+# Only succeeds for the first worker to fire this occurrence
+_SQL_ADVANCE_RECURRING = """
+UPDATE recurring_schedules
+SET next_fire_at = ?, last_fired_at = ?
+WHERE id = ? AND active = 1 AND next_fire_at = ?
+"""
+_SQL_CANCEL_RECURRING = """
+UPDATE recurring_schedules SET active = 0 WHERE id = ? AND active = 1
+"""
+_SQL_EVENT_ATTEMPTS = """
+SELECT attempts FROM scheduled_events WHERE id = ?
+"""
+_ARCHIVE_BATCH = """
+SELECT id FROM scheduled_events
+WHERE completed = 1 AND completed_at < ?
+ORDER BY completed_at, id
+LIMIT ?
+"""
+_SQL_ARCHIVE_EVENTS = f"""
+INSERT OR REPLACE INTO scheduled_events_archive ({_ARCHIVED_COLUMNS}, archived_at)
+SELECT {_ARCHIVED_COLUMNS}, {_SQL_NOW} FROM scheduled_events
+WHERE id IN ({_ARCHIVE_BATCH})
+"""
+_SQL_DELETE_ARCHIVED_EVENTS = f"""
+DELETE FROM scheduled_events WHERE id IN ({_ARCHIVE_BATCH})
+"""
+
+# Columns added after the original table, with their definitions
+_ADDED_COLUMNS = {
+    "status": "TEXT NOT NULL DEFAULT 'pending'",
+    "worker_id": "TEXT",
+    "lease_expires_at": "REAL",
+    "attempts": "INTEGER NOT NULL DEFAULT 0",
+    "last_error": "TEXT",
+    "completed_at": "REAL",
+    "guild_id": "INTEGER",
+}
+
 
 @dataclass
 class ScheduledEvent:
@@ -36,68 +212,386 @@ class ScheduledEvent:
     channel_id: int  # Discord channel ID where the message is
     completed: bool  # Whether the event has been executed
     data: Optional[str]  # Additional data needed for the function (JSON string)
+    status: str = "pending"  # pending, running, done, failed or cancelled
+    attempts: int = 0  # How many times a worker has claimed the event
+    guild_id: Optional[int] = None  # Discord guild of the channel, if known
+    recurring_id: Optional[int] = None  # Set when fired by a recurring schedule
 
+    @property
+    def key(self) -> str:
+        """Identifies this occurrence, the same when it's prepared and when it runs."""
+        if self.recurring_id is not None:
+            return f"weekly-{self.recurring_id}-{int(self.timestamp)}"
+        return str(self.id)
 
-def init_db() -> None:
-    """Initialize the database with the scheduled_events table."""
-    try:
-        # Extract the directory path
-        db_dir = os.path.dirname(DB_PATH)
 
-        # Create the directory if it doesn't exist
-        if db_dir and not os.path.exists(db_dir):
-            os.makedirs(db_dir, exist_ok=True)
-            logger.info(f"Created database directory: {db_dir}")
+@dataclass
+class RecurringSchedule:
+    """A weekly schedule that fires its function at the same local time every week."""
 
-        # Connect to the database
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        # Create the scheduled_events table if it doesn't exist
-        cursor.execute(
-            """
-        CREATE TABLE IF NOT EXISTS scheduled_events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp REAL NOT NULL,
-            function_name TEXT NOT NULL,
-            message_id INTEGER NOT NULL,
-            channel_id INTEGER NOT NULL,
-            completed BOOLEAN NOT NULL DEFAULT 0,
-            data TEXT
-        )
-        """
+    id: Optional[int]
+    function_name: str
+    message_id: int
+    channel_id: int
+    weekday: int  # 0 is Monday
+    hour: int
+    minute: int
+    timezone: Optional[str]  # IANA name, or None for the server's local time
+    data: Optional[str]
+    next_fire_at: float
+    last_fired_at: Optional[float] = None
+    guild_id: Optional[int] = None
+
+    def next_fire_after(self, after: float) -> float:
+        return next_weekly_occurrence(
+            self.weekday, self.hour, self.minute, self.timezone, after
         )
 
-        # Create an index on the timestamp for efficient querying
-        cursor.execute(
-            """
-        CREATE INDEX IF NOT EXISTS idx_scheduled_events_timestamp
-        ON scheduled_events (timestamp)
-        """
+    def to_event(self, fire_at: float) -> "ScheduledEvent":
+        """The one-off event passed to the handler for a single firing."""
+        return ScheduledEvent(
+            id=None,
+            timestamp=fire_at,
+            function_name=self.function_name,
+            message_id=self.message_id,
+            channel_id=self.channel_id,
+            completed=False,
+            data=self.data,
+            status="running",
+            guild_id=self.guild_id,
+            recurring_id=self.id,
         )
 
-        # Create an index on the completed status for efficient querying
-        cursor.execute(
-            """
-        CREATE INDEX IF NOT EXISTS idx_scheduled_events_completed
-        ON scheduled_events (completed)
-        """
+
+def next_weekly_occurrence(
+    weekday: int,
+    hour: int,
+    minute: int,
+    timezone: Optional[str] = None,
+    after: Optional[float] = None,
+) -> float:
+    """
+    Get the first time after a timestamp that falls on a weekday at hour:minute.
+
+    The wall-clock time is kept across daylight saving changes in the timezone.
+
+    Args:
+        weekday: Day of the week, 0 is Monday
+        hour: Hour of the day (0-23)
+        minute: Minute of the hour (0-59)
+        timezone: IANA timezone name, or None for the server's local time
+        after: Unix timestamp to start from, defaults to now
+
+    Returns:
+        The Unix timestamp of the next occurrence
+    """
+    if after is None:
+        after = datetime.datetime.now().timestamp()
+    tz = pytz.timezone(timezone) if timezone else None
+    now = datetime.datetime.fromtimestamp(after, tz)
+
+    def occurrence(days: int) -> float:
+        local = datetime.datetime.combine(
+            now.date() + datetime.timedelta(days=days), datetime.time(hour, minute)
         )
+        return (tz.localize(local) if tz else local).timestamp()
+
+    # If it's the same day and the time has already passed, it's next week
+    days_until = (weekday - now.weekday()) % 7
+    fire_at = occurrence(days_until)
+    if fire_at <= after:
+        fire_at = occurrence(days_until + 7)
+    return fire_at
+
+
+async def init_db(db_path: Optional[str] = None) -> None:
+    """
+    Create the scheduler database or bring it up to date. Safe to call repeatedly.
+
+    Must be awaited once at startup, before the scheduler is used. The database's
+    PRAGMA user_version records the last migration applied, so each one runs once.
+
+    Args:
+        db_path: Database file to use instead of DATABASE_URL's, ":memory:" for a
+            database that only lives as long as the connection
+    """
+    global DB_PATH, _initialized_path
+    if db_path is not None and db_path != DB_PATH:
+        await close_db()
+        DB_PATH = db_path
+    if _initialized_path == DB_PATH:
+        return
+    try:
+        # Create the directory if it doesn't exist
+        db_dir = os.path.dirname(DB_PATH)
+        if DB_PATH != ":memory:" and db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir, exist_ok=True)
+            logger.info(f"Created database directory: {db_dir}")
 
-        conn.commit()
-        conn.close()
+        db = await get_db()
+        async with _write_lock:
+            for version, migration in enumerate(_MIGRATIONS, start=1):
+                # IMMEDIATE takes the write lock before the version is read, so
+                # processes starting together can't both apply a migration
+                await db.execute("BEGIN IMMEDIATE")
+                try:
+                    async with db.execute("PRAGMA user_version") as cursor:
+                        (current_version,) = await cursor.fetchone()
+                    if current_version >= version:
+                        await db.rollback()
+                        continue
+                    await migration(db)
+                    await db.execute(f"PRAGMA user_version = {version}")
+                    await db.commit()
+                except BaseException:
+                    await db.rollback()
+                    raise
+                logger.info(f"Migrated scheduler database to version {version}")
+        _initialized_path = DB_PATH
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Error initializing database: {str(e)}")
         raise
 
 
-def schedule_event(
+async def _migrate_initial_schema(db: aiosqlite.Connection) -> None:
+    """
+    Version 1: the schema as of the first versioned release.
+
+    Databases from before versioning may hold any earlier form of the schema, so
+    every step here tolerates it already being there.
+    """
+    # Create the scheduled_events table if it doesn't exist
+    await db.execute(
+        """
+    CREATE TABLE IF NOT EXISTS scheduled_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp REAL NOT NULL,
+        function_name TEXT NOT NULL,
+        message_id INTEGER NOT NULL,
+        channel_id INTEGER NOT NULL,
+        completed BOOLEAN NOT NULL DEFAULT 0,
+        data TEXT
+    )
+    """
+    )
+
+    # Add the columns that databases created by older versions lack
+    added = await _add_missing_columns(db, "scheduled_events", _ADDED_COLUMNS)
+    if "status" in added:
+        await db.execute(
+            "UPDATE scheduled_events SET status = 'done' WHERE completed = 1"
+        )
+    if "completed_at" in added:
+        await db.execute(
+            "UPDATE scheduled_events SET completed_at = timestamp WHERE completed = 1"
+        )
+
+    # Indexes superseded by the partial indexes below
+    await db.execute("DROP INDEX IF EXISTS idx_scheduled_events_timestamp")
+    await db.execute("DROP INDEX IF EXISTS idx_scheduled_events_completed")
+    await db.execute("DROP INDEX IF EXISTS idx_scheduled_events_due")
+
+    # Only pending and running events are indexed, so every hot query walks
+    # O(pending) entries however much history builds up. The index holds every
+    # selected column, so those queries never touch the table itself.
+    await db.execute(
+        """
+    CREATE INDEX IF NOT EXISTS idx_scheduled_events_pending
+    ON scheduled_events (
+        timestamp, function_name, status, lease_expires_at, attempts,
+        message_id, channel_id, guild_id, completed, data
+    )
+    WHERE completed = 0
+    """
+    )
+
+    # Keyset pages of a function's, a guild's or a channel's events, in
+    # timestamp order
+    await db.execute(
+        """
+    CREATE INDEX IF NOT EXISTS idx_scheduled_events_function
+    ON scheduled_events (function_name, timestamp, id)
+    WHERE completed = 0
+    """
+    )
+    await db.execute(
+        """
+    CREATE INDEX IF NOT EXISTS idx_scheduled_events_guild
+    ON scheduled_events (guild_id, function_name, timestamp, id)
+    WHERE completed = 0
+    """
+    )
+    await db.execute(
+        """
+    CREATE INDEX IF NOT EXISTS idx_scheduled_events_channel
+    ON scheduled_events (channel_id, function_name, timestamp, id)
+    WHERE completed = 0
+    """
+    )
+
+    # Lets the archival job find old completed events without a table scan
+    await db.execute(
+        """
+    CREATE INDEX IF NOT EXISTS idx_scheduled_events_completed_at
+    ON scheduled_events (completed_at)
+    WHERE completed = 1
+    """
+    )
+
+    # Weekly schedules, fired straight from the dispatcher without event rows
+    await db.execute(
+        """
+    CREATE TABLE IF NOT EXISTS recurring_schedules (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        function_name TEXT NOT NULL,
+        message_id INTEGER NOT NULL,
+        channel_id INTEGER NOT NULL,
+        guild_id INTEGER,
+        weekday INTEGER NOT NULL,
+        hour INTEGER NOT NULL,
+        minute INTEGER NOT NULL,
+        timezone TEXT,
+        data TEXT,
+        next_fire_at REAL NOT NULL,
+        last_fired_at REAL,
+        active BOOLEAN NOT NULL DEFAULT 1
+    )
+    """
+    )
+
+    # Completed events are moved here by archive_completed_events
+    await db.execute(
+        """
+    CREATE TABLE IF NOT EXISTS scheduled_events_archive (
+        id INTEGER PRIMARY KEY,
+        timestamp REAL NOT NULL,
+        function_name TEXT NOT NULL,
+        message_id INTEGER NOT NULL,
+        channel_id INTEGER NOT NULL,
+        guild_id INTEGER,
+        data TEXT,
+        status TEXT NOT NULL,
+        worker_id TEXT,
+        attempts INTEGER NOT NULL,
+        last_error TEXT,
+        completed_at REAL,
+        archived_at REAL NOT NULL
+    )
+    """
+    )
+
+    await _add_missing_columns(db, "recurring_schedules", {"guild_id": "INTEGER"})
+    await _add_missing_columns(
+        db, "scheduled_events_archive", {"guild_id": "INTEGER"}
+    )
+    await db.execute(
+        """
+    CREATE INDEX IF NOT EXISTS idx_recurring_schedules_guild
+    ON recurring_schedules (guild_id, function_name, next_fire_at, id)
+    WHERE active = 1
+    """
+    )
+
+
+async def _migrate_running_lease_index(db: aiosqlite.Connection) -> None:
+    """
+    Version 2: index the leases of running events.
+
+    Expiring leases before each claim otherwise walks every pending event.
+    """
+    await db.execute(
+        """
+    CREATE INDEX IF NOT EXISTS idx_scheduled_events_running
+    ON scheduled_events (lease_expires_at)
+    WHERE status = 'running'
+    """
+    )
+
+
+# Applied in order, the database's user_version is the number applied so far
+_MIGRATIONS: List[Callable[[aiosqlite.Connection], Awaitable[None]]] = [
+    _migrate_initial_schema,
+    _migrate_running_lease_index,
+]
+
+
+async def _add_missing_columns(
+    db: aiosqlite.Connection, table: str, columns: dict
+) -> List[str]:
+    """Add the columns a table created by an older version lacks, returning their names."""
+    async with db.execute(f"PRAGMA table_info({table})") as cursor:
+        existing_columns = {row[1] for row in await cursor.fetchall()}
+    added = []
+    for column, definition in columns.items():
+        if column not in existing_columns:
+            await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            logger.info(f"Added column {column} to {table}")
+            added.append(column)
+    return added
+
+
+async def get_db() -> aiosqlite.Connection:
+    """
+    Get the shared database connection, opening it on first use.
+
+    Returns:
+        The aiosqlite connection used for every scheduler query
+    """
+    global _db, _db_lock, _write_lock
+    if _db is not None:
+        return _db
+    if _db_lock is None:
+        _db_lock = asyncio.Lock()
+    async with _db_lock:
+        if _db is None:
+            conn = await aiosqlite.connect(DB_PATH, cached_statements=64)
+            conn.row_factory = aiosqlite.Row
+            await conn.execute("PRAGMA journal_mode=WAL")
+            # Only fsync at checkpoints, WAL keeps the database consistent anyway
+            await conn.execute("PRAGMA synchronous=NORMAL")
+            await conn.execute("PRAGMA busy_timeout=5000")
+            _write_lock = asyncio.Lock()
+            _db = conn
+            logger.info(f"Opened scheduler database connection: {DB_PATH}")
+    return _db
+
+
+async def close_db() -> None:
+    """Close the shared database connection. The next query reopens it."""
+    global _db, _db_lock, _write_lock, _initialized_path
+    if _db is not None:
+        await _db.close()
+    _db = None
+    # An in-memory database is gone once closed, a file one stays migrated
+    if _initialized_path == ":memory:":
+        _initialized_path = None
+    _db_lock = None
+    _write_lock = None
+
+
+def _row_to_event(row) -> ScheduledEvent:
+    return ScheduledEvent(
+        id=row["id"],
+        timestamp=row["timestamp"],
+        function_name=row["function_name"],
+        message_id=row["message_id"],
+        channel_id=row["channel_id"],
+        completed=bool(row["completed"]),
+        data=row["data"],
+        status=row["status"],
+        attempts=row["attempts"],
+        guild_id=row["guild_id"],
+    )
+
+
+async def schedule_event(
     timestamp: float,
     function_name: str,
     message_id: int,
     channel_id: int,
     data: Optional[str] = None,
+    guild_id: Optional[int] = None,
 ) -> int:
     """
     Schedule a new event to be executed at the specified timestamp.
@@ -108,42 +602,120 @@ def schedule_event(
         message_id: Discord message ID to operate on
         channel_id: Discord channel ID where the message is
         data: Additional data needed for the function (JSON string)
+        guild_id: Discord guild ID of the channel, used to filter listings
 
     Returns:
         The ID of the newly created event
     """
     try:
-        # Ensure database directory exists
-        db_dir = os.path.dirname(DB_PATH)
-        if db_dir and not os.path.exists(db_dir):
-            os.makedirs(db_dir, exist_ok=True)
-            logger.info(f"Created database directory: {db_dir}")
-
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-        INSERT INTO scheduled_events (timestamp, function_name, message_id, channel_id, completed, data)
-        VALUES (?, ?, ?, ?, 0, ?)
-        """,
-            (timestamp, function_name, message_id, channel_id, data),
-        )
-
-        event_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        db = await get_db()
+        async with _write_lock:
+            cursor = await db.execute(
+                _SQL_INSERT_EVENT,
+                (timestamp, function_name, message_id, channel_id, guild_id, data),
+            )
+            event_id = cursor.lastrowid
+            await db.commit()
 
         logger.info(
             f"Event scheduled: {function_name} on message {message_id} at {datetime.datetime.fromtimestamp(timestamp).isoformat()}"
         )
-        return event_id
     except Exception as e:
         logger.error(f"Error scheduling event: {str(e)}")
         raise
 
+    _notify_schedule_listeners(timestamp)
+    return event_id
+
+
+async def schedule_events(events: List[ScheduledEvent]) -> List[int]:
+    """
+    Schedule several events in a single transaction.
+
+    Args:
+        events: The events to schedule, their id, completed and status are ignored
+
+    Returns:
+        The IDs of the newly created events, in the same order
+    """
+    if not events:
+        return []
+    try:
+        db = await get_db()
+        async with _write_lock:
+            event_ids = []
+            try:
+                for event in events:
+                    cursor = await db.execute(
+                        _SQL_INSERT_EVENT,
+                        (
+                            event.timestamp,
+                            event.function_name,
+                            event.message_id,
+                            event.channel_id,
+                            event.guild_id,
+                            event.data,
+                        ),
+                    )
+                    event_ids.append(cursor.lastrowid)
+                await db.commit()
+            except BaseException:
+                await db.rollback()
+                raise
+
+        logger.info(f"Scheduled {len(event_ids)} events")
+    except Exception as e:
+        logger.error(f"Error scheduling events: {str(e)}")
+        raise
+
+    _notify_schedule_listeners(min(event.timestamp for event in events))
+    return event_ids
 
-def get_pending_events() -> List[ScheduledEvent]:
+
+def _notify_schedule_listeners(timestamp: float) -> None:
+    for listener in list(_schedule_listeners):
+        try:
+            listener(timestamp)
+        except Exception as e:
+            logger.error(f"Error notifying schedule listener: {str(e)}")
+
+
+def add_schedule_listener(listener: Callable[[float], None]) -> None:
+    """Call listener with the timestamp of every event scheduled from now on."""
+    if listener not in _schedule_listeners:
+        _schedule_listeners.append(listener)
+
+
+def remove_schedule_listener(listener: Callable[[float], None]) -> None:
+    if listener in _schedule_listeners:
+        _schedule_listeners.remove(listener)
+
+
+async def get_next_event_timestamp(after: Optional[float] = None) -> Optional[float]:
+    """
+    Get the timestamp of the earliest pending event scheduled after a point in time.
+
+    Args:
+        after: Unix timestamp to look after (defaults to now)
+
+    Returns:
+        The timestamp of the next pending event, or None if there isn't one
+    """
+    try:
+        if after is None:
+            after = datetime.datetime.now().timestamp()
+
+        db = await get_db()
+        async with db.execute(_SQL_NEXT_TIMESTAMP, (after,)) as cursor:
+            row = await cursor.fetchone()
+
+        return row[0] if row else None
+    except Exception as e:
+        logger.error(f"Error getting next event timestamp: {str(e)}")
+        return None
+
+
+async def get_pending_events() -> List[ScheduledEvent]:
     """
     Get all events that are scheduled to execute in the past and haven't been completed yet.
 
@@ -151,78 +723,289 @@ def get_pending_events() -> List[ScheduledEvent]:
         A list of ScheduledEvent objects
     """
     try:
-        # Ensure database exists before querying
-        if not os.path.exists(DB_PATH):
-            logger.warning(f"Database file does not exist: {DB_PATH}")
-            return []
+        current_timestamp = datetime.datetime.now().timestamp()
+        db = await get_db()
+        async with db.execute(_SQL_PENDING_EVENTS, (current_timestamp,)) as cursor:
+            rows = await cursor.fetchall()
+
+        return [_row_to_event(row) for row in rows]
+    except Exception as e:
+        logger.error(f"Error getting pending events: {str(e)}")
+        return []
 
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
 
-        current_timestamp = datetime.datetime.now().timestamp()
-        cursor.execute(
-            """
-        SELECT id, timestamp, function_name, message_id, channel_id, completed, data
-        FROM scheduled_events
-        WHERE timestamp <= ? AND completed = 0
-        ORDER BY timestamp ASC
-        """,
-            (current_timestamp,),
-        )
+async def get_upcoming_events(
+    function_name: str, until: float, after: Optional[float] = None
+) -> List[ScheduledEvent]:
+    """
+    Get the pending events for a function that fall due between after and until.
 
-        rows = cursor.fetchall()
-        conn.close()
-
-        events = [
-            ScheduledEvent(
-                id=row["id"],
-                timestamp=row["timestamp"],
-                function_name=row["function_name"],
-                message_id=row["message_id"],
-                channel_id=row["channel_id"],
-                completed=bool(row["completed"]),
-                data=row["data"],
-            )
-            for row in rows
-        ]
+    Args:
+        function_name: Only include events for this function
+        until: Latest timestamp to include
+        after: Exclude events due at or before this, defaults to now
+
+    Returns:
+        A list of ScheduledEvent objects, soonest first
+    """
+    if after is None:
+        after = datetime.datetime.now().timestamp()
+    try:
+        db = await get_db()
+        async with db.execute(
+            _SQL_UPCOMING_EVENTS, (function_name, after, until)
+        ) as cursor:
+            rows = await cursor.fetchall()
 
+        return [_row_to_event(row) for row in rows]
+    except Exception as e:
+        logger.error(f"Error getting upcoming events: {str(e)}")
+        return []
+
+
+async def claim_due_events(
+    worker_id: str,
+    lease_seconds: float,
+    function_name: Optional[str] = None,
+    limit: int = 50,
+    max_attempts: int = 3,
+) -> List[ScheduledEvent]:
+    """
+    Atomically claim due events so that only one worker runs each of them.
+
+    Pending events and running events whose lease has expired (their worker died)
+    are moved to running under this worker until the lease expires. The claim is a
+    single UPDATE ... RETURNING, so concurrent workers, even in other processes,
+    can never claim the same event.
+
+    Args:
+        worker_id: Unique identifier of the claiming worker
+        lease_seconds: How long the worker has to finish the events
+        function_name: Only claim events for this function, or any if None
+        limit: Maximum number of events to claim
+        max_attempts: Expired events of function_name already claimed this many
+            times are failed
+
+    Returns:
+        A list of the claimed ScheduledEvent objects
+    """
+    try:
+        now = datetime.datetime.now().timestamp()
+        db = await get_db()
+        async with _write_lock:
+            try:
+                await db.execute(
+                    _SQL_EXPIRE_LEASES,
+                    (now, max_attempts, function_name, function_name),
+                )
+                async with db.execute(
+                    _SQL_CLAIM_EVENTS,
+                    (
+                        worker_id,
+                        now + lease_seconds,
+                        now,
+                        function_name,
+                        function_name,
+                        now,
+                        limit,
+                    ),
+                ) as cursor:
+                    rows = await cursor.fetchall()
+                await db.commit()
+            except BaseException:
+                # Otherwise the open transaction holds the write lock and the next
+                # writer's commit would commit this half of the work
+                await db.rollback()
+                raise
+
+        events = sorted((_row_to_event(row) for row in rows), key=lambda e: e.timestamp)
+        if events:
+            logger.info(
+                f"Worker {worker_id} claimed events {[event.id for event in events]}"
+            )
         return events
     except Exception as e:
-        logger.error(f"Error getting pending events: {str(e)}")
+        logger.error(f"Error claiming events: {str(e)}")
         return []
 
 
-def mark_event_completed(event_id: int) -> bool:
+async def complete_event(event_id: int, worker_id: str) -> bool:
     """
-    Mark an event as completed.
+    Mark a claimed event as done.
+
+    Returns:
+        False if the worker no longer holds the event's lease
+    """
+    return await _finish_claimed_event(event_id, worker_id, "done", None)
+
+
+async def complete_events(event_ids: List[int], worker_id: str) -> List[int]:
+    """
+    Mark several claimed events as done in a single transaction.
+
+    Returns:
+        The IDs of the events that were completed, leaving out those the worker no
+        longer holds the lease of
+    """
+    if not event_ids:
+        return []
+    try:
+        db = await get_db()
+        async with _write_lock:
+            async with db.execute(
+                _SQL_COMPLETE_CLAIMED_EVENTS, (json.dumps(event_ids), worker_id)
+            ) as cursor:
+                completed = [row[0] for row in await cursor.fetchall()]
+            await db.commit()
+
+        logger.info(f"Events {completed} marked as done")
+        lost = set(event_ids) - set(completed)
+        if lost:
+            logger.warning(f"Worker {worker_id} no longer holds events {sorted(lost)}")
+        return completed
+    except Exception as e:
+        logger.error(f"Error marking events {event_ids} as done: {str(e)}")
+        return []
+
+
+class CompletionQueue:
+    """
+    Coalesces the completions of one worker into complete_events batches.
+
+    A completion waits for at most the batch being written when it arrives, and
+    everything that arrives in the meantime goes into the next batch, so a burst of
+    events finishing together costs a few commits instead of one each.
+    """
+
+    def __init__(self, worker_id: str):
+        self.worker_id = worker_id
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def complete(self, event_id: int) -> bool:
+        """
+        Queue a claimed event to be marked as done and wait until it has been.
+
+        Returns:
+            False if the worker no longer holds the event's lease
+        """
+        future = self._pending.get(event_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[event_id] = future
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush())
+        # Cancelling the caller must not drop the rest of the batch
+        return await asyncio.shield(future)
+
+    async def _flush(self) -> None:
+        while self._pending:
+            batch, self._pending = self._pending, {}
+            completed = set(await complete_events(list(batch), self.worker_id))
+            for event_id, future in batch.items():
+                if not future.done():
+                    future.set_result(event_id in completed)
+
+    async def drain(self) -> None:
+        """Wait until every queued completion has been written."""
+        if self._flusher is not None:
+            await self._flusher
+
+
+async def fail_event(
+    event_id: int,
+    worker_id: str,
+    error: str,
+    max_attempts: int = 3,
+    retry_delay: float = 60.0,
+) -> bool:
+    """
+    Record a failed run of a claimed event, retrying it later if attempts remain.
 
     Args:
-        event_id: The ID of the event to mark as completed
+        event_id: The ID of the claimed event
+        worker_id: The worker that claimed it
+        error: Description of the failure
+        max_attempts: Total number of runs allowed before the event is failed
+        retry_delay: Seconds to wait before the event becomes due again
 
     Returns:
-        True if the event was marked as completed, False otherwise
+        False if the worker no longer holds the event's lease
     """
     try:
-        # Ensure database exists before updating
-        if not os.path.exists(DB_PATH):
-            logger.warning(f"Database file does not exist: {DB_PATH}")
-            return False
+        db = await get_db()
+        async with db.execute(_SQL_EVENT_ATTEMPTS, (event_id,)) as cursor:
+            row = await cursor.fetchone()
+        if row is not None and row["attempts"] < max_attempts:
+            retry_at = datetime.datetime.now().timestamp() + retry_delay
+            async with _write_lock:
+                cursor = await db.execute(
+                    _SQL_RETRY_CLAIMED_EVENT, (retry_at, error, event_id, worker_id)
+                )
+                retried = cursor.rowcount > 0
+                await db.commit()
+            if retried:
+                logger.info(f"Event {event_id} will be retried in {retry_delay}s")
+            return retried
+    except Exception as e:
+        logger.error(f"Error retrying event {event_id}: {str(e)}")
+        return False
+    return await _finish_claimed_event(event_id, worker_id, "failed", error)
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
 
-        cursor.execute(
-            """
-        UPDATE scheduled_events
-        SET completed = 1
-        WHERE id = ?
-        """,
-            (event_id,),
-        )
+async def release_event(event_id: int, worker_id: str) -> bool:
+    """Give a claimed event back without counting the attempt, e.g. on shutdown."""
+    try:
+        db = await get_db()
+        async with _write_lock:
+            cursor = await db.execute(
+                _SQL_RELEASE_CLAIMED_EVENT, (event_id, worker_id)
+            )
+            released = cursor.rowcount > 0
+            await db.commit()
+        return released
+    except Exception as e:
+        logger.error(f"Error releasing event {event_id}: {str(e)}")
+        return False
+
+
+async def _finish_claimed_event(
+    event_id: int, worker_id: str, status: str, error: Optional[str]
+) -> bool:
+    try:
+        db = await get_db()
+        async with _write_lock:
+            cursor = await db.execute(
+                _SQL_FINISH_CLAIMED_EVENT, (status, error, event_id, worker_id)
+            )
+            finished = cursor.rowcount > 0
+            await db.commit()
 
-        conn.commit()
-        conn.close()
+        if finished:
+            logger.info(f"Event {event_id} marked as {status}")
+        else:
+            logger.warning(f"Worker {worker_id} no longer holds event {event_id}")
+        return finished
+    except Exception as e:
+        logger.error(f"Error marking event {event_id} as {status}: {str(e)}")
+        return False
+
+
+async def mark_event_completed(event_id: int) -> bool:
+    """
+    Mark an event as completed.
+
+    Args:
+        event_id: The ID of the event to mark as completed
+
+    Returns:
+        True if the event was marked as completed, False otherwise
+    """
+    try:
+        db = await get_db()
+        async with _write_lock:
+            await db.execute(_SQL_COMPLETE_EVENT, (event_id,))
+            await db.commit()
 
         logger.info(f"Event {event_id} marked as completed")
         return True
@@ -231,7 +1014,49 @@ def mark_event_completed(event_id: int) -> bool:
         return False
 
 
-def get_all_scheduled_events() -> List[ScheduledEvent]:
+async def archive_completed_events(
+    older_than_days: float = ARCHIVE_AFTER_DAYS,
+) -> int:
+    """
+    Move events completed more than older_than_days ago to scheduled_events_archive.
+
+    Rows are moved in batches, each in its own transaction, so the write lock is
+    never held for long.
+
+    Args:
+        older_than_days: How long completed events stay in scheduled_events
+
+    Returns:
+        The number of events archived
+    """
+    cutoff = datetime.datetime.now().timestamp() - older_than_days * 86400
+    archived = 0
+    try:
+        db = await get_db()
+        while True:
+            async with _write_lock:
+                params = (cutoff, ARCHIVE_BATCH_SIZE)
+                try:
+                    await db.execute(_SQL_ARCHIVE_EVENTS, params)
+                    cursor = await db.execute(_SQL_DELETE_ARCHIVED_EVENTS, params)
+                    moved = cursor.rowcount
+                    await db.commit()
+                except BaseException:
+                    # Copied but not deleted rows would be archived twice
+                    await db.rollback()
+                    raise
+            archived += moved
+            if moved < ARCHIVE_BATCH_SIZE:
+                break
+        if archived:
+            logger.info(f"Archived {archived} completed events")
+        return archived
+    except Exception as e:
+        logger.error(f"Error archiving completed events: {str(e)}")
+        return archived
+
+
+async def get_all_scheduled_events() -> List[ScheduledEvent]:
     """
     Get all scheduled events that haven't been completed yet.
 
@@ -239,47 +1064,123 @@ def get_all_scheduled_events() -> List[ScheduledEvent]:
         A list of ScheduledEvent objects
     """
     try:
-        # Ensure database exists before querying
-        if not os.path.exists(DB_PATH):
-            logger.warning(f"Database file does not exist: {DB_PATH}")
-            return []
-
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-        SELECT id, timestamp, function_name, message_id, channel_id, completed, data
-        FROM scheduled_events
-        WHERE completed = 0
-        ORDER BY timestamp ASC
-        """
-        )
+        db = await get_db()
+        async with db.execute(_SQL_ALL_EVENTS) as cursor:
+            rows = await cursor.fetchall()
 
-        rows = cursor.fetchall()
-        conn.close()
-
-        events = [
-            ScheduledEvent(
-                id=row["id"],
-                timestamp=row["timestamp"],
-                function_name=row["function_name"],
-                message_id=row["message_id"],
-                channel_id=row["channel_id"],
-                completed=bool(row["completed"]),
-                data=row["data"],
-            )
-            for row in rows
-        ]
-
-        return events
+        return [_row_to_event(row) for row in rows]
     except Exception as e:
         logger.error(f"Error getting scheduled events: {str(e)}")
         return []
 
 
-def cancel_event(event_id: int) -> bool:
+async def get_event(event_id: int) -> Optional[ScheduledEvent]:
+    """
+    Get a scheduled event by ID, whatever its status.
+
+    Args:
+        event_id: The ID of the event
+
+    Returns:
+        The ScheduledEvent, or None if there is no such event
+    """
+    try:
+        db = await get_db()
+        async with db.execute(_SQL_GET_EVENT, (event_id,)) as cursor:
+            row = await cursor.fetchone()
+
+        return _row_to_event(row) if row is not None else None
+    except Exception as e:
+        logger.error(f"Error getting event {event_id}: {str(e)}")
+        return None
+
+
+def _list_query(
+    table: str,
+    columns: str,
+    base: str,
+    order_column: str,
+    function_name: Optional[str],
+    channel_id: Optional[int],
+    guild_id: Optional[int],
+    after: Optional[Tuple[float, int]],
+    limit: int,
+) -> Tuple[str, list]:
+    # Only the filters actually given are put in the SQL, so each combination is
+    # one fixed statement that can use the matching index
+    clauses = [base]
+    params: list = []
+    filters = (("function_name", function_name), ("channel_id", channel_id))
+    for column, value in filters:
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if after is not None:
+        clauses.append(f"({order_column}, id) > (?, ?)")
+        params.extend(after)
+    where = " AND ".join(clauses)
+    order = f"ORDER BY {order_column} ASC, id ASC LIMIT ?"
+    if guild_id is None:
+        return f"SELECT {columns} FROM {table} WHERE {where} {order}", [*params, limit]
+
+    # Rows created before guild_id was recorded belong to any guild. They're a
+    # second branch rather than an OR, so both branches search the guild index in
+    # order and are merged without sorting.
+    sql = (
+        f"SELECT {columns} FROM {table} WHERE {where} AND guild_id = ? "
+        f"UNION ALL SELECT {columns} FROM {table} WHERE {where} AND guild_id IS NULL "
+        f"{order}"
+    )
+    return sql, [*params, guild_id, *params, limit]
+
+
+async def list_events(
+    function_name: Optional[str] = None,
+    channel_id: Optional[int] = None,
+    guild_id: Optional[int] = None,
+    after: Optional[Tuple[float, int]] = None,
+    limit: int = 10,
+) -> List[ScheduledEvent]:
+    """
+    Get one page of the events that haven't been completed yet, soonest first.
+
+    Pages are keyed on (timestamp, id): pass the timestamp and id of the last event
+    of a page as after to get the next one. Unlike offsets, this costs the same for
+    every page and doesn't skip or repeat events when others are added or removed.
+
+    Args:
+        function_name: Only include events for this function
+        channel_id: Only include events in this channel
+        guild_id: Only include events in this guild
+        after: The (timestamp, id) of the last event of the previous page
+        limit: Maximum number of events to return
+
+    Returns:
+        A list of ScheduledEvent objects
+    """
+    sql, params = _list_query(
+        "scheduled_events",
+        _EVENT_COLUMNS,
+        "completed = 0",
+        "timestamp",
+        function_name,
+        channel_id,
+        guild_id,
+        after,
+        limit,
+    )
+    try:
+        db = await get_db()
+        async with db.execute(sql, params) as cursor:
+            rows = await cursor.fetchall()
+
+        return [_row_to_event(row) for row in rows]
+    except Exception as e:
+        logger.error(f"Error listing events: {str(e)}")
+        return []
+
+
+async def cancel_event(event_id: int) -> bool:
     """
     Cancel a scheduled event by marking it as completed.
 
@@ -290,47 +1191,227 @@ def cancel_event(event_id: int) -> bool:
         True if the event was canceled successfully, False otherwise
     """
     try:
-        # Ensure database exists before updating
-        if not os.path.exists(DB_PATH):
-            logger.warning(f"Database file does not exist: {DB_PATH}")
+        db = await get_db()
+        async with _write_lock:
+            # Only pending events can be canceled, rowcount tells us if it was one
+            cursor = await db.execute(_SQL_CANCEL_EVENT, (event_id,))
+            canceled = cursor.rowcount > 0
+            await db.commit()
+
+        if not canceled:
+            logger.warning(f"Event {event_id} not found or already completed")
             return False
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        logger.info(f"Event {event_id} canceled successfully")
+        return True
+    except Exception as e:
+        logger.error(f"Error canceling event: {str(e)}")
+        return False
 
-        # Check if the event exists and is not completed
-        cursor.execute(
-            """
-        SELECT id FROM scheduled_events
-        WHERE id = ? AND completed = 0
-        """,
-            (event_id,),
-        )
 
-        if not cursor.fetchone():
-            logger.warning(f"Event {event_id} not found or already completed")
-            conn.close()
-            return False
+def _row_to_recurring(row) -> RecurringSchedule:
+    return RecurringSchedule(
+        id=row["id"],
+        function_name=row["function_name"],
+        message_id=row["message_id"],
+        channel_id=row["channel_id"],
+        weekday=row["weekday"],
+        hour=row["hour"],
+        minute=row["minute"],
+        timezone=row["timezone"],
+        data=row["data"],
+        next_fire_at=row["next_fire_at"],
+        last_fired_at=row["last_fired_at"],
+        guild_id=row["guild_id"],
+    )
+
+
+async def add_recurring_schedule(
+    function_name: str,
+    message_id: int,
+    channel_id: int,
+    weekday: int,
+    hour: int,
+    minute: int,
+    timezone: Optional[str] = None,
+    data: Optional[str] = None,
+    guild_id: Optional[int] = None,
+) -> RecurringSchedule:
+    """
+    Store a schedule that fires every week on weekday at hour:minute.
+
+    Args:
+        function_name: Name of the function to execute
+        message_id: Discord message ID to operate on
+        channel_id: Discord channel ID where the message is
+        weekday: Day of the week, 0 is Monday
+        hour: Hour of the day (0-23)
+        minute: Minute of the hour (0-59)
+        timezone: IANA timezone name, or None for the server's local time
+        data: Additional data needed for the function (JSON string)
+        guild_id: Discord guild ID of the channel, used to filter listings
 
-        # Mark the event as completed (effectively canceling it)
-        cursor.execute(
-            """
-        UPDATE scheduled_events
-        SET completed = 1
-        WHERE id = ?
-        """,
-            (event_id,),
+    Returns:
+        The newly created RecurringSchedule
+    """
+    next_fire_at = next_weekly_occurrence(weekday, hour, minute, timezone)
+    try:
+        db = await get_db()
+        async with _write_lock:
+            cursor = await db.execute(
+                _SQL_INSERT_RECURRING,
+                (
+                    function_name,
+                    message_id,
+                    channel_id,
+                    guild_id,
+                    weekday,
+                    hour,
+                    minute,
+                    timezone,
+                    data,
+                    next_fire_at,
+                ),
+            )
+            schedule_id = cursor.lastrowid
+            await db.commit()
+
+        logger.info(
+            f"Recurring schedule {schedule_id} added: {function_name} weekly, first at {datetime.datetime.fromtimestamp(next_fire_at).isoformat()}"
         )
+    except Exception as e:
+        logger.error(f"Error adding recurring schedule: {str(e)}")
+        raise
 
-        conn.commit()
-        conn.close()
+    _notify_schedule_listeners(next_fire_at)
+    return RecurringSchedule(
+        id=schedule_id,
+        function_name=function_name,
+        message_id=message_id,
+        channel_id=channel_id,
+        weekday=weekday,
+        hour=hour,
+        minute=minute,
+        timezone=timezone,
+        data=data,
+        next_fire_at=next_fire_at,
+        guild_id=guild_id,
+    )
 
-        logger.info(f"Event {event_id} canceled successfully")
-        return True
+
+async def get_recurring_schedules() -> List[RecurringSchedule]:
+    """
+    Get every active recurring schedule.
+
+    Returns:
+        A list of RecurringSchedule objects, soonest first
+    """
+    try:
+        db = await get_db()
+        async with db.execute(_SQL_ACTIVE_RECURRING) as cursor:
+            rows = await cursor.fetchall()
+
+        return [_row_to_recurring(row) for row in rows]
     except Exception as e:
-        logger.error(f"Error canceling event: {str(e)}")
+        logger.error(f"Error getting recurring schedules: {str(e)}")
+        return []
+
+
+async def list_recurring_schedules(
+    function_name: Optional[str] = None,
+    channel_id: Optional[int] = None,
+    guild_id: Optional[int] = None,
+    after: Optional[Tuple[float, int]] = None,
+    limit: int = 10,
+) -> List[RecurringSchedule]:
+    """
+    Get one page of active recurring schedules, soonest next fire time first.
+
+    Works like list_events, paging on (next_fire_at, id).
+    """
+    sql, params = _list_query(
+        "recurring_schedules",
+        _RECURRING_COLUMNS,
+        "active = 1",
+        "next_fire_at",
+        function_name,
+        channel_id,
+        guild_id,
+        after,
+        limit,
+    )
+    try:
+        db = await get_db()
+        async with db.execute(sql, params) as cursor:
+            rows = await cursor.fetchall()
+
+        return [_row_to_recurring(row) for row in rows]
+    except Exception as e:
+        logger.error(f"Error listing recurring schedules: {str(e)}")
+        return []
+
+
+async def get_recurring_schedule(schedule_id: int) -> Optional[RecurringSchedule]:
+    """Get an active recurring schedule by ID, or None if there isn't one."""
+    try:
+        db = await get_db()
+        async with db.execute(_SQL_GET_RECURRING, (schedule_id,)) as cursor:
+            row = await cursor.fetchone()
+
+        return _row_to_recurring(row) if row is not None else None
+    except Exception as e:
+        logger.error(f"Error getting recurring schedule {schedule_id}: {str(e)}")
+        return None
+
+
+async def advance_recurring_schedule(
+    schedule_id: int, fired_at: float, next_fire_at: float
+) -> bool:
+    """
+    Move a recurring schedule from the occurrence at fired_at to next_fire_at.
+
+    This is the claim on the occurrence: when several workers try to advance the
+    same schedule, only the first one succeeds and should run it.
+
+    Returns:
+        True if this call advanced the schedule
+    """
+    try:
+        db = await get_db()
+        async with _write_lock:
+            cursor = await db.execute(
+                _SQL_ADVANCE_RECURRING,
+                (next_fire_at, fired_at, schedule_id, fired_at),
+            )
+            advanced = cursor.rowcount > 0
+            await db.commit()
+        return advanced
+    except Exception as e:
+        logger.error(f"Error advancing recurring schedule {schedule_id}: {str(e)}")
         return False
 
 
-# Initialize the scheduler database
-init_db()
+async def cancel_recurring_schedule(schedule_id: int) -> bool:
+    """
+    Stop a recurring schedule from firing again.
+
+    Args:
+        schedule_id: The ID of the schedule to cancel
+
+    Returns:
+        True if the schedule was cancelled, False otherwise
+    """
+    try:
+        db = await get_db()
+        async with _write_lock:
+            cursor = await db.execute(_SQL_CANCEL_RECURRING, (schedule_id,))
+            cancelled = cursor.rowcount > 0
+            await db.commit()
+
+        if cancelled:
+            logger.info(f"Recurring schedule {schedule_id} cancelled")
+        return cancelled
+    except Exception as e:
+        logger.error(f"Error cancelling recurring schedule {schedule_id}: {str(e)}")
+        return False
+
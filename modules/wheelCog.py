@@ -15,43 +15,62 @@ from typing import Optional
 import dataframe_image as dfi
 import discord
 import pandas as pd
+import pytz
 import requests
 from discord.ext import commands, tasks
 from selenium import webdriver
 
 from modules import ChatHandler, WheelSpinner
+from modules.PresetFilters import compile_filter
+from modules.PrerenderCache import PrerenderCache
+from modules.PresetIndex import MAX_CHOICES, PresetIndex
+from modules.SheetCache import NoTabError, SheetCache
+from modules.scheduler import dispatcher
 from modules.scheduler.scheduler import (
+    add_recurring_schedule,
     cancel_event,
-    get_all_scheduled_events,
-    get_pending_events,
-    mark_event_completed,
+    cancel_recurring_schedule,
+    get_event,
+    get_recurring_schedule,
+    list_events,
+    list_recurring_schedules,
+    next_weekly_occurrence,
     schedule_event,
 )
 
+# Timezone used by /schedule spin when none is given, server local time if unset
+SCHEDULE_TIMEZONE = os.getenv("SCHEDULE_TIMEZONE")
 
-async def get_presets(a):
-    base_url = f'https://docs.google.com/spreadsheets/d/{os.getenv("GSHEET_ID")}'
-    presets_df = pd.read_csv(f"{base_url}/gviz/tq?tqx=out:csv&sheet={'presets'}")
-    return [x["Fullname"] for x in presets_df.to_dict("records")]
+# Scheduled spins are rendered this long before they're due, so posting them is
+# only an upload
+PRERENDER_LEAD_SECONDS = float(os.getenv("PRERENDER_LEAD_SECONDS", "600"))
+
+# Prerendered spins older than this are deleted, they belong to spins that ran or
+# were cancelled elsewhere
+PRERENDER_MAX_AGE = 24 * 60 * 60
+
+# Scheduled spins shown per page of /schedule list, well within 2000 characters
+SCHEDULE_PAGE_SIZE = 8
+
+# Autocomplete callbacks are bound at class definition time, so the index lives
+# at module level and is rebuilt by WheelCog whenever the presets sheet changes
+preset_index = PresetIndex()
+
+
+async def get_presets(ctx):
+    return preset_index.search(ctx.value)
 
 
 async def get_preset_tabs(ctx):
-    base_url = f'https://docs.google.com/spreadsheets/d/{os.getenv("GSHEET_ID")}'
-    presets_df = pd.read_csv(f"{base_url}/gviz/tq?tqx=out:csv&sheet={'presets'}")
     preset_name = ctx.options.get("preset_name", "")
     if not preset_name:
         return []
-    try:
-        filters_df = presets_df.query(
-            f"Fullname.astype('string').str.lower()=='{preset_name.lower()}'"
-        ).to_dict("records")[0]
-        tabs = [
-            k for k, v in filters_df.items() if isinstance(v, str) and k != "Fullname"
-        ]
-        return tabs
-    except Exception as e:
-        logging.error(f"Error getting tabs for preset {preset_name}: {str(e)}")
-        return []
+    return preset_index.get_tabs(preset_name, ctx.value)
+
+
+async def get_timezones(ctx):
+    value = (ctx.value or "").lower()
+    return [tz for tz in pytz.common_timezones if value in tz.lower()][:MAX_CHOICES]
 
 
 def to_thread(func: typing.Callable):
@@ -62,10 +81,6 @@ def to_thread(func: typing.Callable):
     return wrapper
 
 
-class NoTabError(Exception):
-    pass
-
-
 def wheel_command(needs_driver=True, is_interaction=True):
     """
     Decorator for wheel commands that handles common operations:
@@ -86,9 +101,9 @@ def wheel_command(needs_driver=True, is_interaction=True):
             # First defer the interaction
             if is_interaction:
                 await ctx.defer()
-                bot_response = await ctx.respond(ChatHandler.working_on_it())
+                bot_response = await ctx.respond(await ChatHandler.working_on_it())
             else:
-                bot_response = await ctx.send(ChatHandler.working_on_it())
+                bot_response = await ctx.send(await ChatHandler.working_on_it())
 
             driver = None
             try:
@@ -177,11 +192,72 @@ class _WheelOption:
         self.include_text = include_text if include_text is not None else ""
 
 
+class ScheduledSpinsView(discord.ui.View):
+    def __init__(self, cog, ctx, weekly=False):
+        super().__init__(timeout=600)
+        self.cog = cog
+        self.ctx = ctx
+        self.weekly = weekly
+        # Keyset cursor of the first spin of every page seen so far
+        self.page_starts = [None]
+        self.page = 0
+
+    async def render_page(self):
+        """Fetch the current page and return its message text."""
+        if self.weekly:
+            spins = await list_recurring_schedules(
+                function_name="spin_preset",
+                guild_id=self.ctx.guild.id if self.ctx.guild else None,
+                after=self.page_starts[self.page],
+                limit=SCHEDULE_PAGE_SIZE + 1,
+            )
+        else:
+            spins = await list_events(
+                function_name="spin_preset",
+                guild_id=self.ctx.guild.id if self.ctx.guild else None,
+                after=self.page_starts[self.page],
+                limit=SCHEDULE_PAGE_SIZE + 1,
+            )
+
+        # One extra spin is fetched to tell whether there's a next page
+        has_next = len(spins) > SCHEDULE_PAGE_SIZE
+        spins = spins[:SCHEDULE_PAGE_SIZE]
+        if has_next and len(self.page_starts) == self.page + 1:
+            last = spins[-1]
+            key = last.next_fire_at if self.weekly else last.timestamp
+            self.page_starts.append((key, last.id))
+
+        self.previous_callback.disabled = self.page == 0
+        self.next_callback.disabled = not has_next
+        return self.cog.format_spin_page(self.ctx, spins, self.weekly, self.page)
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous_callback(self, button, interaction: discord.Interaction):
+        self.page = max(self.page - 1, 0)
+        await interaction.response.edit_message(
+            content=await self.render_page(), view=self
+        )
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.primary)
+    async def next_callback(self, button, interaction: discord.Interaction):
+        self.page = min(self.page + 1, len(self.page_starts) - 1)
+        await interaction.response.edit_message(
+            content=await self.render_page(), view=self
+        )
+
+
 class WheelCog(commands.Cog):
     def __init__(self, bot):
         base_url = f'https://docs.google.com/spreadsheets/d/{os.getenv("GSHEET_ID")}'
 
         self.ghseet_url = lambda x: f"{base_url}/gviz/tq?tqx=out:csv&sheet={x}"
+        self.sheet_cache = SheetCache(self.ghseet_url)
+
+        # Option sets for every tab of every working preset, keyed by lowercased
+        # preset name, and the last error seen for each broken preset
+        self.compiled_presets = {}
+        self.preset_errors = {}
+        self.admin_channel_id = os.getenv("ADMIN_CHANNEL_ID")
 
         # Days of week for schedule command
         self.days_of_week = {
@@ -194,7 +270,13 @@ class WheelCog(commands.Cog):
             "sunday": 6,
         }
 
-        self.presets_df = pd.read_csv(self.ghseet_url("presets"))
+        # Start from the last-known-good snapshot, refresh_presets fetches the live
+        # sheet in the background as soon as the bot is running
+        self.presets_df = None
+        self.sheet_cache.load_snapshots()
+        presets_df = self.sheet_cache.load_snapshot("presets")
+        if presets_df is not None:
+            self.set_presets(presets_df)
         options = webdriver.FirefoxOptions()
         options.add_argument("--headless")
         options.add_argument("--height=1100")
@@ -203,67 +285,312 @@ class WheelCog(commands.Cog):
         self.driver_options = options
 
         self.bot = bot
-        self.check_scheduled_events.start()
+        # Scheduled spins rendered ahead of time, and the renders still running
+        self.prerender_cache = PrerenderCache()
+        self.prerenders = {}
+        # Rendering a chain of wheels can take a few minutes
+        dispatcher.register(
+            "spin_preset",
+            self.run_scheduled_spin,
+            timeout=900,
+            prepare=self.prerender_spin,
+            lead_time=PRERENDER_LEAD_SECONDS,
+        )
         self.refresh_presets.start()
+        self.prune_prerenders.start()
+
+    def cog_unload(self):
+        self.bot.loop.create_task(self.sheet_cache.close())
 
     spin = discord.SlashCommandGroup("spin", "Spin commands")
     schedule = discord.SlashCommandGroup("schedule", "Schedule commands")
 
     @tasks.loop(minutes=5)
     async def refresh_presets(self):
-        """Refresh the presets dataframe every minute."""
+        """Refresh the presets dataframe every five minutes and precompile every preset."""
         try:
-            self.presets_df = pd.read_csv(self.ghseet_url("presets"))
+            await self.fetch_presets()
             logging.info("Presets dataframe refreshed successfully.")
         except Exception as e:
             logging.error(f"Error refreshing presets dataframe: {str(e)}")
+        try:
+            await self.compile_presets()
+        except Exception as e:
+            logging.error(f"Error compiling presets: {str(e)}")
 
-    @tasks.loop(minutes=1)
-    async def check_scheduled_events(self):
-        """Check for pending scheduled events and execute them."""
-        pending_events = get_pending_events()
-        message, files, filename = "No matching command.", None, None
-        for event in pending_events:
-            try:
-                logging.info(
-                    f"Processing scheduled event {event.id}: {event.function_name}"
-                )
+    @tasks.loop(hours=1)
+    async def prune_prerenders(self):
+        """Delete prerendered spins that were never posted."""
+        try:
+            await asyncio.to_thread(
+                self.prerender_cache.prune, max_age=PRERENDER_MAX_AGE
+            )
+        except Exception as e:
+            logging.error(f"Error pruning prerendered spins: {str(e)}")
+
+    async def compile_presets(self):
+        """
+        Refresh every tab used by a preset (and any tab cached by an on_select chain),
+        then compile and evaluate the filters of every preset so spins can reuse the
+        results. Presets that have started failing since the last run are reported to
+        the admin channel.
+        """
+        if self.presets_df is None:
+            return
+        presets = {}
+        for record in self.presets_df.to_dict("records"):
+            name = record.get("Fullname")
+            if not isinstance(name, str):
+                continue
+            presets[name] = {
+                tab: str(filter_string).lower()
+                for tab, filter_string in record.items()
+                if isinstance(filter_string, str) and tab != "Fullname"
+            }
 
-                # Get the channel where this event should be executed
-                channel = await self.bot.fetch_channel(int(event.channel_id))
-                if not channel:
-                    logging.error(
-                        f"Channel {event.channel_id} not found for event {event.id}"
-                    )
-                    if event.id is not None:
-                        mark_event_completed(event.id)
+        tabs = list(
+            {tab.lower() for filters in presets.values() for tab in filters}
+            | set(self.sheet_cache.tabs) - {"presets"}
+        )
+        results = await asyncio.gather(
+            *(self.sheet_cache.fetch(tab) for tab in tabs), return_exceptions=True
+        )
+        for tab, result in zip(tabs, results):
+            if isinstance(result, Exception):
+                logging.warning(f"Using last cached copy of tab {tab}: {str(result)}")
+
+        # Evaluating every filter is pure pandas work, keep it off the event loop
+        compiled, errors = await asyncio.to_thread(self._compile_presets, presets)
+        newly_broken = {
+            name: error
+            for name, error in errors.items()
+            if self.preset_errors.get(name) != error
+        }
+        self.compiled_presets = compiled
+        self.preset_errors = errors
+        logging.info(f"Compiled {len(compiled)} presets, {len(errors)} with errors.")
+        if newly_broken:
+            await self.report_broken_presets(newly_broken)
+        await self.prefetch_on_select_tabs(
+            opt_set
+            for option_sets in compiled.values()
+            for opt_set in option_sets.values()
+        )
+
+    async def prefetch_on_select_tabs(self, option_sets, max_depth=10):
+        """
+        Speculatively cache every tab an on_select chain starting from these option
+        sets could land on. Each level of the chain is fetched concurrently, so the
+        wait is bounded by the longest chain rather than by the number of tabs.
+        """
+        pending = {
+            option.on_select
+            for opt_set in option_sets
+            for option in opt_set
+            if isinstance(option.on_select, str)
+        }
+        seen = set()
+        depth = 0
+        while pending and depth < max_depth:
+            targets = {}
+            for on_select in pending - seen:
+                seen.add(on_select)
+                tab, _, filter_string = on_select.partition(" ")
+                targets.setdefault(tab.lower(), set()).add(filter_string)
+            await asyncio.gather(
+                *(
+                    self.sheet_cache.fetch(tab)
+                    for tab in targets
+                    if self.sheet_cache.cached(tab) is None
+                ),
+                return_exceptions=True,
+            )
+            # The next level comes from whichever column each filter uses for on_select
+            pending = set()
+            for tab, filter_strings in targets.items():
+                df = self.sheet_cache.cached(tab)
+                if df is None:
                     continue
+                for filter_string in filter_strings:
+                    column = compile_filter(filter_string).on_select
+                    if column in df.columns:
+                        pending.update(v for v in df[column] if isinstance(v, str))
+            depth += 1
+
+    def _compile_presets(self, presets):
+        compiled = {}
+        errors = {}
+        for name, filters in presets.items():
+            option_sets = {}
+            for tab, filter_string in filters.items():
+                try:
+                    df = self.sheet_cache.cached(tab)
+                    if df is None:
+                        raise NoTabError(f"Tab {tab} could not be loaded")
+                    opt_set = self.build_option_set(compile_filter(filter_string), df)
+                    if not any(option.weight > 0 for option in opt_set):
+                        raise ValueError("All options have zero weight")
+                    option_sets[tab] = opt_set
+                except Exception as e:
+                    errors[name] = f"Tab {tab}, filter {filter_string}: {str(e)}"
+                    break
+            else:
+                compiled[name.lower()] = option_sets
+        return compiled, errors
 
-                # Parse the event data
-                data = json.loads(event.data) if event.data else {}
+    async def report_broken_presets(self, errors):
+        message = "These presets will fail when spun:\n" + "\n".join(
+            f"- **{name}**: {error}" for name, error in errors.items()
+        )
+        logging.warning(message)
+        if not self.admin_channel_id:
+            return
+        try:
+            await self.bot.wait_until_ready()
+            channel = await self.bot.fetch_channel(int(self.admin_channel_id))
+            await channel.send(message[:2000])
+        except Exception as e:
+            logging.error(f"Error reporting broken presets: {str(e)}")
 
-                if event.function_name == "spin_preset":
-                    preset_name = data.get("preset_name")
-                    role_id = data.get("role_id")
-                    role = None
-                    if role_id:
-                        try:
-                            guild = channel.guild
-                            role = guild.get_role(role_id)
-                        except Exception as e:
-                            logging.error(f"Error fetching role {role_id}: {str(e)}")
+    async def resolve_preset(self, preset_name):
+        """
+        Return the option set of every tab in a preset, keyed by tab name.
 
-                    await self.spin_preset_new_message(
-                        ctx=channel, preset_name=preset_name, role=role
-                    )
+        Uses the sets compiled by refresh_presets when available, and resolves the
+        preset against fresh sheet data otherwise (new or broken presets).
+        Returns None if there is no preset with that name.
+        """
+        option_sets = self.compiled_presets.get(preset_name.lower())
+        if option_sets is not None:
+            return option_sets
+
+        await self.fetch_presets()
+        try:
+            filters_df = self.presets_df.query(
+                f"Fullname.astype('string').str.lower()=='{preset_name.lower()}'"
+            ).to_dict("records")[0]
+        except IndexError:
+            return None
 
-                    # Mark the event as completed
-                    if event.id is not None:
-                        mark_event_completed(event.id)
+        filters = [
+            (tab, filter_string.lower())
+            for tab, filter_string in filters_df.items()
+            if isinstance(filter_string, str) and tab != "Fullname"
+        ]
+        results = await asyncio.gather(
+            *(
+                self.generate_option_set(tab, filter_string, refresh=True)
+                for tab, filter_string in filters
+            ),
+            return_exceptions=True,
+        )
+        option_sets = {}
+        for (tab, filter_string), result in zip(filters, results):
+            if isinstance(result, Exception):
+                logging.error(
+                    f"Error processing tab {tab}, filter string {filter_string}: {str(result)}"
+                )
+                raise result
+            option_sets[tab] = result
+        return option_sets
+
+    def set_presets(self, presets_df):
+        """Store a presets dataframe, rebuilding the autocomplete index only if it changed."""
+        if self.presets_df is not None and presets_df.equals(self.presets_df):
+            return False
+        self.presets_df = presets_df
+        preset_index.rebuild_from_dataframe(presets_df)
+        logging.info(f"Preset index rebuilt with {len(preset_index)} presets.")
+        return True
+
+    async def fetch_presets(self):
+        """Fetch the presets sheet and store it."""
+        presets_df = await self.sheet_cache.read("presets")
+        self.set_presets(presets_df)
+        return presets_df
+
+    async def run_scheduled_spin(self, event):
+        """Dispatcher handler for spin_preset events."""
+        # Get the channel where this event should be executed
+        channel = await self.bot.fetch_channel(int(event.channel_id))
+        if not channel:
+            logging.error(f"Channel {event.channel_id} not found for event {event.id}")
+            return
+
+        # Parse the event data
+        data = json.loads(event.data) if event.data else {}
+        preset_name = data.get("preset_name")
+        role_id = data.get("role_id")
+        role = None
+        if role_id:
+            try:
+                guild = channel.guild
+                role = guild.get_role(role_id)
             except Exception as e:
-                logging.error(f"Error executing scheduled event {event.id}: {str(e)}")
+                logging.error(f"Error fetching role {role_id}: {str(e)}")
+
+        # Let a prerender that's still going finish rather than starting over. Its
+        # errors are logged by the dispatcher, and a failed one is spun live below
+        prerender = self.prerenders.pop(event.key, None)
+        if prerender is not None:
+            await asyncio.wait([prerender])
+
+        prerendered = await asyncio.to_thread(self.prerender_cache.load, event.key)
+        if prerendered is None:
+            await self.spin_preset_new_message(
+                ctx=channel, preset_name=preset_name, role=role
+            )
+            return
 
-            return message, files, filename
+        gifs, responses = prerendered
+        message = "{} {}".format(self.get_message(), " ".join(responses))
+        await channel.send(
+            content=f"{role.mention} {message}" if role else message,
+            files=[discord.File(fp=gif, filename="wheel.gif") for gif in gifs],
+        )
+        await asyncio.to_thread(self.prerender_cache.discard, event.key)
+
+    async def prerender_spin(self, event):
+        """Dispatcher prepare hook for spin_preset events, renders the spin to disk."""
+        self.prerenders = {
+            key: task for key, task in self.prerenders.items() if not task.done()
+        }
+        task = asyncio.create_task(self._prerender_spin(event))
+        self.prerenders[event.key] = task
+        await task
+
+    async def _prerender_spin(self, event):
+        data = json.loads(event.data) if event.data else {}
+        preset_name = data.get("preset_name")
+        option_sets = await self.resolve_preset(preset_name)
+        if option_sets is None:
+            # Spun live at fire time, which reports the missing preset
+            logging.warning(f"Not prerendering missing preset {preset_name}")
+            return
+
+        driver = await asyncio.to_thread(webdriver.Firefox, options=self.driver_options)
+        try:
+            gifs, responses = await self.spin_and_render(option_sets, driver)
+        finally:
+            await asyncio.to_thread(driver.quit)
+        save = asyncio.ensure_future(
+            asyncio.to_thread(self.prerender_cache.save, event.key, gifs, responses)
+        )
+        try:
+            await asyncio.shield(save)
+        except asyncio.CancelledError:
+            # The write can't be stopped, so let it finish before the task ends and
+            # whoever cancelled it discards the render
+            await save
+            raise
+
+    async def discard_prerender(self, key):
+        """Stop prerendering a cancelled spin and delete what was rendered."""
+        task = self.prerenders.pop(key, None)
+        if task is not None:
+            task.cancel()
+            await asyncio.wait([task])
+        await asyncio.to_thread(self.prerender_cache.discard, key)
 
     @staticmethod
     def get_message(messages_file="messages.txt"):
@@ -343,45 +670,29 @@ class WheelCog(commands.Cog):
         bot_response=None,
     ):
         try:
-            self.presets_df = await asyncio.to_thread(
-                pd.read_csv, self.ghseet_url("presets")
-            )
-            filters_df = self.presets_df.query(
-                f"Fullname.astype('string').str.lower()=='{preset_name.lower()}'"
-            ).to_dict("records")[0]
-        except IndexError:
+            option_sets = await self.resolve_preset(preset_name)
+        except Exception as e:
+            return f"The preset {preset_name} ran into an error: {str(e)}", None, None
+        if option_sets is None:
             return f"I can't find a preset named {preset_name}.", None, None
 
-        wheels = []
-        for tab in filters_df.keys():
-            if isinstance(filters_df[tab], str) and tab != "Fullname":
-                filter_string = str(filters_df[tab]).lower()
-                try:
-                    opt_set = await self.generate_option_set(tab, filter_string)
-                except Exception as e:
-                    logging.error(
-                        f"Error processing tab {tab}, filter string {filter_string}: {str(e)}"
-                    )
-                    return (
-                        f"The preset {preset_name} ran into an error: {str(e)}",
-                        None,
-                        None,
-                    )
+        gifs, responses = await self.spin_and_render(option_sets, driver)
+        message = "{} {}".format(self.get_message(), " ".join(responses))
+        return message, gifs, "wheel.gif", role
 
-                wheel = WheelSpinner.WheelSpinner(opt_set)
-                wheels.append(wheel)
-                depth = 0
-                next_spin = wheel.next_spin
-                while next_spin is not None and depth < 10:
-                    next_tab, next_filter_string = next_spin
-                    next_opt_set = await self.generate_option_set(
-                        next_tab, next_filter_string
-                    )
-                    next_wheel = WheelSpinner.WheelSpinner(next_opt_set)
-                    wheels.append(next_wheel)
-                    next_spin = next_wheel.next_spin
-                    depth += 1
-                    pass
+    async def spin_and_render(self, option_sets, driver):
+        """Spin every tab of a preset, returning the wheel GIFs and their responses."""
+        # Start warming the tabs the chains could need while the first wheels spin
+        prefetch = asyncio.create_task(
+            self.prefetch_on_select_tabs(option_sets.values())
+        )
+        try:
+            chains = await asyncio.gather(
+                *(self.spin_chain(opt_set) for opt_set in option_sets.values())
+            )
+        finally:
+            prefetch.cancel()
+        wheels = [wheel for chain in chains for wheel in chain]
 
         gifs = []
         responses = []
@@ -389,9 +700,23 @@ class WheelCog(commands.Cog):
             # return_gif does 90 blocking Selenium screenshots — run it off the event loop
             gifs.append(await asyncio.to_thread(wheel.return_gif, driver))
             responses.append(wheel.response)
-
-        message = "{} {}".format(self.get_message(), " ".join(responses))
-        return message, gifs, "wheel.gif", role
+        return gifs, responses
+
+    async def spin_chain(self, opt_set, max_depth=10):
+        """Spin a wheel and follow its on_select chain, returning every wheel spun."""
+        # WheelSpinner reorders the list it's given, and compiled sets are shared
+        wheel = WheelSpinner.WheelSpinner(list(opt_set))
+        wheels = [wheel]
+        depth = 0
+        next_spin = wheel.next_spin
+        while next_spin is not None and depth < max_depth:
+            next_tab, next_filter_string = next_spin
+            next_opt_set = await self.generate_option_set(next_tab, next_filter_string)
+            next_wheel = WheelSpinner.WheelSpinner(next_opt_set)
+            wheels.append(next_wheel)
+            next_spin = next_wheel.next_spin
+            depth += 1
+        return wheels
 
     @commands.slash_command(name="spinfo")
     @discord.option(
@@ -415,26 +740,19 @@ class WheelCog(commands.Cog):
     @wheel_command()
     async def spinfo(self, ctx, preset_name, tab_name, driver=None, bot_response=None):
         try:
-            self.presets_df = await asyncio.to_thread(
-                pd.read_csv, self.ghseet_url("presets")
-            )
-            filters_df = self.presets_df.query(
-                f"Fullname.astype('string').str.lower()=='{preset_name.lower()}'"
-            ).to_dict("records")[0]
-        except IndexError:
+            option_sets = await self.resolve_preset(preset_name)
+        except Exception as e:
+            return f"The preset {preset_name} ran into an error: {str(e)}", None, None
+        if option_sets is None:
             return f"I can't find a preset named {preset_name}.", None, None
 
-        for tab in filters_df.keys():
+        opt_set = None
+        for tab in option_sets.keys():
             if tab.lower() == tab_name.lower():
                 tab_name = tab
-        filter_string = str(filters_df[tab_name]).lower()
-        try:
-            opt_set = await self.generate_option_set(tab_name, filter_string)
-        except Exception as e:
-            logging.error(
-                f"Error processing tab {tab_name}, filter string {filter_string}: {str(e)}"
-            )
-            return f"The preset {preset_name} ran into an error: {str(e)}", None, None
+                opt_set = option_sets[tab]
+        if opt_set is None:
+            return f"The preset {preset_name} has no tab named {tab_name}.", None, None
         options_df = pd.DataFrame(
             [[option.option, option.weight, option.on_select] for option in opt_set],
             columns=["Option", "Weight", "OnSelect"],
@@ -482,124 +800,18 @@ class WheelCog(commands.Cog):
             "options.png",
         )
 
-    async def generate_option_set(self, tab, filter_string=""):
-        try:
-            df = await asyncio.to_thread(pd.read_csv, self.ghseet_url(tab))
-            if list(df.columns.values) == ["FALSE"]:
-                raise NoTabError(f"Tab {tab} not found")
-            pass
-        except NoTabError as e:
-            raise e
-        except Exception as e:
-            logging.error(f"Error processing tab {tab}: {str(e)}")
-            raise e
-        df.columns = df.columns.str.lower()
-        filter_string = filter_string.strip(" ").lower()
-        filters = filter_string.split(",")
-        filter_queries = []
-        weighting = None
-        on_select = None
-        response_text = None
-        for filter in filters:
-            try:
-                if filter.find("|") > 0:
-                    or_query = []
-                    for option in filter.split("|"):
-                        if option.find("<>") > 0:
-                            a = option.split("<>")
-                            or_query.append(
-                                f"not `{a[0].strip(' ')}`.astype('string').str.lower().str.contains('{a[1].strip(' ')}')"
-                            )
-                        elif option.find(">=") > 0:
-                            a = option.split(">=")
-                            or_query.append(f"`{a[0].strip(' ')}`>={a[1].strip(' ')}")
-                        elif option.find("<=") > 0:
-                            a = option.split("<=")
-                            or_query.append(f"`{a[0].strip(' ')}`<={a[1].strip(' ')}")
-                        elif option.find("<") > 0:
-                            a = option.split("<")
-                            or_query.append(f"`{a[0].strip(' ')}`<{a[1].strip(' ')}")
-                        elif option.find(">") > 0:
-                            a = option.split(">")
-                            or_query.append(f"`{a[0].strip(' ')}`>{a[1].strip(' ')}")
-                        elif option.find(":") > 0:
-                            a = option.split(":")
-                            or_query.append(
-                                f"`{a[0].strip(' ')}`.astype('string').str.lower().str.contains('{a[1].strip(' ')}')"
-                            )
-                        elif option.find("=") > 0:
-                            a = option.split("=")
-                            or_query.append(
-                                f"`{a[0].strip(' ')}`.astype('string').str.lower()=='{a[1].strip(' ')}'"
-                            )
-                    filter_queries.append(" | ".join(or_query))
-                else:
-                    if filter.find("!weight=") >= 0:
-                        weighting = filter.split("=")[1]
-                    elif filter.find("!onselect=") >= 0:
-                        on_select = filter.split("=")[1]
-                    elif filter.find("!response=") >= 0:
-                        response_text = filter.split("=")[1]
-                    elif filter.find("<>") > 0:
-                        a = filter.split("<>")
-                        filter_queries.append(
-                            f"not `{a[0].strip(' ')}`.astype('string').str.lower().str.contains('{a[1].strip(' ')}')"
-                        )
-                    elif filter.find(">=") > 0:
-                        a = filter.split(">=")
-                        filter_queries.append(f"`{a[0].strip(' ')}`>={a[1].strip(' ')}")
-                    elif filter.find("<=") > 0:
-                        a = filter.split("<=")
-                        filter_queries.append(f"`{a[0].strip(' ')}`<={a[1].strip(' ')}")
-                    elif filter.find("<") > 0:
-                        a = filter.split("<")
-                        filter_queries.append(f"`{a[0].strip(' ')}`<{a[1].strip(' ')}")
-                    elif filter.find(">") > 0:
-                        a = filter.split(">")
-                        filter_queries.append(f"`{a[0].strip(' ')}`>{a[1].strip(' ')}")
-                    elif filter.find(":") > 0:
-                        a = filter.split(":")
-                        filter_queries.append(
-                            f"`{a[0].strip(' ')}`.astype('string').str.lower().str.contains('{a[1].strip(' ')}')"
-                        )
-                    elif filter.find("=") > 0:
-                        a = filter.split("=")
-                        filter_queries.append(
-                            f"`{str(a[0].strip(' '))}`.astype('string').str.lower()=='{a[1].strip(' ')}'"
-                        )
-            except Exception as e:
-                logging.error(f"Error processing filter {filter}: {str(e)}")
-                raise Exception(f"One of your filters is not properly formatted") from e
-
-        filtereddf = df
-        for query_string in filter_queries:
-            try:
-                filtereddf = filtereddf.query(query_string)
-            except Exception as e:
-                logging.error(f"Error processing filter {query_string}: {str(e)}")
-                raise Exception(f"Something is wrong with one of your filters.") from e
-        if filtereddf.empty:
-            raise Exception(f"Your filter {filter} returned no results")
-        selections = filtereddf.to_dict("records")
-        if weighting is None:
-            for selection in selections:
-                selection["nullweight"] = 1
-                weighting = "nullweight"
-        if on_select is None:
-            for selection in selections:
-                selection["nullonSelect"] = None
-                on_select = "nullonSelect"
-
-        option_set = [
-            _WheelOption(
-                selection["fullname"],
-                int(selection[weighting]),
-                selection[on_select],
-                None if response_text is None else selection[response_text],
-            )
-            for selection in selections
-        ]
-        return option_set
+    @staticmethod
+    def build_option_set(plan, df):
+        """Evaluate a compiled filter plan against a cached tab."""
+        return [_WheelOption(**selection) for selection in plan.apply(df)]
+
+    async def generate_option_set(self, tab, filter_string="", refresh=False):
+        plan = compile_filter(filter_string)
+        if refresh:
+            df = await self.sheet_cache.fetch(tab)
+        else:
+            df = await self.sheet_cache.get(tab)
+        return self.build_option_set(plan, df)
 
     @spin.command(name="order")
     @discord.option(
@@ -683,6 +895,20 @@ class WheelCog(commands.Cog):
         required=False,
         description="Role to tag when the spin is executed",
     )
+    @discord.option(
+        "repeat",
+        description="Spin once, or at this time every week",
+        choices=["once", "weekly"],
+        required=False,
+        default="once",
+    )
+    @discord.option(
+        "timezone",
+        description="Timezone of the day and time, e.g. America/New_York",
+        autocomplete=get_timezones,
+        required=False,
+        default=None,
+    )
     async def schedule_spin(
         self,
         ctx,
@@ -691,38 +917,25 @@ class WheelCog(commands.Cog):
         minute: int,
         preset_name: str,
         role: Optional[discord.Role] = None,
+        repeat: str = "once",
+        timezone: Optional[str] = None,
     ):
         """Schedule a preset spin in the current channel for a specific day and time."""
         await ctx.defer()
-        self.presets_df = pd.read_csv(self.ghseet_url("presets"))
+        await self.fetch_presets()
 
-        # Get the current date
-        now = datetime.datetime.now()
+        timezone = timezone or SCHEDULE_TIMEZONE
+        if timezone and timezone not in pytz.all_timezones_set:
+            await ctx.respond(f"I don't know the timezone '{timezone}'.")
+            return f"Unknown timezone {timezone}.", None, None
 
-        # Calculate days until next occurrence of the specified day
-        current_weekday = now.weekday()
+        # Next occurrence of the day and time, next week if it has already passed
         target_weekday = self.days_of_week[day_of_week.lower()]
-        days_until = (target_weekday - current_weekday) % 7
-
-        # If it's the same day and the time has already passed, schedule for next week
-        if days_until == 0 and (
-            now.hour > hour or (now.hour == hour and now.minute >= minute)
-        ):
-            days_until = 7
-
-        # Create the scheduled datetime
-        target_date = now + datetime.timedelta(days=days_until)
-        scheduled_time = datetime.datetime(
-            year=target_date.year,
-            month=target_date.month,
-            day=target_date.day,
-            hour=hour,
-            minute=minute,
+        timestamp = next_weekly_occurrence(target_weekday, hour, minute, timezone)
+        scheduled_time = datetime.datetime.fromtimestamp(
+            timestamp, pytz.timezone(timezone) if timezone else None
         )
 
-        # Convert to timestamp
-        timestamp = scheduled_time.timestamp()
-
         # Store data needed for the spin
         data = json.dumps(
             {
@@ -738,13 +951,28 @@ class WheelCog(commands.Cog):
             return "I don't have permission to post in this channel.", None, None
 
         # Schedule the event
-        schedule_event(
-            timestamp=timestamp,
-            function_name="spin_preset",
-            message_id=ctx.interaction.id,
-            channel_id=ctx.channel.id,
-            data=data,
-        )
+        guild_id = ctx.guild.id if ctx.guild else None
+        if repeat == "weekly":
+            await add_recurring_schedule(
+                function_name="spin_preset",
+                message_id=ctx.interaction.id,
+                channel_id=ctx.channel.id,
+                weekday=target_weekday,
+                hour=hour,
+                minute=minute,
+                timezone=timezone,
+                data=data,
+                guild_id=guild_id,
+            )
+        else:
+            await schedule_event(
+                timestamp=timestamp,
+                function_name="spin_preset",
+                message_id=ctx.interaction.id,
+                channel_id=ctx.channel.id,
+                data=data,
+                guild_id=guild_id,
+            )
 
         # Format the response
         formatted_time = scheduled_time.strftime("%A, %B %d at %I:%M %p")
@@ -754,55 +982,92 @@ class WheelCog(commands.Cog):
         except Exception:
             nick = ctx.author.name
 
+        if repeat == "weekly":
+            await ctx.respond(
+                f"{nick} scheduled a spin of '{preset_name}' every {day_of_week.capitalize()}, starting <t:{int(timestamp)}:R>. I'll post the results here each week!"
+            )
+            return (
+                f"Scheduled weekly spin of '{preset_name}' from {formatted_time}",
+                None,
+                None,
+            )
+
         await ctx.respond(
             f"{nick} scheduled spin of '{preset_name}' for <t:{int(timestamp)}:R>. I'll post the results here when it's time!"
         )
         return f"Scheduled spin of '{preset_name}' for {formatted_time}", None, None
 
     @schedule.command(name="list")
-    async def list_scheduled_spins(self, ctx):
+    @discord.option(
+        "weekly",
+        description="List the weekly spins instead of the one-off ones",
+        type=bool,
+        required=False,
+        default=False,
+    )
+    async def list_scheduled_spins(self, ctx, weekly: bool = False):
         """List all scheduled spins that haven't been executed yet."""
         await ctx.defer()
 
-        # Get all scheduled events
-        scheduled_events = get_all_scheduled_events()
-
-        # Filter for spin events
-        spin_events = [
-            event for event in scheduled_events if event.function_name == "spin_preset"
-        ]
-
-        if not spin_events:
-            await ctx.respond("There are no scheduled spins.")
-            return "No scheduled spins found.", None, None
-
-        # Build the response
-        response = "# Scheduled Spins\n\n"
-
-        for event in spin_events:
-            # Use the timestamp directly for Discord timestamp formatting
-            data = json.loads(event.data) if event.data else {}
-            preset_name = data.get("preset_name", "Unknown preset")
-            role_id = data.get("role_id")
+        view = ScheduledSpinsView(self, ctx, weekly)
+        response = await view.render_page()
+        if view.next_callback.disabled:
+            # Everything fits on one page
+            await ctx.respond(response)
+        else:
+            await ctx.respond(response, view=view)
+        return "Listed scheduled spins.", None, None
 
-            role_text = ""
-            if role_id:
-                try:
-                    guild = ctx.guild
-                    role = guild.get_role(role_id)
-                    if role:
-                        role_text = f"\n**Tag Role:** {role.name}"
-                except Exception:
-                    pass
+    def format_spin_page(self, ctx, spins, weekly, page):
+        """Build the message for one page of /schedule list."""
+        if not spins:
+            if weekly:
+                return "There are no weekly spins."
+            return "There are no scheduled spins."
+
+        response = "# Weekly Spins\n\n" if weekly else "# Scheduled Spins\n\n"
+
+        for spin in spins:
+            preset_name, role_text = self.describe_spin_data(ctx, spin.data)
+            if weekly:
+                day = list(self.days_of_week)[spin.weekday].capitalize()
+                timezone = spin.timezone or "server time"
+                response += (
+                    f"**Weekly ID:** {spin.id}\n"
+                    f"**Preset:** {preset_name}\n"
+                    f"**Every:** {day} at {spin.hour:02d}:{spin.minute:02d} ({timezone})\n"
+                    f"**Next Spin:** <t:{int(spin.next_fire_at)}:F> (<t:{int(spin.next_fire_at)}:R>){role_text}\n\n"
+                )
+            else:
+                # Use the timestamp directly for Discord timestamp formatting
+                response += (
+                    f"**ID:** {spin.id}\n"
+                    f"**Preset:** {preset_name}\n"
+                    f"**Scheduled Time:** <t:{int(spin.timestamp)}:F> (<t:{int(spin.timestamp)}:R>){role_text}\n\n"
+                )
 
-            response += (
-                f"**ID:** {event.id}\n"
-                f"**Preset:** {preset_name}\n"
-                f"**Scheduled Time:** <t:{int(event.timestamp)}:F> (<t:{int(event.timestamp)}:R>){role_text}\n\n"
-            )
+        response += f"-# Page {page + 1}"
+        if not weekly:
+            response += ", use weekly:True to see weekly spins"
+        return response
 
-        await ctx.respond(response)
-        return "Listed scheduled spins.", None, None
+    @staticmethod
+    def describe_spin_data(ctx, data):
+        """Get the preset name and the role line shown for a scheduled spin."""
+        data = json.loads(data) if data else {}
+        preset_name = data.get("preset_name", "Unknown preset")
+        role_id = data.get("role_id")
+
+        role_text = ""
+        if role_id:
+            try:
+                guild = ctx.guild
+                role = guild.get_role(role_id)
+                if role:
+                    role_text = f"\n**Tag Role:** {role.name}"
+            except Exception:
+                pass
+        return preset_name, role_text
 
     @schedule.command(name="cancel")
     @discord.default_permissions(administrator=True)
@@ -812,27 +1077,35 @@ class WheelCog(commands.Cog):
         type=int,
         required=True,
     )
-    async def cancel_scheduled_spin(self, ctx, event_id: int):
+    @discord.option(
+        "weekly",
+        description="Cancel the weekly spin with this ID",
+        type=bool,
+        required=False,
+        default=False,
+    )
+    async def cancel_scheduled_spin(self, ctx, event_id: int, weekly: bool = False):
         """Cancel a scheduled spin."""
         await ctx.defer()
 
+        if weekly:
+            return await self.cancel_weekly_spin(ctx, event_id)
+
         # Get the specific event
-        all_events = get_all_scheduled_events()
-        event = next(
-            (
-                e
-                for e in all_events
-                if e.id == event_id and e.function_name == "spin_preset"
-            ),
-            None,
-        )
+        event = await get_event(event_id)
 
-        if not event:
+        if (
+            not event
+            or event.function_name != "spin_preset"
+            or event.completed
+            or not self.in_guild(ctx, event.guild_id)
+        ):
             await ctx.respond(f"No scheduled spin found with ID {event_id}.")
             return f"No scheduled spin with ID {event_id}.", None, None
 
         # Cancel the event
-        if cancel_event(event_id):
+        if await cancel_event(event_id):
+            await self.discard_prerender(event.key)
             # Get the event details for the response
             data = json.loads(event.data) if event.data else {}
             preset_name = data.get("preset_name", "Unknown preset")
@@ -846,3 +1119,36 @@ class WheelCog(commands.Cog):
                 f"Failed to cancel the scheduled spin with ID {event_id}."
             )
             return f"Failed to cancel scheduled spin with ID {event_id}.", None, None
+
+    @staticmethod
+    def in_guild(ctx, guild_id):
+        """Whether a spin scheduled in guild_id can be managed from ctx."""
+        return guild_id is None or ctx.guild is None or ctx.guild.id == guild_id
+
+    async def cancel_weekly_spin(self, ctx, schedule_id: int):
+        schedule = await get_recurring_schedule(schedule_id)
+        if (
+            not schedule
+            or schedule.function_name != "spin_preset"
+            or not self.in_guild(ctx, schedule.guild_id)
+        ):
+            await ctx.respond(f"No weekly spin found with ID {schedule_id}.")
+            return f"No weekly spin with ID {schedule_id}.", None, None
+
+        if await cancel_recurring_schedule(schedule_id):
+            # Drop it from the dispatcher now rather than at the next reload, so
+            # it isn't prepared again
+            dispatcher.reload_recurring()
+            await self.discard_prerender(schedule.to_event(schedule.next_fire_at).key)
+            data = json.loads(schedule.data) if schedule.data else {}
+            preset_name = data.get("preset_name", "Unknown preset")
+
+            await ctx.respond(
+                f"Successfully canceled the weekly spin of '{preset_name}'. It won't run <t:{int(schedule.next_fire_at)}:F> or after."
+            )
+            return f"Canceled weekly spin with ID {schedule_id}.", None, None
+        else:
+            await ctx.respond(
+                f"Failed to cancel the weekly spin with ID {schedule_id}."
+            )
+            return f"Failed to cancel weekly spin with ID {schedule_id}.", None, None
@@ -1,4 +1,5 @@
 # pyright: basic
+import asyncio
 import logging
 import os
 
@@ -6,10 +7,15 @@ import discord
 from discord.ext import commands
 
 from modules import ChatHandler
+from modules.LLMClient import StaleRequestError
+from modules.MentionDebouncer import MentionDebouncer
+from modules.MessageCache import MessageCache
+from modules.TokenCounter import token_counter
 from modules.attendanceCog import AttendanceCog  # noqa: F401
 from modules.incidentCog import IncidentCog  # noqa: F401
 from modules.reactionsCog import ReactionsCog  # noqa: F401
 from modules.registrationCog import RegistrationCog  # noqa: F401
+from modules.scheduler import close_db, dispatcher, init_db
 from modules.standingsCog import StandingsCog  # noqa: F401
 from modules.wheelCog import WheelCog  # noqa: F401
 
@@ -28,23 +34,67 @@ bot = commands.Bot(
     intents=intents,
 )
 
+# Recent messages of every channel, so mentions can be answered without
+# fetching the channel history
+message_cache = MessageCache()
+
+
+async def answer_mention(message):
+    async with message.channel.typing():
+        history = await message_cache.history(message)
+        try:
+            await ChatHandler.send_streamed(
+                message.channel, ChatHandler.stream_chat_response(message, history)
+            )
+        except StaleRequestError as e:
+            logging.warning(f"Not answering message {message.id}: {str(e)}")
+
+
+# Rapid mentions in a channel get one reply, to the latest of them
+mention_debouncer = MentionDebouncer(answer_mention)
+
+
+@bot.listen()
+async def on_ready():
+    # on_ready fires again after reconnects, all of these only run once
+    await init_db()
+    await token_counter.load_async()
+    dispatcher.start()
+    ChatHandler.model_manager.start()
+    ChatHandler.status_lines.start()
+
 
 @bot.listen()
 async def on_message(message):
     if message.author == bot.user:
+        # The bot's own messages are part of the conversation too
+        message_cache.add(message)
         return
 
     if message.channel.id == 1362287075142930442:  # Complaining
         await message.delete()
         return
 
+    message_cache.add(message)
+
     if bot.user.mentioned_in(message):
-        async with message.channel.typing():
-            msg_channel = message.channel
-            history = [m async for m in msg_channel.history(limit=80, before=message)]
-            history.reverse()
-            response = await ChatHandler.respond_in_chat(message, bot)
-            await message.channel.send(response)
+        mention_debouncer.mention(message)
+
+
+@bot.listen()
+async def on_raw_message_edit(payload):
+    # Like deletes, the raw event covers messages py-cord no longer has cached, or
+    # that were only ever fetched by the history backfill. Edits that don't touch
+    # the text, such as embeds resolving, carry no content.
+    content = payload.data.get("content")
+    if content is not None:
+        message_cache.edit(payload.channel_id, payload.message_id, content)
+
+
+@bot.listen()
+async def on_raw_message_delete(payload):
+    # The raw event fires even for messages py-cord no longer has cached
+    message_cache.delete(payload.channel_id, payload.message_id)
 
 
 bot.add_cog(IncidentCog(bot))
@@ -53,4 +103,9 @@ bot.add_cog(ReactionsCog(bot))
 bot.add_cog(RegistrationCog(bot, "SpinnyBoiRegistrations", 1486186338410696837))
 bot.add_cog(StandingsCog(bot))
 bot.add_cog(AttendanceCog(bot))
-bot.run(os.getenv("BOT_TOKEN"))
+try:
+    bot.run(os.getenv("BOT_TOKEN"))
+finally:
+    # The database connection runs on its own thread, which would keep the
+    # process alive after the bot stops
+    asyncio.run(close_db())
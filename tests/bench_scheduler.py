@@ -0,0 +1,218 @@
+"""
+Scheduler throughput benchmarks.
+
+Not collected by pytest, run by hand to compare before and after a change:
+
+    python tests/bench_scheduler.py --events 100000
+
+Loads a temporary database with synthetic events, a tenth of them due, spread
+over a handful of guilds and channels, then times the scheduler's hot paths and
+finally runs the dispatcher against a burst of due events to report how late they
+fire.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Add the parent directory to sys.path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from modules.scheduler import scheduler
+from modules.scheduler.dispatcher import EventDispatcher
+
+GUILDS = 20
+CHANNELS_PER_GUILD = 5
+FUNCTION_NAMES = ("spin_preset", "close_poll", "remind")
+
+
+def report(name: str, operations: int, seconds: float) -> None:
+    print(
+        f"{name:<28} {operations:>8} ops {seconds:>8.3f}s"
+        f" {operations / seconds:>12.0f} ops/s"
+    )
+
+
+def synthetic_event(now: float, due_fraction: float) -> scheduler.ScheduledEvent:
+    guild_id = random.randrange(GUILDS)
+    channel_id = guild_id * CHANNELS_PER_GUILD + random.randrange(CHANNELS_PER_GUILD)
+    if random.random() < due_fraction:
+        timestamp = now - random.uniform(0, 3600)
+    else:
+        timestamp = now + random.uniform(60, 30 * 24 * 3600)
+    return scheduler.ScheduledEvent(
+        None,
+        timestamp,
+        random.choice(FUNCTION_NAMES),
+        random.randrange(1 << 40),
+        channel_id,
+        False,
+        None,
+        guild_id=guild_id,
+    )
+
+
+async def load(events: int, due_fraction: float) -> None:
+    now = time.time()
+    batch = [synthetic_event(now, due_fraction) for _ in range(events)]
+    begin = time.perf_counter()
+    await scheduler.schedule_events(batch)
+    report("schedule_events (bulk load)", events, time.perf_counter() - begin)
+
+
+async def bench_schedule(count: int) -> None:
+    now = time.time()
+    begin = time.perf_counter()
+    for _ in range(count):
+        event = synthetic_event(now, 0)
+        await scheduler.schedule_event(
+            event.timestamp,
+            event.function_name,
+            event.message_id,
+            event.channel_id,
+            event.data,
+            event.guild_id,
+        )
+    report("schedule_event", count, time.perf_counter() - begin)
+
+
+async def bench_claim_and_complete(count: int) -> None:
+    claimed = []
+    begin = time.perf_counter()
+    while len(claimed) < count:
+        events = await scheduler.claim_due_events(
+            "bench", 300, function_name=FUNCTION_NAMES[len(claimed) % 3]
+        )
+        if not events:
+            break
+        claimed.extend(events)
+    report("claim_due_events (50/call)", len(claimed), time.perf_counter() - begin)
+
+    half = len(claimed) // 2
+    begin = time.perf_counter()
+    for event in claimed[:half]:
+        await scheduler.complete_event(event.id, "bench")
+    report("complete_event", half, time.perf_counter() - begin)
+
+    # The way the dispatcher completes events, many finishing at once
+    queue = scheduler.CompletionQueue("bench")
+    begin = time.perf_counter()
+    await asyncio.gather(*(queue.complete(event.id) for event in claimed[half:]))
+    report("CompletionQueue", len(claimed) - half, time.perf_counter() - begin)
+
+
+async def bench_queries(count: int) -> None:
+    now = time.time()
+
+    begin = time.perf_counter()
+    for _ in range(count):
+        await scheduler.get_next_event_timestamp(after=now)
+    report("get_next_event_timestamp", count, time.perf_counter() - begin)
+
+    begin = time.perf_counter()
+    for _ in range(count):
+        await scheduler.get_upcoming_events(
+            random.choice(FUNCTION_NAMES), until=now + 3600, after=now
+        )
+    report("get_upcoming_events (1h)", count, time.perf_counter() - begin)
+
+    begin = time.perf_counter()
+    pages = 0
+    for _ in range(count // 10):
+        after = None
+        # Page through the first ten pages of a guild, like the list command
+        for _ in range(10):
+            page = await scheduler.list_events(
+                function_name="spin_preset",
+                guild_id=random.randrange(GUILDS),
+                after=after,
+                limit=8,
+            )
+            pages += 1
+            if not page:
+                break
+            after = (page[-1].timestamp, page[-1].id)
+    report("list_events (guild page)", pages, time.perf_counter() - begin)
+
+    begin = time.perf_counter()
+    for _ in range(count):
+        guild_id = random.randrange(GUILDS)
+        await scheduler.list_events(
+            function_name="spin_preset",
+            channel_id=guild_id * CHANNELS_PER_GUILD,
+            guild_id=guild_id,
+            limit=8,
+        )
+    report("list_events (channel)", count, time.perf_counter() - begin)
+
+
+async def bench_archive() -> None:
+    begin = time.perf_counter()
+    archived = await scheduler.archive_completed_events(older_than_days=0)
+    report("archive_completed_events", archived, time.perf_counter() - begin)
+
+
+async def bench_dispatcher(count: int, spread: float) -> None:
+    async def handler(event):
+        await asyncio.sleep(0.01)
+
+    # Scheduled before the dispatcher starts, so the inserts don't compete with it
+    start = time.time() + 1.0
+    for i in range(count):
+        await scheduler.schedule_event(
+            start + spread * i / count, "bench_dispatch", i, 0
+        )
+    dispatcher = EventDispatcher(max_sleep=5)
+    dispatcher.register("bench_dispatch", handler)
+    dispatcher.start()
+    try:
+        while True:
+            runs = dispatcher.metrics.functions.get("bench_dispatch")
+            if runs is not None and runs.lateness.count >= count:
+                break
+            await asyncio.sleep(0.1)
+    finally:
+        await dispatcher.stop()
+
+    summary = dispatcher.metrics.summary()["bench_dispatch"]
+    for name in ("lateness", "duration"):
+        timings = summary[name]
+        print(
+            f"dispatcher {name:<17} {timings['count']:>8} runs"
+            f" p50 {timings['p50'] * 1000:.1f}ms p95 {timings['p95'] * 1000:.1f}ms"
+            f" max {timings['max'] * 1000:.1f}ms"
+        )
+
+
+async def main(args: argparse.Namespace) -> None:
+    random.seed(args.seed)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        await scheduler.init_db(os.path.join(temp_dir, "bench.db"))
+        try:
+            await load(args.events, args.due_fraction)
+            await bench_schedule(args.operations)
+            await bench_claim_and_complete(args.operations)
+            await bench_queries(args.operations)
+            await bench_archive()
+            await bench_dispatcher(args.operations, args.spread)
+        finally:
+            await scheduler.close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scheduler throughput benchmarks")
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--operations", type=int, default=2000)
+    parser.add_argument("--due-fraction", type=float, default=0.1)
+    parser.add_argument(
+        "--spread", type=float, default=2.0, help="seconds the dispatched burst spans"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    # Every schedule_event logs at INFO, which would dominate the timings
+    logging.disable(logging.INFO)
+    asyncio.run(main(parser.parse_args()))
@@ -5,6 +5,7 @@ import json
 import datetime
 import discord
 from modules.ChatHandler import respond_in_chat
+from modules.MessageCache import MessageCache
 
 class DiscordBotChatMessageTest(discord.Client):
     async def on_ready(self):
@@ -17,7 +18,8 @@ class DiscordBotChatMessageTest(discord.Client):
             channel = await self.fetch_channel(channel_id)
         message = await channel.fetch_message(message_id)
         # Call the respond_in_chat function with real objects
-        response = await respond_in_chat(message, self)
+        history = await MessageCache().history(message)
+        response = await respond_in_chat(message, history)
         # Basic validation that we got a response
         print(response)
         await self.close()
@@ -0,0 +1,177 @@
+import asyncio
+import unittest
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+
+from modules.LLMClient import (
+    LLMClient,
+    LLMScheduler,
+    Priority,
+    StaleRequestError,
+    partial_json_field,
+)
+
+
+class SlowChatModel:
+    def __init__(self, delay):
+        self.delay = delay
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(self.delay)
+        return AIMessage(content="finally")
+
+
+class RecordingChatModel:
+    def __init__(self, content):
+        self.content = content
+        self.kwargs = None
+
+    async def ainvoke(self, messages, **kwargs):
+        self.kwargs = kwargs
+        return AIMessage(content=self.content)
+
+
+class TestLLMClient(unittest.IsolatedAsyncioTestCase):
+    async def test_invoke_returns_content(self):
+        client = LLMClient(FakeListChatModel(responses=["first", "second"]))
+        self.assertEqual(await client.invoke([("user", "hi")]), "first")
+        self.assertEqual(await client.invoke([("user", "hi")]), "second")
+
+    async def test_schema_is_passed_as_format(self):
+        model = RecordingChatModel('{"content": "ok"}')
+        client = LLMClient(model)
+        schema = {"type": "object", "properties": {"content": {"type": "string"}}}
+        self.assertEqual(
+            await client.invoke_json([("user", "hi")], schema), {"content": "ok"}
+        )
+        self.assertEqual(model.kwargs, {"format": schema})
+
+        await client.invoke([("user", "hi")])
+        self.assertEqual(model.kwargs, {})
+
+    async def test_generation_does_not_block_the_loop(self):
+        client = LLMClient(SlowChatModel(0.2))
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        try:
+            self.assertEqual(await client.invoke([("user", "hi")]), "finally")
+        finally:
+            ticker.cancel()
+        self.assertGreater(ticks, 5)
+
+    async def test_timeout(self):
+        client = LLMClient(SlowChatModel(1), timeout=0.05)
+        with self.assertRaises(asyncio.TimeoutError):
+            await client.invoke([("user", "hi")])
+
+    async def test_stream_yields_chunks(self):
+        client = LLMClient(FakeListChatModel(responses=["hello"]))
+        chunks = [chunk async for chunk in client.stream([("user", "hi")])]
+        self.assertEqual(chunks, list("hello"))
+
+    async def test_stream_timeout(self):
+        client = LLMClient(FakeListChatModel(responses=["slow"], sleep=0.05))
+        with self.assertRaises(asyncio.TimeoutError):
+            async for _ in client.stream([("user", "hi")], timeout=0.12):
+                pass
+
+
+class TestLLMScheduler(unittest.IsolatedAsyncioTestCase):
+    async def test_higher_priority_goes_first(self):
+        scheduler = LLMScheduler(max_in_flight=1)
+        order = []
+        busy = asyncio.Event()
+        release = asyncio.Event()
+
+        async def request(name, priority):
+            async with scheduler.slot("model", priority):
+                order.append(name)
+                busy.set()
+                await release.wait()
+
+        first = asyncio.create_task(request("first", Priority.BATCH))
+        await busy.wait()
+        queued = [
+            asyncio.create_task(request("summary", Priority.BATCH)),
+            asyncio.create_task(request("status", Priority.STATUS)),
+            asyncio.create_task(request("chat", Priority.INTERACTIVE)),
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(first, *queued)
+        self.assertEqual(order, ["first", "chat", "status", "summary"])
+
+    async def test_limit_is_per_model(self):
+        scheduler = LLMScheduler(max_in_flight=2)
+        running = {"a": 0, "b": 0}
+        peak = {"a": 0, "b": 0}
+
+        async def request(model):
+            async with scheduler.slot(model, Priority.INTERACTIVE):
+                running[model] += 1
+                peak[model] = max(peak[model], running[model])
+                await asyncio.sleep(0.01)
+                running[model] -= 1
+
+        await asyncio.gather(*(request(model) for model in "ab" * 5))
+        self.assertEqual(peak, {"a": 2, "b": 2})
+
+    async def test_stale_request_never_reaches_the_model(self):
+        scheduler = LLMScheduler(max_in_flight=1)
+        model = RecordingChatModel("late")
+        client = LLMClient(
+            model, scheduler=scheduler, model_name="model", max_wait=0.05
+        )
+        async with scheduler.slot("model", Priority.BATCH):
+            with self.assertRaises(StaleRequestError):
+                await client.invoke([("user", "hi")])
+        self.assertIsNone(model.kwargs)
+        # The dropped request doesn't hold up the next one
+        self.assertEqual(await client.invoke([("user", "hi")]), "late")
+
+    async def test_cancelled_waiter_does_not_keep_a_slot(self):
+        scheduler = LLMScheduler(max_in_flight=1)
+
+        async def request():
+            async with scheduler.slot("model", Priority.INTERACTIVE):
+                await asyncio.sleep(0)
+
+        async with scheduler.slot("model", Priority.INTERACTIVE):
+            waiter = asyncio.create_task(request())
+            await asyncio.sleep(0)
+            waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        await asyncio.wait_for(request(), timeout=1)
+
+
+class TestPartialJsonField(unittest.TestCase):
+    def test_field_not_started(self):
+        self.assertIsNone(partial_json_field('{"user": "SpinnyBoi", "cont', "content"))
+
+    def test_field_cut_off(self):
+        text = '{"user": "SpinnyBoi", "content": "Netcode strikes ag'
+        self.assertEqual(partial_json_field(text, "content"), "Netcode strikes ag")
+
+    def test_escapes(self):
+        text = '{"content": "line\\none \\"quoted\\" caf\\u00e9'
+        self.assertEqual(partial_json_field(text, "content"), 'line\none "quoted" café')
+        # Escapes cut off halfway are left out until the rest arrives
+        self.assertEqual(partial_json_field('{"content": "a\\', "content"), "a")
+        self.assertEqual(partial_json_field('{"content": "a\\u00', "content"), "a")
+
+    def test_complete_value(self):
+        text = '{"content": "done", "user": "SpinnyBoi"}'
+        self.assertEqual(partial_json_field(text, "content"), "done")
+
+
+if __name__ == "__main__":
+    unittest.main()
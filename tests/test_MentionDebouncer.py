@@ -0,0 +1,67 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from modules.MentionDebouncer import MentionDebouncer
+
+
+def make_message(channel_id, message_id):
+    return SimpleNamespace(id=message_id, channel=SimpleNamespace(id=channel_id))
+
+
+class TestMentionDebouncer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.answered = []
+        self.started = []
+        self.cancelled = []
+        self.block = None
+        self.debouncer = MentionDebouncer(self.respond, window=0.02)
+
+    async def asyncTearDown(self):
+        await self.debouncer.stop()
+
+    async def respond(self, message):
+        self.started.append(message.id)
+        try:
+            if self.block is not None:
+                await self.block.wait()
+        except asyncio.CancelledError:
+            self.cancelled.append(message.id)
+            raise
+        self.answered.append(message.id)
+
+    async def test_burst_is_answered_once(self):
+        for message_id in range(1, 4):
+            self.debouncer.mention(make_message(1, message_id))
+            await asyncio.sleep(0.005)
+        self.debouncer.mention(make_message(2, 10))
+        await asyncio.sleep(0.05)
+        self.assertEqual(sorted(self.answered), [3, 10])
+        self.assertEqual(self.debouncer._tasks, {})
+
+    async def test_newer_mention_cancels_answer_in_progress(self):
+        self.block = asyncio.Event()
+        self.debouncer.mention(make_message(1, 1))
+        await asyncio.sleep(0.03)
+        self.assertEqual(self.started, [1])
+
+        with self.assertLogs(level="INFO"):
+            self.debouncer.mention(make_message(1, 2))
+            await asyncio.sleep(0)
+        self.block.set()
+        await asyncio.sleep(0.03)
+        self.assertEqual(self.cancelled, [1])
+        self.assertEqual(self.answered, [2])
+
+    async def test_errors_are_logged(self):
+        async def fail(message):
+            raise RuntimeError("model went away")
+
+        debouncer = MentionDebouncer(fail, window=0)
+        with self.assertLogs(level="ERROR"):
+            debouncer.mention(make_message(1, 1))
+            await asyncio.sleep(0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import datetime
+import json
+import unittest
+from types import SimpleNamespace
+
+from modules.MessageCache import MessageCache
+
+
+class FakeChannel:
+    def __init__(self, channel_id, older=()):
+        self.id = channel_id
+        self.older = list(older)
+        self.history_calls = 0
+
+    async def history(self, limit, before):
+        self.history_calls += 1
+        # Newest first, like discord
+        for message in sorted(self.older, key=lambda m: -m.id)[:limit]:
+            if message.id < before.id:
+                yield message
+
+
+def make_message(channel, message_id, content=None, nick=None):
+    return SimpleNamespace(
+        id=message_id,
+        channel=channel,
+        content=content or f"message {message_id}",
+        author=SimpleNamespace(id=7, name="driver", nick=nick),
+        created_at=datetime.datetime(2025, 1, 1, 20, 0, 0),
+    )
+
+
+def contents(history):
+    return [json.loads(m)["content"] for m in history]
+
+
+class TestMessageCache(unittest.IsolatedAsyncioTestCase):
+    async def test_history_from_gateway_messages(self):
+        cache = MessageCache()
+        channel = FakeChannel(1)
+        for message_id in range(1, 5):
+            cache.add(make_message(channel, message_id))
+        cache.add(make_message(FakeChannel(2), 3))
+
+        # The first request fills in what was said before the bot was listening
+        history = await cache.history(make_message(channel, 4))
+        self.assertEqual(contents(history), ["message 1", "message 2", "message 3"])
+        self.assertEqual(channel.history_calls, 1)
+        await cache.history(make_message(channel, 4))
+        self.assertEqual(channel.history_calls, 1)
+
+        entry = json.loads(history[0])
+        self.assertEqual(entry["user"], "driver")
+        self.assertEqual(entry["user_id"], 7)
+        self.assertEqual(entry["timestamp"], "2025-01-01 20:00:00")
+
+    async def test_edit_and_delete(self):
+        cache = MessageCache()
+        channel = FakeChannel(1)
+        for message_id in range(1, 4):
+            cache.add(make_message(channel, message_id))
+        cache.edit(1, 1, "edited")
+        cache.delete(1, 2)
+        # Edits of messages that aren't cached are ignored
+        cache.edit(1, 10, "unknown")
+
+        history = await cache.history(make_message(channel, 4))
+        self.assertEqual(contents(history), ["edited", "message 3"])
+        self.assertEqual(json.loads(history[0])["user"], "driver")
+
+    async def test_edit_of_backfilled_message(self):
+        cache = MessageCache()
+        channel = FakeChannel(1, [make_message(None, 1)])
+        await cache.history(make_message(channel, 2))
+        cache.edit(1, 1, "edited")
+        history = await cache.history(make_message(channel, 2))
+        self.assertEqual(contents(history), ["edited"])
+
+    async def test_backfill_merges_with_received_messages(self):
+        cache = MessageCache(per_channel=4)
+        channel = FakeChannel(1, [make_message(None, i) for i in range(1, 6)])
+        cache.add(make_message(channel, 5))
+        cache.add(make_message(channel, 6))
+
+        history = await cache.history(make_message(channel, 7))
+        self.assertEqual(
+            contents(history), ["message 3", "message 4", "message 5", "message 6"]
+        )
+
+    async def test_bounded_per_channel_and_across_channels(self):
+        cache = MessageCache(per_channel=2, max_channels=2)
+        channels = [FakeChannel(i) for i in range(3)]
+        for message_id in range(1, 4):
+            cache.add(make_message(channels[0], message_id))
+        await cache.history(make_message(channels[0], 4))
+        self.assertEqual(list(cache.channels[0]), [2, 3])
+
+        cache.add(make_message(channels[1], 1))
+        # Using channel 0 again makes channel 1 the least recently used
+        cache.add(make_message(channels[0], 5))
+        cache.add(make_message(channels[2], 1))
+        self.assertEqual(list(cache.channels), [0, 2])
+
+        # An evicted channel's history is fetched again
+        await cache.history(make_message(channels[1], 2))
+        self.assertEqual(channels[1].history_calls, 1)
+        self.assertEqual(channels[0].history_calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
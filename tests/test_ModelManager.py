@@ -0,0 +1,90 @@
+import datetime
+import unittest
+
+import pytz
+
+from modules.ModelManager import LEAGUE_KEEP_ALIVE, ModelManager, parse_league_hours
+
+
+class FakeOllama:
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+        self.loads = []
+
+    async def generate(self, model, keep_alive):
+        if model in self.missing:
+            raise Exception(f"model '{model}' not found")
+        self.loads.append((model, keep_alive))
+
+
+def eastern(*args):
+    return pytz.timezone("America/New_York").localize(datetime.datetime(*args))
+
+
+class TestParseLeagueHours(unittest.TestCase):
+    def test_days(self):
+        self.assertEqual(
+            parse_league_hours("mon 19-23, Thursday 18-24"), [(0, 19, 23), (3, 18, 24)]
+        )
+        self.assertEqual(
+            parse_league_hours("daily 20-22"), [(day, 20, 22) for day in range(7)]
+        )
+        self.assertEqual(parse_league_hours(""), [])
+
+    def test_invalid(self):
+        for spec in ("mon", "mon 19", "mon 23-19", "xyz 19-23", "mon 19-25"):
+            with self.assertRaises(ValueError, msg=spec):
+                parse_league_hours(spec)
+
+
+class TestModelManager(unittest.IsolatedAsyncioTestCase):
+    def manager(self, client, league_hours="wed 19-23"):
+        return ModelManager(
+            {"big": "1h", "small": "10m"},
+            league_hours=league_hours,
+            client=client,
+        )
+
+    def test_league_hours_are_local(self):
+        manager = self.manager(FakeOllama())
+        # 19:30 Eastern in winter and in summer
+        self.assertTrue(
+            manager.in_league_hours(
+                datetime.datetime(2025, 1, 16, 0, 30, tzinfo=pytz.utc)
+            )
+        )
+        self.assertTrue(
+            manager.in_league_hours(
+                datetime.datetime(2025, 7, 16, 23, 30, tzinfo=pytz.utc)
+            )
+        )
+        self.assertFalse(manager.in_league_hours(eastern(2025, 1, 15, 23, 0)))
+        self.assertFalse(manager.in_league_hours(eastern(2025, 1, 16, 19, 30)))
+
+    async def test_warm_all_skips_missing_models(self):
+        client = FakeOllama(missing={"small"})
+        with self.assertLogs(level="WARNING"):
+            loaded = await self.manager(client).warm_all()
+        self.assertEqual(loaded, ["big"])
+        self.assertEqual(client.loads, [("big", "1h")])
+
+    async def test_ping_only_around_league_hours(self):
+        client = FakeOllama()
+        manager = self.manager(client)
+
+        self.assertEqual(await manager.ping(eastern(2025, 1, 15, 12, 0)), [])
+        self.assertEqual(client.loads, [])
+
+        # Loaded ahead of the start, so the first race request finds them ready
+        self.assertEqual(
+            await manager.ping(eastern(2025, 1, 15, 18, 57)), ["big", "small"]
+        )
+        self.assertEqual(
+            client.loads, [("big", LEAGUE_KEEP_ALIVE), ("small", LEAGUE_KEEP_ALIVE)]
+        )
+        self.assertEqual(len(await manager.ping(eastern(2025, 1, 15, 21, 0))), 2)
+        self.assertEqual(await manager.ping(eastern(2025, 1, 15, 23, 0)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
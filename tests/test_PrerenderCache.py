@@ -0,0 +1,73 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.PrerenderCache import PrerenderCache
+
+
+class TestPrerenderCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = PrerenderCache(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_save_and_load(self):
+        gifs = [io.BytesIO(b"GIF89a first"), io.BytesIO(b"GIF89a second")]
+        self.cache.save("weekly-3-1700000000", gifs, ["Spa", ""])
+
+        loaded_gifs, responses = self.cache.load("weekly-3-1700000000")
+        self.assertEqual(
+            [gif.read() for gif in loaded_gifs], [b"GIF89a first", b"GIF89a second"]
+        )
+        self.assertEqual(responses, ["Spa", ""])
+        self.assertIsNone(self.cache.load("12"))
+
+    def test_first_save_wins_and_discard_removes(self):
+        self.assertTrue(self.cache.save("12", [io.BytesIO(b"first")], ["first"]))
+        self.assertFalse(self.cache.save("12", [io.BytesIO(b"second")], ["second"]))
+        gifs, responses = self.cache.load("12")
+        self.assertEqual((gifs[0].read(), responses), (b"first", ["first"]))
+        self.assertEqual(os.listdir(self.temp_dir.name), ["12"])
+
+        self.cache.discard("12")
+        self.assertIsNone(self.cache.load("12"))
+
+    def test_overlapping_saves_of_one_key(self):
+        # Replicas rendering the same spin, each with its own random result
+        def save(i):
+            gifs = [
+                io.BytesIO(f"render {i} wheel {w}".encode() * 1000) for w in range(3)
+            ]
+            return self.cache.save("12", gifs, [f"render {i}"] * 3)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            saved = list(pool.map(save, range(8)))
+
+        self.assertEqual(saved.count(True), 1)
+        gifs, responses = self.cache.load("12")
+        winner = saved.index(True)
+        self.assertEqual(responses, [f"render {winner}"] * 3)
+        self.assertEqual(
+            [gif.read() for gif in gifs],
+            [f"render {winner} wheel {w}".encode() * 1000 for w in range(3)],
+        )
+        self.assertEqual(os.listdir(self.temp_dir.name), ["12"])
+
+    def test_prune(self):
+        self.cache.save("old", [io.BytesIO(b"old")], ["old"])
+        self.cache.save("new", [io.BytesIO(b"new")], ["new"])
+        stale = time.time() - 3600
+        os.utime(os.path.join(self.temp_dir.name, "old"), (stale, stale))
+
+        self.assertEqual(self.cache.prune(max_age=60), 1)
+        self.assertIsNone(self.cache.load("old"))
+        self.assertIsNotNone(self.cache.load("new"))
+
+
+if __name__ == "__main__":
+    unittest.main()
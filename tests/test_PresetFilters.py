@@ -0,0 +1,63 @@
+import unittest
+
+import pandas as pd
+
+from modules.PresetFilters import compile_filter
+
+
+class TestPresetFilters(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame(
+            [
+                {"fullname": "Spa", "type": "road", "length": 7, "w": 2, "next": None},
+                {
+                    "fullname": "Daytona",
+                    "type": "oval",
+                    "length": 4,
+                    "w": 1,
+                    "next": None,
+                },
+                {
+                    "fullname": "Monza",
+                    "type": "road",
+                    "length": 5,
+                    "w": 0,
+                    "next": "cars class=gt3",
+                },
+            ]
+        )
+
+    def test_compile_is_cached(self):
+        self.assertIs(compile_filter("type=road"), compile_filter("type=road"))
+
+    def test_directives(self):
+        plan = compile_filter("type=road, !weight=w, !onselect=next")
+        self.assertEqual(plan.weighting, "w")
+        self.assertEqual(plan.on_select, "next")
+        self.assertEqual(len(plan.queries), 1)
+
+    def test_apply(self):
+        selections = compile_filter("type=road,length>=5,!weight=w").apply(self.df)
+        self.assertEqual([s["option"] for s in selections], ["Spa", "Monza"])
+        self.assertEqual([s["weight"] for s in selections], [2, 0])
+        self.assertIsNone(selections[0]["on_select"])
+
+    def test_or_filter(self):
+        selections = compile_filter("type=oval|length>6").apply(self.df)
+        self.assertEqual([s["option"] for s in selections], ["Spa", "Daytona"])
+
+    def test_default_weight(self):
+        selections = compile_filter("").apply(self.df)
+        self.assertEqual([s["weight"] for s in selections], [1, 1, 1])
+
+    def test_empty_result(self):
+        with self.assertRaisesRegex(Exception, "returned no results"):
+            compile_filter("type=rally").apply(self.df)
+
+    def test_bad_column(self):
+        with self.assertRaisesRegex(Exception, "Something is wrong"):
+            compile_filter("nope>3").apply(self.df)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+import pandas as pd
+
+from modules.PresetIndex import MAX_CHOICES, PresetIndex
+
+
+class TestPresetIndex(unittest.TestCase):
+    def setUp(self):
+        presets_df = pd.DataFrame(
+            [
+                {"Fullname": "GT3 Sprint", "tracks": "road=1", "cars": "class=gt3"},
+                {"Fullname": "GT4 Endurance", "tracks": "road=1", "cars": None},
+                {"Fullname": "Oval Madness", "tracks": "oval=1", "cars": "any"},
+            ]
+        )
+        self.index = PresetIndex.from_dataframe(presets_df)
+
+    def test_prefix_is_case_insensitive(self):
+        self.assertEqual(self.index.search("gt"), ["GT3 Sprint", "GT4 Endurance"])
+        self.assertEqual(self.index.search("OVAL"), ["Oval Madness"])
+
+    def test_empty_prefix_keeps_sheet_order(self):
+        self.assertEqual(
+            self.index.search(""), ["GT3 Sprint", "GT4 Endurance", "Oval Madness"]
+        )
+        self.assertEqual(self.index.search(None), self.index.search(""))
+
+    def test_no_match(self):
+        self.assertEqual(self.index.search("rally"), [])
+
+    def test_tabs_skip_empty_cells(self):
+        self.assertEqual(self.index.get_tabs("gt4 endurance"), ["tracks"])
+        self.assertEqual(self.index.get_tabs("GT3 Sprint", "c"), ["cars"])
+        self.assertEqual(self.index.get_tabs("missing"), [])
+
+    def test_canonical_name(self):
+        self.assertEqual(self.index.get_name("oval madness"), "Oval Madness")
+        self.assertIsNone(self.index.get_name("nope"))
+
+    def test_results_are_capped(self):
+        index = PresetIndex([(f"Preset {i}", []) for i in range(100)])
+        self.assertEqual(len(index.search("preset")), MAX_CHOICES)
+        self.assertEqual(index.search("preset 99"), ["Preset 99"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+
+from modules.PromptSession import PromptSession, PromptSessions
+from modules.TokenCounter import MESSAGE_OVERHEAD, TokenCounter
+
+
+class WordTokenizer:
+    def encode(self, text, verbose=True):
+        return text.split()
+
+
+# Every message below is one word
+TOKENS = 1 + MESSAGE_OVERHEAD
+
+
+def messages(first, last):
+    return [f"m{i}" for i in range(first, last)]
+
+
+class TestPromptSession(unittest.TestCase):
+    def setUp(self):
+        counter = TokenCounter()
+        counter.tokenizer = WordTokenizer()
+        self.session = PromptSession(
+            max_tokens=10 * TOKENS, reset_tokens=5 * TOKENS, counter=counter
+        )
+
+    def test_prefix_is_kept_while_messages_are_added(self):
+        first = self.session.update(messages(0, 20))
+        self.assertEqual(first, messages(15, 20))
+
+        # The window doesn't slide, new messages only go on the end
+        self.assertEqual(self.session.update(messages(1, 22)), messages(15, 22))
+        self.assertEqual(self.session.update(messages(2, 25)), messages(15, 25))
+
+    def test_starts_over_when_full(self):
+        self.session.update(messages(0, 20))
+        self.session.update(messages(0, 25))
+        self.assertEqual(self.session.update(messages(0, 26)), messages(21, 26))
+        self.assertEqual(self.session.update(messages(0, 27)), messages(21, 27))
+
+    def test_starts_over_when_history_changes(self):
+        self.session.update(messages(0, 20))
+        edited = messages(0, 21)
+        edited[16] = "edited"
+        self.assertEqual(self.session.update(edited), edited[16:])
+
+        # Deleted, or dropped out of the cache
+        self.assertEqual(self.session.update(messages(18, 22)), messages(18, 22))
+
+    def test_sessions_per_channel(self):
+        sessions = PromptSessions(max_channels=2)
+        first = sessions.get(1)
+        self.assertIs(sessions.get(1), first)
+        sessions.get(2)
+        sessions.get(1)
+        sessions.get(3)
+        self.assertEqual(list(sessions.sessions), [1, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+from aiohttp import web
+
+from modules.SheetCache import NoTabError, SheetCache
+
+
+class TestSheetCache(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.requests = 0
+
+        async def handler(request):
+            self.requests += 1
+            if request.query["sheet"] == "missing":
+                return web.Response(body=b"FALSE\n")
+            return web.Response(body=b"Fullname,Weight\nSpa,2\nMonza,1\n")
+
+        app = web.Application()
+        app.router.add_get("/csv", handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.cache = SheetCache(
+            lambda tab: f"http://127.0.0.1:{port}/csv?sheet={tab}",
+            snapshot_dir=self.temp_dir.name,
+        )
+
+    async def asyncTearDown(self):
+        await self.cache.close()
+        await self.runner.cleanup()
+        self.temp_dir.cleanup()
+
+    async def test_fetch_lowercases_and_caches(self):
+        df = await self.cache.fetch("Tracks")
+        self.assertEqual(list(df.columns), ["fullname", "weight"])
+        self.assertIs(await self.cache.get("tracks"), df)
+        self.assertEqual(self.requests, 1)
+
+    async def test_concurrent_fetches_share_a_request(self):
+        await self.cache.fetch("tracks")
+        self.requests = 0
+        self.cache.tabs.clear()
+        first, second = await asyncio.gather(
+            self.cache.get("tracks"), self.cache.get("Tracks")
+        )
+        self.assertIs(first, second)
+        self.assertEqual(self.requests, 1)
+
+    async def test_missing_tab(self):
+        with self.assertRaises(NoTabError):
+            await self.cache.fetch("missing")
+        self.assertIsNone(self.cache.load_snapshot("missing"))
+
+    async def test_snapshot_served_during_outage(self):
+        await self.cache.fetch("tracks")
+        self.assertTrue(
+            os.path.exists(os.path.join(self.temp_dir.name, "tracks.feather"))
+        )
+
+        offline = SheetCache(
+            lambda tab: "http://127.0.0.1:9/unreachable",
+            snapshot_dir=self.temp_dir.name,
+        )
+        try:
+            df = await offline.fetch("tracks")
+            self.assertEqual(df["fullname"].tolist(), ["Spa", "Monza"])
+            with self.assertRaises(Exception):
+                await offline.fetch("never-fetched")
+        finally:
+            await offline.close()
+
+    async def test_load_snapshots(self):
+        await self.cache.read("presets")
+        await self.cache.fetch("My Tab")
+        fresh = SheetCache(lambda tab: tab, snapshot_dir=self.temp_dir.name)
+        self.assertEqual(fresh.load_snapshots(), 2)
+        self.assertEqual(list(fresh.cached("my tab").columns), ["fullname", "weight"])
+        self.assertEqual(
+            list(fresh.load_snapshot("presets").columns), ["Fullname", "Weight"]
+        )
+
+    async def test_overlapping_snapshot_saves(self):
+        frames = [
+            pd.DataFrame({"Fullname": [f"Track {i}"] * 1000, "Weight": i})
+            for i in range(8)
+        ]
+        await asyncio.gather(
+            *(
+                asyncio.to_thread(self.cache.save_snapshot, "presets", df)
+                for df in frames
+            )
+        )
+        # One complete write wins, and no temporary files are left behind
+        saved = self.cache.load_snapshot("presets")
+        self.assertTrue(any(saved.equals(df) for df in frames))
+        self.assertEqual(os.listdir(self.temp_dir.name), ["presets.feather"])
+
+
+if __name__ == "__main__":
+    unittest.main()
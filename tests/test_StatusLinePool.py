@@ -0,0 +1,64 @@
+import asyncio
+import unittest
+
+from modules.StatusLinePool import StatusLinePool
+
+FALLBACKS = ["fallback"]
+
+
+class Lines:
+    def __init__(self, *lines):
+        self.lines = list(lines)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        line = self.lines.pop(0)
+        if isinstance(line, Exception):
+            raise line
+        return line
+
+
+class TestStatusLinePool(unittest.IsolatedAsyncioTestCase):
+    async def test_fill_cleans_and_skips_repeats(self):
+        generate = Lines('"Patience."', "Patience.", "", "Relax.\nSure thing!")
+        pool = StatusLinePool(generate, FALLBACKS, size=2)
+        self.assertTrue(await pool.fill())
+        self.assertEqual(list(pool.lines), ["Patience.", "Relax."])
+
+    async def test_take_never_waits(self):
+        pool = StatusLinePool(Lines(), FALLBACKS, size=2)
+        self.assertEqual(pool.take(), "fallback")
+        pool.lines.extend(["one", "two"])
+        self.assertEqual(pool.take(), "one")
+
+    async def test_model_failure_uses_fallbacks(self):
+        generate = Lines("first", Exception("connection refused"))
+        pool = StatusLinePool(generate, FALLBACKS, size=3)
+        with self.assertLogs(level="WARNING"):
+            self.assertFalse(await pool.fill())
+        self.assertEqual([pool.take(), pool.take()], ["first", "fallback"])
+
+    async def test_gives_up_on_useless_lines(self):
+        generate = Lines(*["same"] * 10)
+        pool = StatusLinePool(generate, FALLBACKS, size=3)
+        self.assertFalse(await pool.fill())
+        self.assertEqual(generate.calls, 6)
+
+    async def test_refills_in_background(self):
+        generate = Lines(*(f"line {i}" for i in range(10)))
+        pool = StatusLinePool(generate, FALLBACKS, size=2)
+        pool.start()
+        try:
+            await asyncio.sleep(0.01)
+            self.assertEqual(list(pool.lines), ["line 0", "line 1"])
+            self.assertEqual(pool.take(), "line 0")
+            await asyncio.sleep(0.01)
+            self.assertEqual(list(pool.lines), ["line 1", "line 2"])
+            self.assertEqual(generate.calls, 3)
+        finally:
+            await pool.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import tempfile
+import unittest
+
+from modules.TokenCounter import MESSAGE_OVERHEAD, TokenCounter
+
+
+class WordTokenizer:
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, text, verbose=True):
+        self.encoded.append(text)
+        return text.split()
+
+
+class TestTokenCounter(unittest.TestCase):
+    def setUp(self):
+        self.counter = TokenCounter()
+        self.counter.tokenizer = WordTokenizer()
+
+    def test_counts_are_remembered(self):
+        self.assertEqual(self.counter.count("one two three"), 3 + MESSAGE_OVERHEAD)
+        self.assertEqual(self.counter.count("one two three"), 3 + MESSAGE_OVERHEAD)
+        self.assertEqual(self.counter.tokenizer.encoded, ["one two three"])
+
+    def test_cache_is_bounded(self):
+        counter = TokenCounter(cache_size=2)
+        counter.tokenizer = WordTokenizer()
+        for text in ("a", "b", "a", "c", "a", "b"):
+            counter.count(text)
+        # "b" was the least recently used when "c" was added
+        self.assertEqual(counter.tokenizer.encoded, ["a", "b", "c", "b"])
+
+    def test_trim_counts_newest_first_and_stops_at_budget(self):
+        messages = [f"old {i} message" for i in range(50)] + ["x y", "z"]
+        budget = 3 + 2 * MESSAGE_OVERHEAD + 1
+        self.assertEqual(self.counter.trim_to_budget(messages, budget), ["x y", "z"])
+        # Only the message that didn't fit was tokenized, not the rest of history
+        self.assertEqual(self.counter.tokenizer.encoded, ["z", "x y", "old 49 message"])
+
+    def test_trim_everything_fits(self):
+        self.assertEqual(self.counter.trim_to_budget(["a", "b"], 100), ["a", "b"])
+        self.assertEqual(self.counter.trim_to_budget(["a b c d e"], 2), [])
+
+    def test_estimates_without_tokenizer(self):
+        with tempfile.TemporaryDirectory() as missing:
+            counter = TokenCounter(tokenizer_path=missing)
+            self.assertFalse(counter.load())
+        self.assertEqual(counter.count("x" * 10), 3 + MESSAGE_OVERHEAD)
+
+
+if __name__ == "__main__":
+    unittest.main()
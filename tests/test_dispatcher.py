@@ -0,0 +1,313 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+# Add the parent directory to sys.path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from modules.scheduler import scheduler
+from modules.scheduler.dispatcher import CLAIM_BATCH_SIZE, EventDispatcher
+
+
+class TestEventDispatcher(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_patch = patch.object(
+            scheduler, "DB_PATH", os.path.join(self.temp_dir.name, "test.db")
+        )
+        self.db_patch.start()
+        await scheduler.init_db()
+        self.dispatcher = EventDispatcher(max_sleep=5)
+
+    async def asyncTearDown(self):
+        await self.dispatcher.stop()
+        await scheduler.close_db()
+        self.db_patch.stop()
+        self.temp_dir.cleanup()
+
+    async def schedule(self, delay, function_name="test_function"):
+        return await scheduler.schedule_event(
+            timestamp=time.time() + delay,
+            function_name=function_name,
+            message_id=1,
+            channel_id=2,
+        )
+
+    async def test_due_events_run_concurrently(self):
+        started = []
+
+        async def handler(event):
+            started.append(event.id)
+            await asyncio.sleep(0.2)
+
+        self.dispatcher.register("test_function", handler)
+        ids = [await self.schedule(-10) for _ in range(3)]
+        begin = time.monotonic()
+        self.dispatcher.start()
+        while await scheduler.get_all_scheduled_events():
+            await asyncio.sleep(0.01)
+        self.assertLess(time.monotonic() - begin, 0.5)
+        self.assertCountEqual(started, ids)
+
+    async def test_wakes_for_newly_scheduled_event(self):
+        fired = asyncio.Event()
+
+        async def handler(event):
+            fired.set()
+
+        self.dispatcher.register("test_function", handler)
+        self.dispatcher.start()
+        await asyncio.sleep(0.05)
+        # The dispatcher is sleeping for max_sleep, scheduling must wake it up
+        await self.schedule(0.1)
+        await asyncio.wait_for(fired.wait(), timeout=1)
+
+    async def test_backlog_larger_than_a_claim_runs_without_waiting(self):
+        async def handler(event):
+            pass
+
+        self.dispatcher.register("test_function", handler)
+        for _ in range(CLAIM_BATCH_SIZE * 2 + 1):
+            await self.schedule(-1)
+        self.dispatcher.start()
+        # Sleeping for max_sleep between claims would take 10s
+        await asyncio.sleep(0.5)
+        self.assertEqual(await scheduler.get_all_scheduled_events(), [])
+
+    async def test_records_lateness_and_duration(self):
+        async def handler(event):
+            await asyncio.sleep(0.1)
+            if event.message_id == 2:
+                raise RuntimeError("boom")
+
+        self.dispatcher.register("test_function", handler)
+        await self.schedule(-5)
+        await scheduler.schedule_event(time.time() - 5, "test_function", 2, 2)
+        self.dispatcher.start()
+        await asyncio.sleep(0.3)
+        summary = self.dispatcher.metrics.summary()["test_function"]
+        self.assertEqual(summary["lateness"]["count"], 2)
+        self.assertGreaterEqual(summary["lateness"]["p50"], 5)
+        self.assertGreaterEqual(summary["duration"]["max"], 0.1)
+        self.assertEqual(summary["failures"], 1)
+
+    async def test_timeout_fails_event(self):
+        async def handler(event):
+            await asyncio.sleep(10)
+
+        self.dispatcher.register("test_function", handler, timeout=0.1, max_attempts=1)
+        await self.schedule(-1)
+        self.dispatcher.start()
+        await asyncio.sleep(0.3)
+        self.assertEqual(await scheduler.get_all_scheduled_events(), [])
+
+    async def test_failed_event_is_retried(self):
+        attempts = []
+
+        async def handler(event):
+            attempts.append(event.attempts)
+            raise RuntimeError("boom")
+
+        self.dispatcher.register("test_function", handler)
+        await self.schedule(-1)
+        self.dispatcher.start()
+        await asyncio.sleep(0.1)
+        self.assertEqual(attempts, [1])
+        (event,) = await scheduler.get_all_scheduled_events()
+        self.assertEqual(event.status, "pending")
+        self.assertGreater(event.timestamp, time.time())
+
+    async def test_replicas_run_each_event_once(self):
+        runs = []
+
+        async def handler(event):
+            runs.append(event.id)
+            await asyncio.sleep(0.05)
+
+        replica = EventDispatcher(max_sleep=5)
+        try:
+            for dispatcher in (self.dispatcher, replica):
+                dispatcher.register("test_function", handler)
+            ids = [await self.schedule(-1) for _ in range(10)]
+            self.dispatcher.start()
+            replica.start()
+            while await scheduler.get_all_scheduled_events():
+                await asyncio.sleep(0.01)
+            self.assertCountEqual(runs, ids)
+        finally:
+            await replica.stop()
+
+    async def test_stop_releases_running_events(self):
+        started = asyncio.Event()
+
+        async def handler(event):
+            started.set()
+            await asyncio.sleep(10)
+
+        self.dispatcher.register("test_function", handler)
+        await self.schedule(-1)
+        self.dispatcher.start()
+        await asyncio.wait_for(started.wait(), timeout=1)
+        await self.dispatcher.stop()
+        (event,) = await scheduler.get_pending_events()
+        self.assertEqual(event.attempts, 0)
+
+    async def test_unhandled_events_stay_pending(self):
+        await self.schedule(-1, function_name="someone_elses_function")
+        self.dispatcher.start()
+        await asyncio.sleep(0.1)
+        self.assertEqual(len(await scheduler.get_pending_events()), 1)
+
+    async def add_recurring(self, due_in):
+        schedule = await scheduler.add_recurring_schedule(
+            "test_function", message_id=1, channel_id=2, weekday=0, hour=20, minute=0
+        )
+        db = await scheduler.get_db()
+        await db.execute(
+            "UPDATE recurring_schedules SET next_fire_at = ? WHERE id = ?",
+            (time.time() + due_in, schedule.id),
+        )
+        await db.commit()
+        return schedule.id
+
+    async def test_recurring_fires_once_across_replicas(self):
+        fired = []
+
+        async def handler(event):
+            fired.append(event.data)
+
+        replica = EventDispatcher(max_sleep=5)
+        try:
+            for dispatcher in (self.dispatcher, replica):
+                dispatcher.register("test_function", handler)
+            schedule_id = await self.add_recurring(0.1)
+            self.dispatcher.start()
+            replica.start()
+            await asyncio.sleep(0.4)
+            self.assertEqual(len(fired), 1)
+            schedule = await scheduler.get_recurring_schedule(schedule_id)
+            self.assertGreater(schedule.next_fire_at, time.time())
+            self.assertIsNotNone(schedule.last_fired_at)
+        finally:
+            await replica.stop()
+
+    async def test_missed_recurring_is_skipped(self):
+        fired = []
+
+        async def handler(event):
+            fired.append(event)
+
+        self.dispatcher.register("test_function", handler)
+        schedule_id = await self.add_recurring(-3600)
+        self.dispatcher.start()
+        await asyncio.sleep(0.1)
+        self.assertEqual(fired, [])
+        schedule = await scheduler.get_recurring_schedule(schedule_id)
+        self.assertGreater(schedule.next_fire_at, time.time())
+
+    async def test_cancelled_recurring_does_not_fire(self):
+        fired = []
+
+        async def handler(event):
+            fired.append(event)
+
+        self.dispatcher.register("test_function", handler)
+        schedule_id = await self.add_recurring(0.2)
+        self.dispatcher.start()
+        await asyncio.sleep(0.05)
+        self.assertTrue(await scheduler.cancel_recurring_schedule(schedule_id))
+        await asyncio.sleep(0.3)
+        self.assertEqual(fired, [])
+
+    async def test_failed_recurring_is_retried(self):
+        fired = []
+
+        async def handler(event):
+            fired.append(event.key)
+            if len(fired) < 3:
+                raise RuntimeError("Channel not found")
+
+        self.dispatcher = EventDispatcher(max_sleep=5, retry_delay=0.05)
+        self.dispatcher.register("test_function", handler, max_attempts=3)
+        schedule_id = await self.add_recurring(0.05)
+        with self.assertLogs("modules.scheduler.dispatcher", level="ERROR") as logs:
+            self.dispatcher.start()
+            await asyncio.sleep(0.4)
+        self.assertEqual(len(fired), 3)
+        self.assertEqual(len(set(fired)), 1)
+        self.assertEqual(len(logs.records), 2)
+        summary = self.dispatcher.metrics.summary()["test_function"]
+        self.assertEqual(summary["failures"], 2)
+
+        # Given up on after max_attempts, until the next occurrence
+        fired.clear()
+        self.dispatcher.register("test_function", handler, max_attempts=2)
+        await self.add_recurring(0.05)
+        with self.assertLogs("modules.scheduler.dispatcher", level="ERROR") as logs:
+            self.dispatcher.reload_recurring()
+            await asyncio.sleep(0.4)
+        self.assertEqual(len(fired), 2)
+        self.assertIn("failed 2 times", logs.output[-1])
+        schedule = await scheduler.get_recurring_schedule(schedule_id)
+        self.assertGreater(schedule.next_fire_at, time.time())
+
+    async def test_reload_recurring_drops_cancelled_schedule(self):
+        async def handler(event):
+            pass
+
+        self.dispatcher.register("test_function", handler)
+        schedule_id = await self.add_recurring(3600)
+        self.dispatcher.start()
+        await asyncio.sleep(0.1)
+        self.assertEqual([i for _, i in self.dispatcher._recurring], [schedule_id])
+
+        self.assertTrue(await scheduler.cancel_recurring_schedule(schedule_id))
+        self.dispatcher.reload_recurring()
+        await asyncio.sleep(0.1)
+        self.assertEqual(self.dispatcher._recurring, [])
+
+    async def test_prepare_runs_ahead_of_due_time(self):
+        log = []
+
+        async def prepare(event):
+            log.append(("prepare", event.key))
+
+        async def handler(event):
+            log.append(("run", event.key))
+
+        self.dispatcher.register(
+            "test_function", handler, prepare=prepare, lead_time=60
+        )
+        event_id = await self.schedule(0.3)
+        self.dispatcher.start()
+        await asyncio.sleep(0.1)
+        self.assertEqual(log, [("prepare", str(event_id))])
+        await asyncio.sleep(0.4)
+        self.assertEqual(log, [("prepare", str(event_id)), ("run", str(event_id))])
+
+    async def test_prepare_recurring_occurrence(self):
+        prepared = []
+
+        async def handler(event):
+            pass
+
+        async def prepare(event):
+            prepared.append(event)
+
+        self.dispatcher.register(
+            "test_function", handler, prepare=prepare, lead_time=60
+        )
+        schedule_id = await self.add_recurring(30)
+        await self.add_recurring(3600)
+        self.dispatcher.start()
+        await asyncio.sleep(0.1)
+        self.assertEqual([event.recurring_id for event in prepared], [schedule_id])
+        self.assertTrue(prepared[0].key.startswith(f"weekly-{schedule_id}-"))
+
+
+if __name__ == "__main__":
+    unittest.main()
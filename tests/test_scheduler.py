@@ -1,50 +1,64 @@
+import asyncio
 import unittest
 import sys
 import os
 import time
 import tempfile
 import json
+import datetime
+import sqlite3
 from unittest.mock import patch, MagicMock
 
+import pytz
+
 # Add the parent directory to sys.path so we can import the modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+from modules.scheduler import scheduler
 from modules.scheduler.scheduler import (
     init_db,
+    close_db,
     schedule_event,
+    schedule_events,
     get_pending_events,
     mark_event_completed,
+    cancel_event,
+    claim_due_events,
+    complete_event,
+    complete_events,
+    CompletionQueue,
+    fail_event,
+    release_event,
     ScheduledEvent,
+    next_weekly_occurrence,
 )
 
 
-class TestScheduler(unittest.TestCase):
-    def setUp(self):
+class TestScheduler(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
         # Create a temporary directory for the test database
         self.temp_dir = tempfile.TemporaryDirectory()
         self.db_path = os.path.join(self.temp_dir.name, "test.db")
 
-        # Set the database URL for testing
-        self.original_db_path = os.environ.get("DATABASE_URL")
-        os.environ["DATABASE_URL"] = f"sqlite:///{self.db_path}"
+        # Point the scheduler at the test database
+        self.db_patch = patch.object(scheduler, "DB_PATH", self.db_path)
+        self.db_patch.start()
 
         # Initialize the database
-        init_db()
+        await init_db()
 
-    def tearDown(self):
-        # Reset the database URL
-        if self.original_db_path:
-            os.environ["DATABASE_URL"] = self.original_db_path
-        else:
-            del os.environ["DATABASE_URL"]
+    async def asyncTearDown(self):
+        # Close the shared connection and restore the database path
+        await close_db()
+        self.db_patch.stop()
 
         # Clean up the temporary directory
         self.temp_dir.cleanup()
 
-    def test_schedule_and_get_event(self):
+    async def test_schedule_and_get_event(self):
         # Schedule a test event
         now = time.time()
-        event_id = schedule_event(
+        event_id = await schedule_event(
             timestamp=now - 10,  # 10 seconds in the past
             function_name="test_function",
             message_id=12345,
@@ -56,7 +70,7 @@ class TestScheduler(unittest.TestCase):
         self.assertIsNotNone(event_id)
 
         # Get pending events
-        events = get_pending_events()
+        events = await get_pending_events()
 
         # Verify we got our event back
         self.assertEqual(len(events), 1)
@@ -67,10 +81,10 @@ class TestScheduler(unittest.TestCase):
         self.assertEqual(events[0].data, json.dumps({"test": "data"}))
         self.assertFalse(events[0].completed)
 
-    def test_mark_event_completed(self):
+    async def test_mark_event_completed(self):
         # Schedule a test event
         now = time.time()
-        event_id = schedule_event(
+        event_id = await schedule_event(
             timestamp=now - 10,
             function_name="test_function",
             message_id=12345,
@@ -78,21 +92,21 @@ class TestScheduler(unittest.TestCase):
         )
 
         # Mark it as completed
-        result = mark_event_completed(event_id)
+        result = await mark_event_completed(event_id)
 
         # Verify it was marked as completed
         self.assertTrue(result)
 
         # Get pending events
-        events = get_pending_events()
+        events = await get_pending_events()
 
         # Verify our event is no longer pending
         self.assertEqual(len(events), 0)
 
-    def test_future_events_not_returned(self):
+    async def test_future_events_not_returned(self):
         # Schedule a test event in the future
         now = time.time()
-        event_id = schedule_event(
+        event_id = await schedule_event(
             timestamp=now + 3600,  # 1 hour in the future
             function_name="future_function",
             message_id=12345,
@@ -100,11 +114,424 @@ class TestScheduler(unittest.TestCase):
         )
 
         # Get pending events
-        events = get_pending_events()
+        events = await get_pending_events()
 
         # Verify our future event is not returned
         self.assertEqual(len(events), 0)
 
+    async def test_cancel_event(self):
+        # Schedule a test event in the future
+        now = time.time()
+        event_id = await schedule_event(
+            timestamp=now + 3600,
+            function_name="future_function",
+            message_id=12345,
+            channel_id=67890,
+        )
+
+        # Cancel it, a second cancel finds nothing pending
+        self.assertTrue(await cancel_event(event_id))
+        self.assertFalse(await cancel_event(event_id))
+
+    async def test_claim_is_exclusive(self):
+        now = time.time()
+        event_id = await schedule_event(
+            timestamp=now - 10,
+            function_name="test_function",
+            message_id=12345,
+            channel_id=67890,
+        )
+
+        # Only the first worker gets the event, and it's no longer pending
+        claimed = await claim_due_events("worker-a", lease_seconds=60)
+        self.assertEqual([event.id for event in claimed], [event_id])
+        self.assertEqual(claimed[0].status, "running")
+        self.assertEqual(claimed[0].attempts, 1)
+        self.assertEqual(await claim_due_events("worker-b", lease_seconds=60), [])
+        self.assertEqual(await get_pending_events(), [])
+
+        # Only the worker holding the lease can complete it
+        self.assertFalse(await complete_event(event_id, "worker-b"))
+        self.assertTrue(await complete_event(event_id, "worker-a"))
+        self.assertFalse(await cancel_event(event_id))
+
+    async def test_claim_filters_function_name(self):
+        now = time.time()
+        await schedule_event(now - 10, "test_function", 12345, 67890)
+        other_id = await schedule_event(now - 10, "other_function", 12345, 67890)
+
+        claimed = await claim_due_events("worker-a", 60, function_name="other_function")
+        self.assertEqual([event.id for event in claimed], [other_id])
+
+    async def test_schedule_events_in_one_transaction(self):
+        now = time.time()
+        event_ids = await schedule_events(
+            [
+                ScheduledEvent(None, now - 10, "test_function", i, 67890, False, None)
+                for i in range(3)
+            ]
+        )
+        self.assertEqual(len(event_ids), 3)
+        pending = await get_pending_events()
+        self.assertEqual([event.id for event in pending], event_ids)
+        self.assertEqual([event.message_id for event in pending], [0, 1, 2])
+
+        # A failing row rolls the whole batch back
+        with self.assertRaises(Exception):
+            await schedule_events(
+                [
+                    ScheduledEvent(None, now, "test_function", 1, 67890, False, None),
+                    ScheduledEvent(None, now, None, 1, 67890, False, None),
+                ]
+            )
+        self.assertEqual(len(await get_pending_events()), 3)
+
+    async def test_complete_events_skips_lost_leases(self):
+        now = time.time()
+        event_ids = [
+            await schedule_event(now - 10, "test_function", 12345, 67890)
+            for _ in range(3)
+        ]
+        await claim_due_events("worker-a", lease_seconds=60)
+        await release_event(event_ids[2], "worker-a")
+
+        completed = await complete_events(event_ids, "worker-a")
+        self.assertCountEqual(completed, event_ids[:2])
+        self.assertEqual(
+            [event.id for event in await get_pending_events()], [event_ids[2]]
+        )
+
+    async def test_completion_queue_coalesces_writes(self):
+        now = time.time()
+        event_ids = [
+            await schedule_event(now - 10, "test_function", 12345, 67890)
+            for _ in range(5)
+        ]
+        await claim_due_events("worker-a", lease_seconds=60)
+        queue = CompletionQueue("worker-a")
+
+        with patch.object(
+            scheduler, "complete_events", wraps=scheduler.complete_events
+        ) as batch:
+            results = await asyncio.gather(
+                *(queue.complete(event_id) for event_id in event_ids),
+                queue.complete(event_ids[0]),
+            )
+        self.assertEqual(results, [True] * 6)
+        # Completions queued before the flush starts are written together
+        batch.assert_called_once()
+        self.assertEqual(await get_pending_events(), [])
+
+    async def test_expired_lease_is_reclaimed(self):
+        now = time.time()
+        event_id = await schedule_event(now - 10, "test_function", 12345, 67890)
+
+        # worker-a dies holding an already expired lease
+        await claim_due_events("worker-a", lease_seconds=-1)
+        claimed = await claim_due_events("worker-b", lease_seconds=60)
+        self.assertEqual([event.id for event in claimed], [event_id])
+        self.assertEqual(claimed[0].attempts, 2)
+        self.assertFalse(await complete_event(event_id, "worker-a"))
+
+        # Once out of attempts an expired event is failed instead of reclaimed
+        await release_event(event_id, "worker-b")
+        await claim_due_events("worker-b", lease_seconds=-1)
+        self.assertEqual(
+            await claim_due_events("worker-c", lease_seconds=60, max_attempts=2), []
+        )
+        self.assertEqual(await scheduler.get_all_scheduled_events(), [])
+
+    async def test_expired_leases_use_their_own_function_attempts(self):
+        now = time.time()
+        event_id = await schedule_event(now - 10, "close_poll", 12345, 67890)
+        for _ in range(3):
+            await claim_due_events(
+                "worker-a", lease_seconds=-1, function_name="close_poll"
+            )
+
+        # Another function's smaller max_attempts doesn't fail the event
+        await claim_due_events(
+            "worker-b", lease_seconds=60, function_name="spin_preset", max_attempts=3
+        )
+        event = await scheduler.get_event(event_id)
+        self.assertEqual(event.status, "running")
+
+        claimed = await claim_due_events(
+            "worker-b", lease_seconds=60, function_name="close_poll", max_attempts=5
+        )
+        self.assertEqual([event.id for event in claimed], [event_id])
+
+    async def test_fail_event_retries(self):
+        now = time.time()
+        event_id = await schedule_event(now - 10, "test_function", 12345, 67890)
+
+        await claim_due_events("worker-a", lease_seconds=60)
+        self.assertTrue(
+            await fail_event(
+                event_id, "worker-a", "boom", max_attempts=2, retry_delay=0
+            )
+        )
+        claimed = await claim_due_events("worker-a", lease_seconds=60)
+        self.assertEqual([event.id for event in claimed], [event_id])
+
+        # The second failure uses up the attempts
+        self.assertTrue(
+            await fail_event(
+                event_id, "worker-a", "boom", max_attempts=2, retry_delay=0
+            )
+        )
+        self.assertEqual(await claim_due_events("worker-a", lease_seconds=60), [])
+        db = await scheduler.get_db()
+        async with db.execute(
+            "SELECT status, last_error FROM scheduled_events WHERE id = ?", (event_id,)
+        ) as cursor:
+            self.assertEqual(tuple(await cursor.fetchone()), ("failed", "boom"))
+
+    async def test_migrates_old_table(self):
+        old_db_path = os.path.join(self.temp_dir.name, "old.db")
+        conn = sqlite3.connect(old_db_path)
+        conn.execute("""
+        CREATE TABLE scheduled_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp REAL NOT NULL,
+            function_name TEXT NOT NULL,
+            message_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            completed BOOLEAN NOT NULL DEFAULT 0,
+            data TEXT
+        )
+        """)
+        conn.execute(
+            "INSERT INTO scheduled_events (timestamp, function_name, message_id, channel_id, completed) "
+            "VALUES (?, 'old_function', 1, 2, 1), (?, 'old_function', 1, 2, 0)",
+            (time.time() - 20, time.time() - 10),
+        )
+        conn.commit()
+        conn.close()
+
+        await init_db(old_db_path)
+        events = await get_pending_events()
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].status, "pending")
+
+    async def test_init_is_versioned_and_idempotent(self):
+        db = await scheduler.get_db()
+        async with db.execute("PRAGMA user_version") as cursor:
+            self.assertEqual((await cursor.fetchone())[0], len(scheduler._MIGRATIONS))
+
+        # A second process starting on the same file finds nothing to migrate
+        await close_db()
+        scheduler._initialized_path = None
+        await init_db()
+        db = await scheduler.get_db()
+        async with db.execute("PRAGMA user_version") as cursor:
+            self.assertEqual((await cursor.fetchone())[0], len(scheduler._MIGRATIONS))
+
+    async def test_in_memory_database(self):
+        await init_db(":memory:")
+        event_id = await schedule_event(time.time() - 1, "test_function", 1, 2)
+        self.assertEqual([event.id for event in await get_pending_events()], [event_id])
+        self.assertFalse(os.path.exists(":memory:"))
+
+    async def test_failed_multi_statement_writes_roll_back(self):
+        now = time.time()
+        event_id = await schedule_event(now - 10, "test_function", 12345, 67890)
+        await claim_due_events("worker-a", lease_seconds=-1, max_attempts=1)
+        await mark_event_completed(
+            await schedule_event(now - 10, "other_function", 1, 2)
+        )
+        db = await scheduler.get_db()
+        broken = "UPDATE missing_table SET id = 1"
+
+        # The lease expiry ran before the claim failed
+        with patch.object(scheduler, "_SQL_CLAIM_EVENTS", broken):
+            with self.assertLogs(scheduler.logger, level="ERROR"):
+                self.assertEqual(
+                    await claim_due_events("worker-b", 60, max_attempts=1), []
+                )
+        self.assertFalse(db.in_transaction)
+        self.assertEqual((await scheduler.get_event(event_id)).status, "running")
+
+        # The copy to the archive ran before the delete failed
+        with patch.object(scheduler, "_SQL_DELETE_ARCHIVED_EVENTS", broken):
+            with self.assertLogs(scheduler.logger, level="ERROR"):
+                await scheduler.archive_completed_events(0)
+        self.assertFalse(db.in_transaction)
+        async with db.execute(
+            "SELECT COUNT(*) FROM scheduled_events_archive"
+        ) as cursor:
+            self.assertEqual((await cursor.fetchone())[0], 0)
+
+    async def test_archive_completed_events(self):
+        now = time.time()
+        old_id = await schedule_event(now - 10, "test_function", 12345, 67890)
+        recent_id = await schedule_event(now - 10, "test_function", 12345, 67890)
+        pending_id = await schedule_event(now + 3600, "test_function", 12345, 67890)
+        await mark_event_completed(old_id)
+        await mark_event_completed(recent_id)
+
+        db = await scheduler.get_db()
+        await db.execute(
+            "UPDATE scheduled_events SET completed_at = ? WHERE id = ?",
+            (now - 40 * 86400, old_id),
+        )
+        await db.commit()
+
+        self.assertEqual(await scheduler.archive_completed_events(30), 1)
+        async with db.execute("SELECT id FROM scheduled_events") as cursor:
+            remaining = [row[0] for row in await cursor.fetchall()]
+        self.assertCountEqual(remaining, [recent_id, pending_id])
+        async with db.execute(
+            "SELECT id, status FROM scheduled_events_archive"
+        ) as cursor:
+            self.assertEqual(
+                [tuple(row) for row in await cursor.fetchall()], [(old_id, "done")]
+            )
+
+    async def test_pending_queries_use_partial_index(self):
+        db = await scheduler.get_db()
+        async with db.execute(
+            "EXPLAIN QUERY PLAN " + scheduler._SQL_PENDING_EVENTS, (time.time(),)
+        ) as cursor:
+            plan = " ".join(row[3] for row in await cursor.fetchall())
+        self.assertIn("COVERING INDEX idx_scheduled_events_pending", plan)
+
+    async def test_next_weekly_occurrence_keeps_local_time(self):
+        tz = pytz.timezone("America/New_York")
+        # Sunday evening just before the US switches to daylight saving time
+        after = tz.localize(datetime.datetime(2026, 3, 1, 12, 0)).timestamp()
+        first = next_weekly_occurrence(0, 20, 0, "America/New_York", after)
+        second = next_weekly_occurrence(0, 20, 0, "America/New_York", first)
+        for timestamp, day in ((first, 2), (second, 9)):
+            local = datetime.datetime.fromtimestamp(timestamp, tz)
+            self.assertEqual((local.day, local.hour, local.minute), (day, 20, 0))
+        self.assertEqual(second - first, 7 * 86400 - 3600)
+
+    async def test_recurring_schedule(self):
+        schedule = await scheduler.add_recurring_schedule(
+            "test_function", 12345, 67890, weekday=4, hour=21, minute=30
+        )
+        self.assertGreater(schedule.next_fire_at, time.time())
+        self.assertEqual(
+            [s.id for s in await scheduler.get_recurring_schedules()], [schedule.id]
+        )
+
+        # Only one advance of the same occurrence wins
+        fired_at = schedule.next_fire_at
+        next_fire_at = schedule.next_fire_after(fired_at)
+        self.assertTrue(
+            await scheduler.advance_recurring_schedule(
+                schedule.id, fired_at, next_fire_at
+            )
+        )
+        self.assertFalse(
+            await scheduler.advance_recurring_schedule(
+                schedule.id, fired_at, next_fire_at
+            )
+        )
+
+        self.assertTrue(await scheduler.cancel_recurring_schedule(schedule.id))
+        self.assertIsNone(await scheduler.get_recurring_schedule(schedule.id))
+        self.assertEqual(await scheduler.get_recurring_schedules(), [])
+
+    async def test_get_event(self):
+        event_id = await schedule_event(time.time() + 60, "test_function", 1, 2)
+        await cancel_event(event_id)
+
+        event = await scheduler.get_event(event_id)
+        self.assertEqual(event.status, "cancelled")
+        self.assertTrue(event.completed)
+        self.assertIsNone(await scheduler.get_event(event_id + 1))
+
+    async def test_list_events_pages_and_filters(self):
+        now = time.time()
+        ids = [
+            await schedule_event(now + 60, "test_function", 1, 2, guild_id=10)
+            for _ in range(5)
+        ]
+        await schedule_event(now + 30, "test_function", 1, 3, guild_id=11)
+        await schedule_event(now + 30, "other_function", 1, 2, guild_id=10)
+
+        pages = []
+        after = None
+        while True:
+            page = await scheduler.list_events(
+                function_name="test_function", guild_id=10, after=after, limit=2
+            )
+            if not page:
+                break
+            pages.append([event.id for event in page])
+            after = (page[-1].timestamp, page[-1].id)
+        # Events sharing a timestamp are split across pages without repeats
+        self.assertEqual(pages, [ids[0:2], ids[2:4], ids[4:5]])
+
+        by_channel = await scheduler.list_events(channel_id=3)
+        self.assertEqual([event.guild_id for event in by_channel], [11])
+        self.assertEqual(len(await scheduler.list_events(limit=100)), 7)
+
+    async def test_list_recurring_schedules(self):
+        first = await scheduler.add_recurring_schedule(
+            "test_function", 1, 2, weekday=0, hour=20, minute=0, guild_id=10
+        )
+        await scheduler.add_recurring_schedule(
+            "test_function", 1, 2, weekday=1, hour=20, minute=0, guild_id=11
+        )
+        schedules = await scheduler.list_recurring_schedules(guild_id=10)
+        self.assertEqual([schedule.id for schedule in schedules], [first.id])
+
+    async def test_rows_without_guild_are_listed_in_every_guild(self):
+        # Scheduled before guild_id was recorded
+        legacy = await schedule_event(time.time() + 60, "test_function", 1, 2)
+        await schedule_event(time.time() + 90, "test_function", 1, 3, guild_id=11)
+        events = await scheduler.list_events(function_name="test_function", guild_id=10)
+        self.assertEqual([event.id for event in events], [legacy])
+
+        schedule = await scheduler.add_recurring_schedule(
+            "test_function", 1, 2, weekday=0, hour=20, minute=0
+        )
+        schedules = await scheduler.list_recurring_schedules(guild_id=10)
+        self.assertEqual([s.id for s in schedules], [schedule.id])
+
+    async def test_guild_pages_use_the_guild_index(self):
+        db = await scheduler.get_db()
+        for table, columns, base, order_column in (
+            (
+                "scheduled_events",
+                scheduler._EVENT_COLUMNS,
+                "completed = 0",
+                "timestamp",
+            ),
+            (
+                "recurring_schedules",
+                scheduler._RECURRING_COLUMNS,
+                "active = 1",
+                "next_fire_at",
+            ),
+        ):
+            sql, params = scheduler._list_query(
+                table,
+                columns,
+                base,
+                order_column,
+                "spin_preset",
+                None,
+                10,
+                (time.time(), 1),
+                8,
+            )
+            async with db.execute(f"EXPLAIN QUERY PLAN {sql}", params) as cursor:
+                plan = [row[3] for row in await cursor.fetchall()]
+            searches = [step for step in plan if step.startswith("SEARCH")]
+            self.assertEqual(len(searches), 2, plan)
+            for step in searches:
+                self.assertIn(f"USING INDEX idx_{table}_guild", step)
+            self.assertFalse([step for step in plan if "TEMP B-TREE" in step], plan)
+
+    async def test_wal_mode(self):
+        db = await scheduler.get_db()
+        async with db.execute("PRAGMA journal_mode") as cursor:
+            self.assertEqual((await cursor.fetchone())[0], "wal")
+
 
 if __name__ == "__main__":
     unittest.main()